@@ -1,3 +1,4 @@
+import hmac
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
@@ -56,3 +57,12 @@ async def get_current_user(request: Request):
     if not token_data:
             raise HTTPException(status_code=401, detail="Invalid Token")
     return token_data
+
+
+async def require_admin(request: Request):
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="System endpoints are disabled")
+    # Constant-time, so response timing does not leak the key
+    given = request.headers.get("X-Admin-Key", "")
+    if not hmac.compare_digest(given.encode(), settings.ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin key")
@@ -12,17 +12,124 @@ class Settings(BaseSettings):
     # AI / LLM
     LLM_API_KEY: str = os.getenv("LLM_API_KEY") or os.getenv("GOOGLE_API_KEY", "")
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
+
+    # RAG
+    RAG_HYBRID_SEARCH: bool = True
+    RAG_RRF_K: int = 60
+    # How often the API checks whether the worker changed the knowledge base
+    # and its in-memory BM25 index needs reloading
+    RAG_LEXICAL_REFRESH_SECONDS: float = 60.0
+    # "memory" keeps a per-process BM25 index, "atlas" queries the Atlas Search
+    # index instead (serverless cold starts would otherwise reload it each time)
+    RAG_LEXICAL_BACKEND: str = os.getenv("RAG_LEXICAL_BACKEND", "atlas" if os.getenv("VERCEL") else "memory")
+    RAG_LEXICAL_MAX_CHUNKS: int = 50000  # Newest chunks held by the in-memory index
+    RAG_ATLAS_SEARCH_INDEX: str = "knowledge_text"
+    # Token budget and MMR trade-off for knowledge packed into the prompt
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1200
+    RAG_MMR_LAMBDA: float = 0.7
+    # "array" (BSON doubles), "float32" or "int8"; see embedding_codec
+    EMBEDDING_STORAGE: str = "array"
+    # Duplicate chunks either "reuse" an existing vector or are "skip"ped
+    CHUNK_DEDUP_MODE: str = "skip"
+    CHUNK_NEAR_DUP_THRESHOLD: float = 0.9
+    CHUNK_MAX_TOKENS: int = 500
+
+    # Crawler
+    # Pages without a sitemap lastmod are re-checked after this many days
+    CRAWL_RECHECK_DAYS: int = 7
+    CRAWL_CONCURRENCY: int = 8
+    CRAWL_RATE_PER_HOST: float = 2.0  # Requests per second, robots.txt Crawl-delay can lower it
+    CRAWL_MAX_RETRIES: int = 3
+    CRAWL_EXTRACT_WORKERS: int = -1  # Extraction processes: -1 = one per CPU, 0 = inline
+    # Ingest pipeline: bounded queue between stages and per-stage concurrency
+    INGEST_QUEUE_SIZE: int = 16
+    INGEST_EMBED_CONCURRENCY: int = 4
+    INGEST_WRITE_CONCURRENCY: int = 2
+    INGEST_ITEMS_TTL_DAYS: int = 14  # Per-URL checkpoint rows of unfinished runs
+    # Scheduled crawls run on one node at a time, guarded by a Mongo lease
+    CRAWL_LEASE_TTL_SECONDS: int = 300
+    CRAWL_RESUME_ATTEMPTS: int = 3
+    CRAWL_SCHEDULED_MAX_PAGES: int = 10
+    # Crawl worker (python -m app.worker) consuming the crawl_jobs queue
+    CRAWL_WORKER_CONCURRENCY: int = 1
+    CRAWL_WORKER_POLL_SECONDS: float = 5.0
+    CRAWL_WORKER_SHUTDOWN_SECONDS: int = 30
+    # A running job whose worker has not heartbeat for this long is re-queued
+    CRAWL_JOB_TIMEOUT_SECONDS: int = 600
+    # Runs a job may start before one that keeps timing out is marked failed
+    CRAWL_JOB_MAX_ATTEMPTS: int = 3
     
     # Google Auth
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID", "")
     
     # Google Maps
     GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "")
+    # Parallel geocoding lookups per generated plan
+    GEOCODE_CONCURRENCY: int = 8
+    # Geocode cache: in-memory LRU entries, Mongo TTL for hits and misses
+    GEOCODE_CACHE_SIZE: int = 2048
+    GEOCODE_CACHE_TTL_DAYS: int = 90
+    GEOCODE_NEGATIVE_TTL_HOURS: int = 6
+    # Offline gazetteer consulted before the Geocoding API (scripts/build_gazetteer.py)
+    GAZETTEER_PATH: str = os.getenv(
+        "GAZETTEER_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.json.gz"),
+    )
+    GAZETTEER_FUZZY_THRESHOLD: float = 0.8
+    # Travel-time cache (app.services.travel_time_service): coordinates are
+    # rounded to this many decimals (4 = ~10 m) before keying Distance Matrix cells
+    TRAVEL_TIME_ROUND_DIGITS: int = 4
+    TRAVEL_TIME_CACHE_SIZE: int = 20000
+    TRAVEL_TIME_TTL_DAYS: int = 7
+    TRAVEL_TIME_CONCURRENCY: int = 4
+    # Route optimizer (app.services.route_optimizer): search budget per day,
+    # and whether generated plans are reordered before they are returned
+    # (first and last stops stay put; time windows are not considered)
+    ROUTE_OPTIMIZE_TIME_LIMIT_MS: int = 200
+    ROUTE_OPTIMIZE_GENERATED: bool = True
+    # Pocket-list distribution: a day may hold this much more than the mean stay time
+    DISTRIBUTE_BALANCE_TOLERANCE: float = 0.25
+
+    # Shared outbound HTTP client (app.core.http)
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_MAX_CONNECTIONS: int = 20
     
+    # Admission control for the AI endpoints (app.services.admission). Per-user
+    # token buckets live in Mongo so replicas share them; the concurrency
+    # ceiling and wait queue are per process
+    AI_RATE_PER_MINUTE: float = 6.0  # sustained AI requests per user
+    AI_RATE_BURST: int = 10  # requests a rested user may send back to back
+    AI_PLAN_COST: int = 3  # plan generation counts as this many requests
+    AI_MAX_CONCURRENCY: int = 8  # AI requests served at once
+    AI_QUEUE_MAX: int = 32  # requests waiting for a slot before 429s
+    AI_QUEUE_PER_USER: int = 2  # waiting requests any one user may hold
+    AI_QUEUE_TIMEOUT_SECONDS: float = 15.0
+
+    # Observability (app.core.metrics): Prometheus metrics at /metrics, guarded by
+    # a bearer token when METRICS_TOKEN is set and only served without one in
+    # development; Server-Timing headers are opt-in
+    # because they expose internal timings to clients
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+    # Logging (app.core.logging): "text" or "json" lines on stdout, written by a
+    # background thread when LOG_ASYNC. LOG_SAMPLE_RATES keeps a fraction of
+    # the INFO lines of chatty loggers (per-place geocodes, per-URL crawl lines)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_ASYNC: bool = os.getenv("LOG_ASYNC", "true").lower() == "true"
+    LOG_QUEUE_SIZE: int = 10000  # records buffered before new ones are dropped
+    LOG_SAMPLE_RATES: str = os.getenv(
+        "LOG_SAMPLE_RATES", "app.services.geocoding_service.hits=0.1,app.crawler=0.1"
+    )
+
     # Auth
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-dev")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # Shared secret for /api/system endpoints (X-Admin-Key); empty disables them
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
     
     # CORS
     ALLOWED_ORIGINS: str = os.getenv(
@@ -33,6 +140,8 @@ class Settings(BaseSettings):
     # Environment
     VERCEL: bool = os.getenv("VERCEL") is not None
     PROD: bool = os.getenv("PROD") is not None
+    # Daily crawl scheduler in the API process; off on Vercel unless forced
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "false" if VERCEL else "true").lower() == "true"
 
     @property
     def is_production(self) -> bool:
@@ -1,21 +1,20 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from app.core.logging import logger
-import traceback
 
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global exception: {str(exc)}")
-    logger.error(traceback.format_exc())
+    logger.error("Global exception: %s", exc, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal Server Error", "message": str(exc)},
     )
 
 async def http_exception_handler(request: Request, exc: HTTPException):
-    logger.warning(f"HTTP exception: {exc.status_code} - {exc.detail}")
+    logger.warning("HTTP exception: %s - %s", exc.status_code, exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=exc.headers,  # e.g. Retry-After on 429s
     )
 
 def setup_exception_handlers(app):
@@ -0,0 +1,26 @@
+import threading
+
+from app.core.config import settings
+
+_genai = None
+_lock = threading.Lock()
+
+
+def get_genai():
+    """The google.generativeai module, imported and configured on first use.
+
+    Importing the SDK pulls in gRPC and protobuf and takes longer than the
+    rest of the app together, which every serverless cold start would pay
+    even for requests that never call Gemini.
+    """
+    global _genai
+    if _genai is None:
+        # Embeddings call in from worker threads, so guard the first import
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                if settings.LLM_API_KEY:
+                    genai.configure(api_key=settings.LLM_API_KEY)
+                _genai = genai
+    return _genai
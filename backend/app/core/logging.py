@@ -1,21 +1,231 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Set per request by RequestIdMiddleware; "-" outside requests (startup, worker)
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+dropped = {"records": 0}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in N records below WARNING from chatty loggers.
+
+    `rates` maps logger name prefixes to the fraction to keep, e.g.
+    {"app.crawler": 0.1}; the longest matching prefix wins. Sampling is by
+    count, not chance, so one in ten really is every tenth line, and kept
+    records carry `sample_rate` so readers can scale counts back up.
+    Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._every: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+
+    def _every_for(self, name: str) -> int:
+        every = self._every.get(name)
+        if every is None:
+            prefixes = [p for p in self.rates if name == p or name.startswith(p + ".")]
+            rate = self.rates[max(prefixes, key=len)] if prefixes else 1.0
+            every = self._every[name] = max(1, round(1 / rate)) if rate > 0 else 0
+        return every
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        every = self._every_for(record.name)
+        if every == 1:
+            return True
+        if every == 0:
+            return False
+        seen = self._seen.get(record.name, 0)
+        self._seen[record.name] = seen + 1
+        if seen % every:
+            return False
+        record.sample_rate = 1 / every
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def formatMessage(self, record):
+        # Before any traceback, which format() appends after this
+        text = super().formatMessage(record)
+        rid = getattr(record, "request_id", "-")
+        return text if rid == "-" else f"{text} [request_id={rid}]"
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller.
+
+    The caller only merges the message with its arguments; timestamps,
+    JSON encoding and the write happen on the listener thread. When the
+    sink falls behind and the queue is full, records are dropped (and
+    counted) instead of stalling the event loop.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames alive; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped["records"] += 1
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """"app.crawler=0.1,app.services.geocoding_service=0.2" -> {name: rate}"""
+    rates = {}
+    for part in value.split(","):
+        name, _, rate = part.strip().partition("=")
+        if name and rate:
+            rates[name] = float(rate)
+    return rates
+
+
+def shutdown_logging():
+    """Flush queued records; registered with atexit by setup_logging()."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(
+    stream=None,
+    log_format: Optional[str] = None,
+    use_queue: Optional[bool] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+):
+    """Configure the root logger; arguments override the LOG_* settings.
+
+    With LOG_ASYNC the root logger only enqueues records and a background
+    thread formats and writes them, so a slow stdout (a container log
+    driver, a full pipe) never stalls request handling.
+    """
+    shutdown_logging()
+    log_format = log_format or settings.LOG_FORMAT
+    use_queue = settings.LOG_ASYNC if use_queue is None else use_queue
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(settings.LOG_SAMPLE_RATES)
+
+    sink = logging.StreamHandler(stream or sys.stdout)
+    sink.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    if use_queue:
+        global _listener
+        handler = NonBlockingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+        _listener = logging.handlers.QueueListener(handler.queue, sink, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = sink
+    handler.addFilter(RequestIdFilter())
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
 
-def setup_logging():
-    # Define log format
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    
     # Configure root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
+    logging.basicConfig(level=settings.LOG_LEVEL, handlers=[handler], force=True)
+
+    # uvicorn configures its own stream handlers before importing the app;
+    # send its error and access logs through ours (and the queue) instead
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
     # Optional: Set specific levels for some libraries
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("motor").setLevel(logging.WARNING)
 
+
+atexit.register(shutdown_logging)
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving every request an id for log correlation.
+
+    A valid incoming X-Request-ID (from a proxy or the frontend) is reused,
+    otherwise one is generated; it is echoed in the response header and
+    attached to every log record written while the request is handled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        rid = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else uuid.uuid4().hex[:16]
+        token = request_id.set(rid)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (REQUEST_ID_HEADER, rid.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        # Not reset when the app raised: the unhandled-exception handler runs
+        # outside all middleware and should still log the request's id
+        request_id.reset(token)
+
+
 logger = logging.getLogger("app")
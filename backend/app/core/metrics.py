@@ -0,0 +1,256 @@
+import functools
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+
+# Seconds; covers a Mongo point read (~1 ms) up to a full Gemini plan (~30 s)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is one bisect and three adds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+http_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+http_in_flight = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being served"
+))
+stage_duration = REGISTRY.register(Histogram(
+    "app_stage_duration_seconds", "Time spent in internal stages (Mongo, Gemini, geocoding, crawl)", ("stage",)
+))
+stage_errors = REGISTRY.register(Counter(
+    "app_stage_errors_total", "Internal stage calls that raised", ("stage",)
+))
+
+# Per-request stage totals for the Server-Timing header: group -> [seconds, calls]
+_timings: ContextVar[Optional[Dict[str, list]]] = ContextVar("request_timings", default=None)
+
+
+def record(stage: str, seconds: float, error: bool = False):
+    """Record one call of an internal stage ("mongo.find", "gemini.plan", ...)."""
+    stage_duration.observe(seconds, stage)
+    if error:
+        stage_errors.inc(stage)
+    timings = _timings.get()
+    if timings is not None:
+        entry = timings.setdefault(stage.split(".", 1)[0], [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+class span:
+    """Time a block as an internal stage: `with span("gemini.plan"): ...`.
+
+    Works around awaits as well as blocking calls; the cost is two
+    perf_counter() calls and a histogram update.
+    """
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, time.perf_counter() - self.started, exc_type is not None)
+        return False
+
+
+def timed(stage: str):
+    """Decorator form of span() for coroutine functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(stage):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records every Mongo command as a "mongo.<command>" stage.
+
+    Motor runs pymongo on a thread pool but copies the caller's context,
+    so commands still count towards the request that issued them.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record(f"mongo.{event.command_name}", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record(f"mongo.{event.command_name}", event.duration_micros / 1e6, error=True)
+
+
+def server_timing(timings: Dict[str, list], total: float) -> str:
+    parts = [
+        f'{name};dur={seconds * 1000:.1f};desc="{calls} calls"'
+        for name, (seconds, calls) in sorted(timings.items())
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def route_label(scope) -> str:
+    """Path template of the matched route, rebuilt from the path parameters.
+
+    Works the same for routes on the app and on included routers, whose
+    route objects only know the path below their prefix.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    params = {str(value): name for name, value in (scope.get("path_params") or {}).items()}
+    if not params:
+        return scope["path"]
+    return "/".join(f"{{{params[part]}}}" if part in params else part for part in scope["path"].split("/"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight count and status per route.
+
+    Routes are labelled by their path template ("/api/itineraries/{itinerary_id}")
+    so label cardinality stays bounded; unmatched paths share one label.
+    With SERVER_TIMING_ENABLED the response carries a Server-Timing header
+    with the stage totals recorded up to the start of the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: Dict[str, list] = {}
+        token = _timings.set(timings)
+        status = 500
+        http_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    header = server_timing(timings, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = route_label(scope)
+            method = scope.get("method", "")
+            http_requests.inc(method, path, str(status))
+            http_duration.observe(time.perf_counter() - started, method, path)
+            http_in_flight.dec()
+            _timings.reset(token)
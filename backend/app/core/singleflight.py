@@ -0,0 +1,79 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.core.metrics import REGISTRY, Counter
+
+singleflight_calls = REGISTRY.register(Counter(
+    "singleflight_calls_total",
+    "Calls through a single-flight group; result=\"shared\" are calls saved by joining one in flight",
+    ("group", "result"),
+))
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False  # Cancelled by its last waiter
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one.
+
+    `await group.do(key, fn, *args)` runs `fn(*args)` unless a call with the
+    same key is already in flight, in which case it waits for that one.
+
+    - Nothing is cached: the key is dropped as soon as the call finishes,
+      so the next caller starts a fresh call, and an exception is raised
+      to the callers waiting at the time and then forgotten.
+    - The call runs in its own task. A caller that is cancelled stops
+      waiting without affecting the others; the call itself is cancelled
+      only once every caller waiting for it has gone.
+    - Results are shared. Pass `clone` (e.g. copy.deepcopy) when callers
+      may mutate what they get; the caller that started the call gets the
+      original.
+    - The task runs in the first caller's context, so request-scoped
+      timings and logs are attributed to that request.
+    """
+
+    def __init__(self, name: str, clone: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.clone = clone
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        flight = self._flights.get(key)
+        if flight is not None and flight.task is task:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        flight = self._flights.get(key)
+        # A finished or abandoned call may linger until its done callback
+        # runs; never hand out its outcome
+        leader = flight is None or flight.task.done() or flight.abandoned
+        if leader:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            flight = self._flights[key] = _Flight(task)
+            task.add_done_callback(lambda t: self._finished(key, t))
+        singleflight_calls.inc(self.name, "leader" if leader else "shared")
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.abandoned = True
+                flight.task.cancel()
+                singleflight_calls.inc(self.name, "cancelled")
+            raise
+        finally:
+            flight.waiters -= 1
+
+        if not leader and self.clone is not None:
+            return self.clone(result)
+        return result
+
+    def in_flight(self) -> int:
+        return len(self._flights)
@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.metrics import MongoCommandListener
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -15,10 +16,33 @@ async def connect_to_mongo():
         logger.warning("MONGODB_URI not set in environment")
         return
 
-    db.client = AsyncIOMotorClient(mongo_uri)
+    listeners = [MongoCommandListener()] if settings.METRICS_ENABLED else []
+    db.client = AsyncIOMotorClient(mongo_uri, event_listeners=listeners)
     logger.info("Connected to MongoDB")
 
 
+async def ensure_indexes():
+    """Create the secondary indexes the services rely on (idempotent)."""
+    if not db.client:
+        return
+
+    database = get_database()
+    await database.knowledge_articles.create_index("url")
+    await database.knowledge_articles.create_index("content_hash")
+    await database.knowledge_articles.create_index("minhash_bands")
+    await database.crawl_state.create_index("url", unique=True)
+    await database.ingest_items.create_index([("run_id", 1), ("url", 1)])
+    await database.ingest_items.create_index([("run_id", 1), ("position", 1)])
+    await database.ingest_items.create_index("expires_at", expireAfterSeconds=0)
+    await database.crawl_jobs.create_index(
+        "dedupe_key", unique=True, partialFilterExpression={"active": True}
+    )
+    await database.crawl_jobs.create_index([("status", 1), ("enqueued_at", 1)])
+    await database.geocode_cache.create_index("expires_at", expireAfterSeconds=0)
+    await database.travel_times.create_index("expires_at", expireAfterSeconds=0)
+    await database.ai_rate_limits.create_index("expires_at", expireAfterSeconds=0)
+
+
 async def close_mongo_connection():
     if db.client:
         db.client.close()
@@ -1,12 +1,18 @@
-from fastapi import FastAPI
+import hmac
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.database import close_mongo_connection, connect_to_mongo
-from app.routes import auth, itinerary, assistant
+from app.routes import auth, itinerary, assistant, system
 from app.scheduler import start_scheduler, shutdown_scheduler
 from app.core.config import settings
-from app.core.logging import setup_logging
+from app.core.http import close_http_client
+from app.core.metrics import REGISTRY, MetricsMiddleware
+from app.core.logging import RequestIdMiddleware, setup_logging
 from app.core.exceptions import setup_exception_handlers
+from app.services.gazetteer import start_gazetteer_load
 
 # Initialize logging
 setup_logging()
@@ -14,9 +20,11 @@ setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    start_gazetteer_load()
     start_scheduler()
     yield
     shutdown_scheduler()
+    await close_http_client()
     await close_mongo_connection()
 
 app = FastAPI(title="LazyTravelogue API", version="1.0.0", lifespan=lifespan)
@@ -33,13 +41,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
+# Wraps CORS, so its latency includes CORS handling
+app.add_middleware(MetricsMiddleware)
+# Registered last, so outermost: every log line of a request, metrics included, carries its id
+app.add_middleware(RequestIdMiddleware)
 
 app.include_router(auth.router, tags=["Authentication"])
 app.include_router(itinerary.router, tags=["Itineraries"], prefix="/api")
 app.include_router(assistant.router, tags=["AI Assistant"], prefix="/api")
+app.include_router(system.router, tags=["System"], prefix="/api")
 
 
 @app.get("/")
 async def root():
     return {"message": "LazyTravelogue API is running"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    # Unauthenticated metrics (route names, error rates) only in development
+    if not settings.METRICS_ENABLED or (settings.is_production and not settings.METRICS_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        (authorization or "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
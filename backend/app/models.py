@@ -31,6 +31,8 @@ class Location(BaseModel):
     description: Optional[str] = None
     transitDetails: Optional[List[Dict[str, Any]]] = None
     alternatives: Optional[List[Dict[str, Any]]] = None
+    placeId: Optional[str] = None  # Google Places id when picked from search or the map
+    coordsSource: Optional[str] = None  # "geocoder", "ai" or "default" for generated plans
 
 class Day(BaseModel):
     id: str = Field(default_factory=lambda: str(ObjectId()))
@@ -87,6 +89,10 @@ class KnowledgeArticle(BaseModel):
     title: str
     content_chunk: str
     embedding: Optional[List[float]] = None # Vector Search
+    embedding_scale: Optional[float] = None # int8 storage only
+    content_hash: Optional[str] = None
+    minhash: Optional[List[int]] = None
+    minhash_bands: Optional[List[str]] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     model_config = ConfigDict(
@@ -100,3 +106,13 @@ class KnowledgeArticle(BaseModel):
             }
         }
     )
+
+class CrawlState(BaseModel):
+    url: str
+    lastmod: Optional[datetime] = None # From the sitemap
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None # HTTP Last-Modified header
+    content_hash: Optional[str] = None
+    chunk_count: int = 0
+    last_crawled_at: Optional[datetime] = None # Last time content was (re)indexed
+    last_checked_at: datetime = Field(default_factory=datetime.utcnow)
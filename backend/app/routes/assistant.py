@@ -2,7 +2,9 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from app.auth import get_current_user
+from app.core.config import settings
 from app.models import TokenData
+from app.services.admission import admit
 from app.services.ai_service import AIService
 
 router = APIRouter()
@@ -22,11 +24,12 @@ async def chat_with_ai(
 ):
     history_dicts = [msg.model_dump() for msg in request.history]
     
-    result = await AIService.get_chat_response(
-        message=request.message,
-        history=history_dicts,
-        context=request.context
-    )
+    async with admit(user.user_id):
+        result = await AIService.get_chat_response(
+            message=request.message,
+            history=history_dicts,
+            context=request.context
+        )
     
     if "error" in result:
         raise HTTPException(status_code=503, detail=result["error"])
@@ -42,14 +45,15 @@ class GeneratePlanRequest(BaseModel):
 async def generate_plan(
     request: GeneratePlanRequest, user: TokenData = Depends(get_current_user)
 ):
-    try:
-        plan_data = await AIService.generate_trip_plan(
-            request.destination, 
-            request.days, 
-            request.preferences or ""
-        )
-        return plan_data
+    async with admit(user.user_id, cost=settings.AI_PLAN_COST):
+        try:
+            plan_data = await AIService.generate_trip_plan(
+                request.destination, 
+                request.days, 
+                request.preferences or ""
+            )
+            return plan_data
 
-    except Exception as e:
-        print(f"Plan Gen Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            print(f"Plan Gen Error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,5 @@
 from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
-from google.oauth2 import id_token
-from google.auth.transport import requests
 from app.database import get_database
 from app.models import User
 from app.auth import create_access_token
@@ -19,6 +17,9 @@ class GoogleAuthRequest(BaseModel):
 @router.post("/auth/google")
 async def google_login(request: GoogleAuthRequest, response: Response):
     token = request.credential
+    # google-auth pulls in `requests`; only login needs it, so skip it at startup
+    from google.oauth2 import id_token
+    from google.auth.transport import requests
 
     try:
         id_info = id_token.verify_oauth2_token(token, requests.Request(), CLIENT_ID)
@@ -66,7 +67,7 @@ async def google_login(request: GoogleAuthRequest, response: Response):
         logger.warning("Invalid Google Token provided")
         raise HTTPException(status_code=401, detail="Invalid Google Token")
     except Exception as e:
-        logger.error(f"Auth Error: {e}")
+        logger.error("Auth Error: %s", e)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 @router.post("/auth/logout")
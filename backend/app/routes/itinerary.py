@@ -1,12 +1,50 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
+from pydantic import BaseModel
 from typing import List, Optional
-from app.models import Itinerary, TokenData, ItineraryUpdate
+from app.models import Itinerary, TokenData, ItineraryUpdate, Location
 from app.auth import verify_token, get_current_user
 from app.services.itinerary_service import ItineraryService
+from app.services.travel_time_service import (
+    MAX_MATRIX_POINTS,
+    MAX_REQUEST_MATRIX_POINTS,
+    TRAVEL_MODES,
+    TravelTimeService,
+)
 
 router = APIRouter()
 
 
+class RouteOptimizeRequest(BaseModel):
+    activities: List[Location]
+    start_time: Optional[str] = "09:00"
+    fixed_start: bool = True
+    fixed_end: bool = True
+
+
+class RoutePoint(BaseModel):
+    lat: float
+    lng: float
+    transportMode: Optional[str] = None  # Mode of the leg leaving this point
+
+
+class TravelTimeRequest(BaseModel):
+    points: List[RoutePoint]
+    mode: str = "DRIVING"
+    legs_only: bool = False  # Only consecutive legs instead of the full matrix
+
+
+class DistributeRequest(BaseModel):
+    num_days: Optional[int] = None  # Defaults to the itinerary's day count
+    include_scheduled: bool = False  # Also redistribute activities already on days
+    apply: bool = False  # Save the proposed days and empty the pocket list
+
+
+class DayOptimizeRequest(BaseModel):
+    fixed_start: bool = True
+    fixed_end: bool = True
+    apply: bool = False  # Save the new order to the itinerary
+
+
 @router.get("/itineraries", response_model=List[Itinerary])
 async def get_itineraries(user: TokenData = Depends(get_current_user)):
     return await ItineraryService.get_all_by_user(user.user_id)
@@ -54,6 +92,67 @@ async def delete_itinerary(
     return {"message": "Itinerary deleted"}
 
 
+@router.post("/route/optimize")
+async def optimize_route(
+    request: RouteOptimizeRequest, user: TokenData = Depends(get_current_user)
+):
+    return await ItineraryService.optimize_activities(
+        [a.model_dump() for a in request.activities],
+        request.start_time,
+        request.fixed_start,
+        request.fixed_end,
+    )
+
+
+@router.post("/route/travel-times")
+async def get_travel_times(
+    request: TravelTimeRequest, user: TokenData = Depends(get_current_user)
+):
+    modes = [p.transportMode or request.mode for p in request.points]
+    if any(mode not in TRAVEL_MODES for mode in modes + [request.mode]):
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(TRAVEL_MODES)}")
+    limit = MAX_MATRIX_POINTS if request.legs_only else MAX_REQUEST_MATRIX_POINTS
+    if len(request.points) > limit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {limit} points per request" + ("" if request.legs_only else " (use legs_only for longer routes)"),
+        )
+
+    points = [(p.lat, p.lng) for p in request.points]
+    if request.legs_only:
+        return {"legs": await TravelTimeService.route_legs(points, modes)}
+    return await TravelTimeService.matrix(points, request.mode)
+
+
+@router.post("/itineraries/{itinerary_id}/days/{day_id}/optimize")
+async def optimize_itinerary_day(
+    itinerary_id: str,
+    day_id: str,
+    request: Optional[DayOptimizeRequest] = None,
+    user: TokenData = Depends(get_current_user),
+):
+    request = request or DayOptimizeRequest()
+    return await ItineraryService.optimize_day_route(
+        itinerary_id, user.user_id, day_id,
+        request.fixed_start, request.fixed_end, request.apply,
+    )
+
+
+@router.post("/itineraries/{itinerary_id}/distribute")
+async def distribute_pocket_list(
+    itinerary_id: str,
+    request: Optional[DistributeRequest] = None,
+    user: TokenData = Depends(get_current_user),
+):
+    request = request or DistributeRequest()
+    if request.num_days is not None and not 1 <= request.num_days <= 60:
+        raise HTTPException(status_code=400, detail="num_days must be between 1 and 60")
+    return await ItineraryService.distribute_pocket_list(
+        itinerary_id, user.user_id, request.num_days,
+        request.include_scheduled, request.apply,
+    )
+
+
 @router.put("/itineraries/{itinerary_id}/share", response_model=Itinerary)
 async def share_itinerary(
     itinerary_id: str,
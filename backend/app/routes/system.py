@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from typing import Optional
+from app.auth import require_admin
+from app.services import admission
+from app.services.crawl_queue import JOB_KINDS, enqueue_crawl_job, get_job, queue_status
+from app.services.geocode_cache import geocode_cache
+from app.services.gazetteer import get_gazetteer
+from app.services.travel_time_service import TravelTimeService
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+class CrawlJobRequest(BaseModel):
+    kind: str = "crawl"
+    url: Optional[str] = None
+    max_pages: Optional[int] = None
+    run_id: Optional[str] = None
+
+@router.post("/system/crawl-jobs", status_code=202)
+async def create_crawl_job(request: CrawlJobRequest):
+    if request.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(JOB_KINDS)}")
+    if request.kind == "crawl" and not request.url:
+        raise HTTPException(status_code=400, detail="url is required for crawl jobs")
+    if request.kind == "resume" and not request.run_id:
+        raise HTTPException(status_code=400, detail="run_id is required for resume jobs")
+
+    return await enqueue_crawl_job(
+        request.kind, url=request.url, max_pages=request.max_pages, run_id=request.run_id
+    )
+
+@router.get("/system/crawl-jobs")
+async def get_crawl_queue_status(recent: int = 10):
+    return await queue_status(min(max(recent, 0), 100))
+
+@router.get("/system/crawl-jobs/{job_id}")
+async def get_crawl_job(job_id: str):
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found")
+    return job
+
+@router.get("/system/geocode-cache")
+async def get_geocode_cache_stats():
+    gazetteer = get_gazetteer()
+    return {
+        **geocode_cache.report(),
+        "gazetteer": gazetteer.report() if gazetteer else None,
+    }
+
+@router.get("/system/travel-time-cache")
+async def get_travel_time_cache_stats():
+    return TravelTimeService.report()
+
+@router.get("/system/ai-admission")
+async def get_ai_admission_stats():
+    return admission.report()
@@ -1,27 +1,35 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from app.services.crawler import crawl_and_index
+from app.services.crawl_queue import enqueue_crawl_job
+from app.core.config import settings
 from app.core.logging import logger
 
-scheduler = AsyncIOScheduler()
+# Created by start_scheduler(); APScheduler is only imported where it runs
+scheduler = None
 
 async def scheduled_crawl_job():
-    logger.info("Running scheduled crawler...")
-    targets = [
-        "https://bunnyann.tw/post-sitemap.xml"
-    ] 
-    for url in targets:
-        try:
-            await crawl_and_index(url)
-        except Exception as e:
-            logger.error(f"Scheduled crawl failed for {url}: {e}")
+    # The API only queues the crawl; `python -m app.worker` runs it. Every
+    # replica fires this, but a queued scheduled job is reused, not duplicated.
+    try:
+        job = await enqueue_crawl_job("scheduled")
+        logger.info("Queued scheduled crawl job %s (%s)", job['id'], job['status'])
+    except Exception as e:
+        logger.error("Could not queue scheduled crawl: %s", e)
 
 def start_scheduler():
+    global scheduler
+    if not settings.SCHEDULER_ENABLED:
+        # Serverless instances are frozen between requests, so an interval
+        # job would never fire; queue scheduled crawls from a cron instead
+        logger.info("Scheduler disabled.")
+        return
+    if scheduler is None:
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        scheduler = AsyncIOScheduler()
     if not scheduler.running:
         scheduler.add_job(scheduled_crawl_job, 'interval', hours=24)
         scheduler.start()
         logger.info("Scheduler started.")
 
 def shutdown_scheduler():
-    if scheduler.running:
+    if scheduler is not None and scheduler.running:
         scheduler.shutdown()
         logger.info("Scheduler shutdown.")
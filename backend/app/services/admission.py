@@ -0,0 +1,237 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from app.database import db as mongo, get_database
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import REGISTRY, Counter, Gauge
+
+# Optimistic-concurrency attempts on a user's bucket before letting the call through
+MONGO_RETRIES = 3
+MAX_RETRY_AFTER = 60
+
+admission_rejected = REGISTRY.register(Counter(
+    "ai_admission_rejected_total", "AI requests turned away with 429", ("reason",)
+))
+admission_active = REGISTRY.register(Gauge(
+    "ai_admission_active", "AI requests being served"
+))
+admission_waiting = REGISTRY.register(Gauge(
+    "ai_admission_waiting", "AI requests waiting for a slot"
+))
+
+
+def too_many_requests(detail: str, retry_after: float, reason: str) -> HTTPException:
+    admission_rejected.inc(reason)
+    seconds = min(MAX_RETRY_AFTER, max(1, math.ceil(retry_after)))
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(seconds)})
+
+
+def gcra(tat: float, now: float, cost: int, rate_per_minute: float, burst: int) -> Tuple[bool, float, float]:
+    """One token-bucket decision in GCRA form.
+
+    The bucket is kept as a single number, the theoretical arrival time
+    (TAT): when the bucket would be full again. A request of `cost` tokens
+    is allowed if that pushes the TAT no more than `burst` tokens ahead of
+    now. Returns (allowed, new_tat, retry_after_seconds).
+    """
+    interval = 60.0 / rate_per_minute
+    new_tat = max(tat, now) + cost * interval
+    allow_at = new_tat - burst * interval
+    if allow_at > now:
+        return False, tat, allow_at - now
+    return True, new_tat, 0.0
+
+
+class RateLimiter:
+    """Per-user token buckets, in Mongo (`ai_rate_limits`) when connected.
+
+    Each user is one document holding the bucket's TAT, updated with a
+    compare-and-set so replicas racing on the same user cannot both spend
+    the last token. Without Mongo, or if it fails, buckets fall back to
+    this process so the endpoints keep working.
+    """
+
+    def __init__(self):
+        self._local: Dict[str, float] = {}
+
+    def _check_local(self, user_id: str, cost: int, now: float) -> Tuple[bool, float]:
+        allowed, tat, retry_after = gcra(
+            self._local.get(user_id, 0.0), now, cost, settings.AI_RATE_PER_MINUTE, settings.AI_RATE_BURST
+        )
+        self._local[user_id] = tat
+        return allowed, retry_after
+
+    async def _check_mongo(self, user_id: str, cost: int) -> Tuple[bool, float]:
+        collection = get_database().ai_rate_limits
+        for _ in range(MONGO_RETRIES):
+            now = time.time()
+            doc = await collection.find_one({"_id": user_id})
+            old_tat = doc["tat"] if doc else None
+            allowed, tat, retry_after = gcra(
+                old_tat or 0.0, now, cost, settings.AI_RATE_PER_MINUTE, settings.AI_RATE_BURST
+            )
+            if not allowed:
+                return False, retry_after
+            # A full bucket needs no document; the TTL index clears idle users
+            fields = {"tat": tat, "expires_at": datetime.utcfromtimestamp(tat) + timedelta(minutes=1)}
+            if doc is None:
+                try:
+                    await collection.insert_one({"_id": user_id, **fields})
+                    return True, 0.0
+                except DuplicateKeyError:
+                    continue
+            result = await collection.update_one({"_id": user_id, "tat": old_tat}, {"$set": fields})
+            if result.matched_count:
+                return True, 0.0
+        # Lost every race: the user is firing requests in parallel, which is
+        # what the limit is for
+        return False, 60.0 / settings.AI_RATE_PER_MINUTE
+
+    async def check(self, user_id: str, cost: int = 1) -> Tuple[bool, float]:
+        """Spend `cost` tokens; returns (allowed, seconds until it would be)."""
+        if mongo.client:
+            try:
+                return await self._check_mongo(user_id, cost)
+            except Exception as e:
+                logger.warning("Rate limit lookup failed, using local buckets: %s", e)
+        return self._check_local(user_id, cost, time.time())
+
+
+class FairQueue:
+    """Concurrency ceiling with a bounded, per-user round-robin wait queue.
+
+    Up to `AI_MAX_CONCURRENCY` requests run at once. Beyond that requests
+    wait, and a freed slot goes to the next *user* in turn rather than the
+    next request, so someone with two queued regenerates cannot starve a
+    user waiting with one. A request is turned away instead of queued when
+    the queue or the user's share of it is full, and gives up after
+    `AI_QUEUE_TIMEOUT_SECONDS`.
+    """
+
+    def __init__(self):
+        self.active = 0
+        # user -> waiting futures; the dict's order is the round-robin order
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self._service_seconds = 5.0  # running average, for Retry-After
+
+    def _estimate_wait(self, position: int) -> float:
+        return self._service_seconds * (position / max(1, settings.AI_MAX_CONCURRENCY) + 1)
+
+    def check(self, user_id: str):
+        """Raise the 429 acquire() would, without waiting (to avoid charging a doomed request)."""
+        if self.active < settings.AI_MAX_CONCURRENCY and not self._queued:
+            return
+        if self._queued >= settings.AI_QUEUE_MAX:
+            raise too_many_requests("AI service is busy, please retry shortly", self._estimate_wait(self._queued), "queue_full")
+        if len(self._waiting.get(user_id, ())) >= settings.AI_QUEUE_PER_USER:
+            raise too_many_requests(
+                "Too many AI requests in progress for this user", self._estimate_wait(self._queued), "user_queue_full"
+            )
+
+    def _remove(self, user_id: str, future: asyncio.Future):
+        waiters = self._waiting.get(user_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiting[user_id]
+        admission_waiting.set(self._queued)
+
+    async def acquire(self, user_id: str):
+        self.check(user_id)
+        if self.active < settings.AI_MAX_CONCURRENCY and not self._queued:
+            self.active += 1
+            admission_active.set(self.active)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(future)
+        self._queued += 1
+        admission_waiting.set(self._queued)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), settings.AI_QUEUE_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            self._remove(user_id, future)
+            if future.done() and not future.cancelled():
+                # The slot was handed over as we gave up; pass it on
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise too_many_requests(
+                "AI service is busy, please retry shortly", self._estimate_wait(self._queued), "queue_timeout"
+            )
+
+    def release(self, service_seconds: Optional[float] = None):
+        if service_seconds is not None:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * service_seconds
+        # Hand the slot to the first user in turn, who then goes to the back
+        while self._waiting:
+            user_id, waiters = self._waiting.popitem(last=False)
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiting[user_id] = waiters
+            if not future.done():
+                future.set_result(None)
+                admission_waiting.set(self._queued)
+                return
+        self.active -= 1
+        admission_active.set(self.active)
+        admission_waiting.set(self._queued)
+
+    def report(self) -> Dict:
+        return {
+            "active": self.active,
+            "waiting": self._queued,
+            "waiting_users": len(self._waiting),
+            "avg_service_seconds": round(self._service_seconds, 2),
+        }
+
+
+rate_limiter = RateLimiter()
+ai_queue = FairQueue()
+
+
+@asynccontextmanager
+async def admit(user_id: str, cost: int = 1):
+    """Gate one AI request: `async with admit(user.user_id): ...`.
+
+    Raises a 429 with Retry-After when the user is over their rate or the
+    queue is saturated; otherwise holds a concurrency slot for the block.
+    """
+    ai_queue.check(user_id)
+    allowed, retry_after = await rate_limiter.check(user_id, cost)
+    if not allowed:
+        logger.info("AI request from %s rate limited, retry in %.0fs", user_id, retry_after)
+        raise too_many_requests("AI request limit reached, please slow down", retry_after, "rate")
+
+    await ai_queue.acquire(user_id)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ai_queue.release(time.perf_counter() - started)
+
+
+def report() -> Dict:
+    return {
+        **ai_queue.report(),
+        "limits": {
+            "rate_per_minute": settings.AI_RATE_PER_MINUTE,
+            "burst": settings.AI_RATE_BURST,
+            "max_concurrency": settings.AI_MAX_CONCURRENCY,
+            "queue_max": settings.AI_QUEUE_MAX,
+        },
+    }
@@ -1,17 +1,24 @@
+import asyncio
+import copy
 import json
 from typing import List, Dict, Any, Optional
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from app.services.rag_service import search_knowledge_base
+from app.services.context_packer import pack_context
+from app.services.geocode_cache import normalize_place_name
 from app.services.geocoding_service import GeocodingService
+from app.services.route_optimizer import optimize_plan
 from app.core.config import settings
+from app.core.genai import get_genai
+from app.core.singleflight import SingleFlight
 from app.core.logging import logger
+from app.core.metrics import span
+
+# Identical plan requests in flight (a shared suggestion clicked by a whole
+# group) wait for one generation; each caller gets its own copy to edit
+_plans = SingleFlight("trip_plan", clone=copy.deepcopy)
 
 class AIService:
     _llm_api_key = settings.LLM_API_KEY
-    
-    if _llm_api_key:
-        genai.configure(api_key=_llm_api_key)
 
     SYSTEM_PROMPT = """
 你是 LazyTravelogue 的「旅遊小精靈」，一個專業、友善且富有創意的旅遊規劃 AI 助理。
@@ -55,12 +62,21 @@ class AIService:
         kb_text = ""
         sources = []
         if kb_results:
-            kb_text = "\n\n## 📚 參考知識庫\n"
             for doc in kb_results:
-                kb_text += f"**{doc['title']}**\n{doc['content']}\n\n"
                 if not any(s['url'] == doc['url'] for s in sources):
                     sources.append({"title": doc['title'], "url": doc['url']})
 
+            # Merge overlapping chunks and keep only query-relevant sentences
+            packed = pack_context(
+                message,
+                kb_results,
+                settings.RAG_CONTEXT_TOKEN_BUDGET,
+                settings.RAG_MMR_LAMBDA,
+            )
+            kb_text = "\n\n## 📚 參考知識庫\n"
+            for doc in packed:
+                kb_text += f"**{doc['title']}**\n{doc['content']}\n\n"
+
         # 2. Construct System Prompt
         full_system_prompt = cls.SYSTEM_PROMPT
         if context:
@@ -75,6 +91,9 @@ class AIService:
         if kb_text:
             full_system_prompt += kb_text
 
+        genai = get_genai()
+        HarmCategory, HarmBlockThreshold = genai.types.HarmCategory, genai.types.HarmBlockThreshold
+
         model = genai.GenerativeModel(
             model_name="gemini-2.5-flash",
             system_instruction=full_system_prompt,
@@ -105,9 +124,11 @@ class AIService:
             try:
                 plan_data = await cls.generate_trip_plan(destination, days, preferences)
                 chat = model.start_chat(history=gemini_history)
-                response = chat.send_message(
-                    f"使用者想規劃 {destination} 的 {days} 天行程。請用友善的方式告訴他你已經幫他規劃好了，簡單介紹一下行程亮點，並邀請他查看或匯入行程。不要列出完整行程細節。"
-                )
+                with span("gemini.plan_reply"):
+                    response = await asyncio.to_thread(
+                        chat.send_message,
+                        f"使用者想規劃 {destination} 的 {days} 天行程。請用友善的方式告訴他你已經幫他規劃好了，簡單介紹一下行程亮點，並邀請他查看或匯入行程。不要列出完整行程細節。"
+                    )
                 
                 return {
                     "reply": response.text if response.text else f"好的！我已經為您規劃了 {destination} 的 {days} 天行程 ✨",
@@ -120,11 +141,12 @@ class AIService:
                     ]
                 }
             except Exception as plan_error:
-                logger.error(f"Auto-plan generation failed: {plan_error}")
+                logger.error("Auto-plan generation failed: %s", plan_error)
 
         # 5. Regular Chat
         chat = model.start_chat(history=gemini_history)
-        response = chat.send_message(message)
+        with span("gemini.chat"):
+            response = await asyncio.to_thread(chat.send_message, message)
 
         if response.text:
             suggestions = await cls.generate_suggestions(message, response.text, context)
@@ -162,8 +184,9 @@ class AIService:
 }}
 """
         try:
-            model = genai.GenerativeModel("gemini-2.5-flash")
-            response = model.generate_content(detection_prompt)
+            model = get_genai().GenerativeModel("gemini-2.5-flash")
+            with span("gemini.intent"):
+                response = await asyncio.to_thread(model.generate_content, detection_prompt)
             
             text = response.text
             if "```json" in text:
@@ -179,7 +202,7 @@ class AIService:
                 "preferences": result.get("preferences", "")
             }
         except Exception as e:
-            logger.error(f"Intent detection error: {e}")
+            logger.error("Intent detection error: %s", e)
             return {"is_planning": False, "destination": "", "days": 3, "preferences": ""}
 
     @classmethod
@@ -223,7 +246,12 @@ class AIService:
     @classmethod
     async def generate_trip_plan(cls, destination: str, days: int = 3, preferences: str = "") -> Dict:
         """Generate a complete trip plan."""
-        model = genai.GenerativeModel("gemini-2.5-flash")
+        key = (normalize_place_name(destination), days, " ".join(preferences.split()))
+        return await _plans.do(key, cls._generate_trip_plan, destination, days, preferences)
+
+    @classmethod
+    async def _generate_trip_plan(cls, destination: str, days: int, preferences: str) -> Dict:
+        model = get_genai().GenerativeModel("gemini-2.5-flash")
         
         prompt = f"""
 你是一個創意豐富的旅遊規劃師。請為使用者規劃一個前往 {destination} 的 {days} 天行程。
@@ -258,7 +286,10 @@ class AIService:
     ]
 }}
 """
-        response = model.generate_content(prompt)
+        with span("gemini.plan"):
+            # The SDK call blocks; in a thread it leaves the loop free for
+            # other requests, including callers joining this plan
+            response = await asyncio.to_thread(model.generate_content, prompt)
         text = response.text
         
         if "```json" in text:
@@ -269,8 +300,14 @@ class AIService:
         plan_data = json.loads(text)
         
         try:
-            plan_data = await GeocodingService.geocode_itinerary_activities(plan_data)
+            plan_data = await GeocodingService.geocode_itinerary_activities(plan_data, destination)
         except Exception as e:
-            logger.error(f"Geocoding error: {e}")
+            logger.error("Geocoding error: %s", e)
+
+        if settings.ROUTE_OPTIMIZE_GENERATED:
+            try:
+                plan_data = optimize_plan(plan_data)
+            except Exception as e:
+                logger.error("Route optimization error: %s", e)
         
         return plan_data
@@ -0,0 +1,226 @@
+import re
+from typing import TYPE_CHECKING, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only the crawler walks the DOM; the API imports this module for the
+    # sentence helpers and should not pay for BeautifulSoup/lxml
+    from bs4 import Tag
+
+# Blocks are the unit of structure we keep from the page: a heading updates
+# the section context, everything else is text to pack into chunks.
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+BLOCK_TAGS = {"p", "li", "blockquote", "pre", "figcaption", "td", "th", "dt", "dd"}
+CONTAINER_TAGS = {"ul", "ol", "table", "tbody", "thead", "tr", "dl", "figure"}
+
+DEFAULT_MAX_TOKENS = 500
+DEFAULT_OVERLAP_SENTENCES = 1
+
+# Split after CJK / ASCII sentence enders, keeping closing quotes/brackets
+_SENTENCE_RE = re.compile(r"[^。！？!?；;\n]+[。！？!?；;]*[」』）)\"']*|\n+")
+_CJK_CHAR_RE = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_PARAGRAPH = "\n"
+
+
+class Block(NamedTuple):
+    kind: str  # "heading" or "text"
+    text: str
+    level: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, ~4 characters per token otherwise."""
+    cjk = len(_CJK_CHAR_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.findall(text) if s.strip()]
+
+
+def iter_blocks(root: "Tag") -> Iterator[Block]:
+    """Walk the DOM of the content area and yield headings and text blocks."""
+    from bs4 import NavigableString, Tag
+
+    buffer: List[str] = []
+
+    def flush():
+        text = " ".join(buffer).strip()
+        buffer.clear()
+        return Block("text", text) if text else None
+
+    for node in root.children:
+        if isinstance(node, NavigableString):
+            if node.strip():
+                buffer.append(node.strip())
+            continue
+        if not isinstance(node, Tag):
+            continue
+
+        name = node.name.lower()
+        if name in HEADING_TAGS or name in BLOCK_TAGS or name in CONTAINER_TAGS or _has_block_children(node):
+            pending = flush()
+            if pending:
+                yield pending
+
+        if name in HEADING_TAGS:
+            text = node.get_text(" ", strip=True)
+            if text:
+                yield Block("heading", text, int(name[1]))
+        elif name in BLOCK_TAGS:
+            text = node.get_text(" ", strip=True)
+            if text:
+                prefix = "• " if name == "li" else ""
+                yield Block("text", prefix + text)
+        elif name in CONTAINER_TAGS or _has_block_children(node):
+            yield from iter_blocks(node)
+        else:
+            # Inline element (a, strong, span...) inside loose text
+            text = node.get_text(" ", strip=True)
+            if text:
+                buffer.append(text)
+
+    pending = flush()
+    if pending:
+        yield pending
+
+
+def _has_block_children(node: "Tag") -> bool:
+    for child in node.find_all(True, recursive=False):
+        name = child.name.lower()
+        if name in HEADING_TAGS or name in BLOCK_TAGS or name in CONTAINER_TAGS or name in ("div", "section", "article"):
+            return True
+    return False
+
+
+def chunk_blocks(
+    blocks: Iterable[Block],
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap_sentences: int = DEFAULT_OVERLAP_SENTENCES,
+    min_chars: int = 100,
+) -> Iterator[str]:
+    """Pack blocks into token-budgeted chunks, lazily.
+
+    Chunks break only on sentence boundaries, start with the heading path of
+    the section they belong to, and carry the last `overlap_sentences`
+    sentences of the previous chunk in the same section for continuity.
+    Sections shorter than `min_chars` (an address, opening hours) are
+    carried into the next chunk with their own heading path rather than
+    dropped; only what is left at the very end may be too short to keep.
+    Chunks and short sections already seen on the page (themes repeating a
+    block) are skipped.
+    """
+    headings: List[Optional[str]] = [None] * 6
+    sentences: List[str] = []
+    used = 0
+    carried: List[str] = []  # Short sections waiting to share a chunk
+    carried_tokens = carried_chars = 0
+    emitted, sections = set(), set()  # Already seen on this page
+
+    def context() -> str:
+        return " > ".join(h for h in headings if h)
+
+    def section() -> Tuple[str, str]:
+        body = join_sentences(sentences).strip()
+        ctx = context()
+        return body, (f"{ctx}\n{body}" if ctx and body else body)
+
+    def pack(text: Optional[str] = None) -> List[str]:
+        """Chunks for `text` (if any) together with the carried sections."""
+        nonlocal carried, carried_tokens, carried_chars
+        out = []
+        if carried and text and carried_tokens + estimate_tokens(text) > max_tokens:
+            out.append(_PARAGRAPH.join(carried))
+            carried = []
+        parts = carried + ([text] if text else [])
+        if parts:
+            out.append(_PARAGRAPH.join(parts))
+        carried, carried_tokens, carried_chars = [], 0, 0
+        fresh = [chunk for chunk in out if chunk not in emitted]
+        emitted.update(fresh)
+        return fresh
+
+    def end_section() -> List[str]:
+        nonlocal carried_tokens, carried_chars
+        body, text = section()
+        if not body or text in sections:
+            return []
+        sections.add(text)
+        if len(body) >= min_chars:
+            return pack(text)
+        tokens = estimate_tokens(text)
+        chunks = pack() if carried_tokens + tokens > max_tokens else []
+        carried.append(text)
+        carried_tokens += tokens
+        carried_chars += len(body)
+        return chunks
+
+    for block in blocks:
+        if block.kind == "heading":
+            yield from end_section()
+            sentences, used = [], 0
+            level = max(1, min(block.level, 6))
+            headings[level - 1] = block.text
+            for i in range(level, 6):
+                headings[i] = None
+            continue
+
+        budget = max(max_tokens - estimate_tokens(context()), 1)
+        for sentence in _fit_sentences(split_sentences(block.text), budget) + [_PARAGRAPH]:
+            cost = estimate_tokens(sentence)
+            if sentences and used + cost > budget:
+                yield from pack(section()[1])
+                kept = [s for s in sentences if s != _PARAGRAPH]
+                sentences = kept[-overlap_sentences:] if overlap_sentences else []
+                used = sum(estimate_tokens(s) for s in sentences)
+            if sentence == _PARAGRAPH and not sentences:
+                continue
+            sentences.append(sentence)
+            used += cost
+
+    yield from end_section()
+    if carried_chars >= min_chars:
+        yield from pack()
+
+
+def _fit_sentences(sentences: List[str], budget: int) -> List[str]:
+    """Hard-split the rare sentence that alone exceeds the budget."""
+    fitted = []
+    for sentence in sentences:
+        if estimate_tokens(sentence) <= budget:
+            fitted.append(sentence)
+            continue
+        # CJK text is ~1 token per char, other text ~4 chars per token
+        step = budget if _is_cjk_heavy([sentence]) else budget * 4
+        fitted.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+    return fitted
+
+
+def join_sentences(sentences: List[str]) -> str:
+    """Join sentences, adding a space only between non-CJK neighbours."""
+    out = ""
+    for sentence in sentences:
+        if out and out[-1] != _PARAGRAPH and sentence != _PARAGRAPH and not (
+            _CJK_CHAR_RE.match(out[-1]) or _CJK_CHAR_RE.match(sentence[0])
+            or out[-1] in "。！？；」』）"
+        ):
+            out += " "
+        out += sentence
+    return out
+
+
+def _is_cjk_heavy(sentences: List[str]) -> bool:
+    sample = "".join(sentences[:3])
+    return bool(sample) and len(_CJK_CHAR_RE.findall(sample)) * 2 >= len(sample)
+
+
+def window_chunks(text: str, chunk_size: int = 1500, overlap: int = 200) -> List[str]:
+    """The original fixed character window chunker, kept for comparison."""
+    chunks = []
+    current_pos = 0
+    while current_pos < len(text):
+        end_pos = min(current_pos + chunk_size, len(text))
+        chunk = text[current_pos:end_pos]
+        if len(chunk) > 100:
+            chunks.append(chunk)
+        current_pos += (chunk_size - overlap)
+    return chunks
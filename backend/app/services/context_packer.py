@@ -0,0 +1,103 @@
+from typing import Dict, List, Set
+
+from app.services.chunker import estimate_tokens, join_sentences, split_sentences
+from app.services.lexical_index import tokenize
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def merge_by_url(results: List[Dict]) -> List[Dict]:
+    """Merge retrieved chunks of the same article into one passage.
+
+    Overlapping windows and repeated section headings share sentences, so
+    the passage keeps each sentence once, in retrieval order.
+    """
+    passages: Dict[str, Dict] = {}
+    for rank, doc in enumerate(results):
+        url = doc.get("url", "#")
+        passage = passages.setdefault(url, {
+            "url": url,
+            "title": doc.get("title", "Unknown Source"),
+            "rank": rank,
+            "sentences": [],
+        })
+        seen = set(passage["sentences"])
+        for sentence in split_sentences(doc.get("content", "")):
+            if sentence not in seen:
+                seen.add(sentence)
+                passage["sentences"].append(sentence)
+    return list(passages.values())
+
+
+def mmr_order(passages: List[Dict], query_terms: Set[str], lambda_: float) -> List[Dict]:
+    """Order passages by Maximal Marginal Relevance over token bigram sets."""
+    for passage in passages:
+        passage["terms"] = set(tokenize("".join(passage["sentences"])))
+        # Blend retrieval rank with lexical overlap to the query
+        passage["relevance"] = 1.0 / (passage["rank"] + 1) + _jaccard(query_terms, passage["terms"])
+
+    selected: List[Dict] = []
+    remaining = list(passages)
+    while remaining:
+        best = max(
+            remaining,
+            key=lambda p: lambda_ * p["relevance"] - (1 - lambda_) * max(
+                (_jaccard(p["terms"], s["terms"]) for s in selected), default=0.0
+            ),
+        )
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+def pack_context(query: str, results: List[Dict], token_budget: int, lambda_: float = 0.7) -> List[Dict]:
+    """Turn retrieved chunks into compact, query-focused passages.
+
+    Chunks are merged per URL, ordered with MMR, and trimmed to the
+    sentences that share the most terms with the query until the token
+    budget is spent. Every source keeps at least its best sentence, so the
+    source list shown to the user does not change.
+    """
+    if not results:
+        return []
+
+    query_terms = set(tokenize(query))
+    passages = mmr_order(merge_by_url(results), query_terms, lambda_)
+
+    # Rank each passage's sentences by query overlap; keep the best one per passage up front
+    plans = []
+    used = 0
+    for passage in passages:
+        scored = sorted(
+            range(len(passage["sentences"])),
+            key=lambda i: len(query_terms & set(tokenize(passage["sentences"][i]))),
+            reverse=True,
+        )
+        keep = set(scored[:1])
+        used += sum(estimate_tokens(passage["sentences"][i]) for i in keep)
+        plans.append((passage, scored[1:], keep))
+
+    # Spend the rest of the budget in MMR order
+    for passage, candidates, keep in plans:
+        for i in candidates:
+            cost = estimate_tokens(passage["sentences"][i])
+            if used + cost > token_budget:
+                continue
+            keep.add(i)
+            used += cost
+
+    packed = []
+    for passage, _, keep in plans:
+        sentences = [passage["sentences"][i] for i in sorted(keep)]
+        if sentences:
+            packed.append({
+                "title": passage["title"],
+                "url": passage["url"],
+                "content": join_sentences(sentences),
+            })
+    return packed
+
@@ -0,0 +1,165 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from app.core.config import settings
+from app.core.logging import logger
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CrawlDisallowed(Exception):
+    """Raised when robots.txt forbids fetching a URL."""
+
+
+class HostThrottle:
+    """Token bucket limiting requests per second to a single host."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def slow_down(self, min_interval: float):
+        """Honor a robots.txt Crawl-delay if it is stricter than our rate."""
+        if min_interval > 0:
+            self.rate = min(self.rate, 1.0 / min_interval)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CrawlClient:
+    """Pooled HTTP/2 client with bounded concurrency and per-host politeness.
+
+    All crawler requests go through one keep-alive connection pool. A global
+    semaphore caps in-flight requests, each host gets its own token bucket
+    (slowed further by robots.txt Crawl-delay), and transient failures are
+    retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        rate_per_host: float = 2.0,
+        max_retries: int = 3,
+        timeout: float = 10.0,
+    ):
+        self.rate_per_host = rate_per_host
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._throttles: Dict[str, HostThrottle] = {}
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._robots_lock = asyncio.Lock()
+        self._client = httpx.AsyncClient(
+            http2=True,
+            headers=HEADERS,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=concurrency, max_keepalive_connections=concurrency
+            ),
+        )
+
+    def _throttle(self, host: str) -> HostThrottle:
+        if host not in self._throttles:
+            self._throttles[host] = HostThrottle(self.rate_per_host)
+        return self._throttles[host]
+
+    async def _robots_for(self, url: str) -> Optional[RobotFileParser]:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        async with self._robots_lock:
+            if origin in self._robots:
+                return self._robots[origin]
+
+            parser = None
+            try:
+                response = await self._client.get(f"{origin}/robots.txt")
+                if response.status_code == 200:
+                    parser = RobotFileParser()
+                    parser.parse(response.text.splitlines())
+                    delay = parser.crawl_delay(HEADERS['User-Agent'])
+                    if delay:
+                        self._throttle(parts.netloc).slow_down(float(delay))
+            except httpx.HTTPError as e:
+                logger.warning("Could not read robots.txt for %s: %s", origin, e)
+
+            self._robots[origin] = parser
+            return parser
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        robots = await self._robots_for(url)
+        if robots and not robots.can_fetch(HEADERS['User-Agent'], url):
+            raise CrawlDisallowed(f"robots.txt disallows {url}")
+
+        throttle = self._throttle(urlsplit(url).netloc)
+        for attempt in range(self.max_retries + 1):
+            await throttle.acquire()
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning("Fetch error for %s (%s), retrying", url, e)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else self._backoff(attempt)
+                logger.warning("HTTP %d for %s, retrying in %.1fs", response.status_code, url, delay)
+                await asyncio.sleep(delay)
+                continue
+            return response
+
+        return response
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return (2 ** attempt) + random.uniform(0, 1)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_client: Optional[CrawlClient] = None
+
+
+def get_crawl_client() -> CrawlClient:
+    """Return the process-wide crawl client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = CrawlClient(
+            concurrency=settings.CRAWL_CONCURRENCY,
+            rate_per_host=settings.CRAWL_RATE_PER_HOST,
+            max_retries=settings.CRAWL_MAX_RETRIES,
+        )
+    return _client
+
+
+async def close_crawl_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from app.database import ensure_indexes
+from app.services.crawler import crawl_and_index, resume_sitemap_crawl
+from app.services.ingest_pipeline import IngestCheckpoint
+from app.services.job_lease import JobLease
+from app.core.config import settings
+from app.core.logging import logger
+
+SCHEDULED_CRAWL_TARGETS = [
+    "https://bunnyann.tw/post-sitemap.xml"
+]
+SCHEDULED_CRAWL_LEASE = "scheduled_crawl"
+
+
+async def resume_unfinished_runs() -> List[Tuple[bool, str]]:
+    """Pick up runs another node left failed, interrupted or dead."""
+    stale_after = timedelta(seconds=settings.CRAWL_LEASE_TTL_SECONDS)
+    results = []
+    for run in await IngestCheckpoint.find_resumable(settings.CRAWL_RESUME_ATTEMPTS, stale_after):
+        logger.info("Resuming %s run %s from %s", run['status'], run['_id'], run.get('node'))
+        results.append(await resume_sitemap_crawl(run["_id"]))
+    return results
+
+
+async def run_scheduled_crawl(
+    targets: Optional[List[str]] = None, max_pages: Optional[int] = None
+) -> Optional[List[Tuple[bool, str]]]:
+    """Run the periodic crawl unless another node is already running it.
+
+    Every API process schedules this job and the GitHub Action calls it
+    too; the lease makes sure only one of them crawls at a time. Returns
+    None when the lease is held elsewhere. If the lease is lost mid-run the
+    crawl is cancelled and what finished so far is returned.
+    """
+    lease = JobLease(SCHEDULED_CRAWL_LEASE, settings.CRAWL_LEASE_TTL_SECONDS)
+    if not await lease.acquire():
+        logger.info("Scheduled crawl is running on another node, skipping")
+        return None
+
+    max_pages = settings.CRAWL_SCHEDULED_MAX_PAGES if max_pages is None else max_pages
+    results = []
+    try:
+        await ensure_indexes()
+        results.extend(await resume_unfinished_runs())
+        for url in targets or SCHEDULED_CRAWL_TARGETS:
+            try:
+                results.append(await crawl_and_index(url, max_pages=max_pages))
+            except Exception as e:
+                logger.error("Scheduled crawl failed for %s: %s", url, e)
+                results.append((False, str(e)))
+    except asyncio.CancelledError:
+        if not lease.lost:
+            raise
+        logger.warning("Scheduled crawl stopped: its lease was taken over by another node")
+        results.append((False, "Lease lost"))
+    finally:
+        await lease.release()
+    return results
@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.database import get_database
+from app.core.config import settings
+
+# Job kinds the worker knows how to run
+JOB_KINDS = ("crawl", "resume", "scheduled")
+
+
+def _serialize(job: Dict) -> Dict:
+    job = dict(job)
+    job["id"] = str(job.pop("_id"))
+    job.pop("active", None)
+    return job
+
+
+async def enqueue_crawl_job(
+    kind: str,
+    url: Optional[str] = None,
+    max_pages: Optional[int] = None,
+    run_id: Optional[str] = None,
+) -> Dict:
+    """Queue a job for the crawl worker, or return the identical queued one.
+
+    Jobs with the same kind and target share a dedupe key; while one is
+    queued or running, enqueueing it again (e.g. from every API replica's
+    scheduler) returns the existing job instead of adding another.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown crawl job kind: {kind}")
+
+    db = get_database()
+    dedupe_key = f"{kind}:{url or run_id or ''}"
+    job = {
+        "kind": kind,
+        "url": url,
+        "max_pages": max_pages,
+        "run_id": run_id,
+        "status": "queued",
+        "attempts": 0,
+        "enqueued_at": datetime.utcnow(),
+    }
+    try:
+        doc = await db.crawl_jobs.find_one_and_update(
+            {"dedupe_key": dedupe_key, "active": True},
+            {"$setOnInsert": job},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Lost an upsert race; the winner's job is the one we want
+        doc = await db.crawl_jobs.find_one({"dedupe_key": dedupe_key, "active": True})
+    return _serialize(doc)
+
+
+async def claim_next_job(worker: str) -> Optional[Dict]:
+    """Atomically take the oldest queued job, or one whose worker went silent.
+
+    A silent job is re-run at most CRAWL_JOB_MAX_ATTEMPTS times in all;
+    after that it is marked failed instead, so a job that crashes or hangs
+    every worker it lands on does not cycle through them forever.
+    """
+    db = get_database()
+    now = datetime.utcnow()
+    stale = {"status": "running", "heartbeat_at": {"$lt": now - timedelta(seconds=settings.CRAWL_JOB_TIMEOUT_SECONDS)}}
+    await db.crawl_jobs.update_many(
+        {"active": True, **stale, "attempts": {"$gte": settings.CRAWL_JOB_MAX_ATTEMPTS}},
+        {
+            "$set": {
+                "status": "failed",
+                "message": f"Worker went silent on all {settings.CRAWL_JOB_MAX_ATTEMPTS} attempts",
+                "finished_at": now,
+            },
+            "$unset": {"active": ""},
+        },
+    )
+    doc = await db.crawl_jobs.find_one_and_update(
+        {
+            "active": True,
+            "$or": [
+                {"status": "queued"},
+                {**stale, "attempts": {"$lt": settings.CRAWL_JOB_MAX_ATTEMPTS}},
+            ],
+        },
+        {
+            "$set": {"status": "running", "worker": worker, "started_at": now, "heartbeat_at": now},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("enqueued_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    return _serialize(doc) if doc else None
+
+
+async def heartbeat_job(job_id: str, worker: str) -> bool:
+    """Mark the job alive; False once it is no longer this worker's to run."""
+    db = get_database()
+    result = await db.crawl_jobs.update_one(
+        {"_id": ObjectId(job_id), "worker": worker, "status": "running"},
+        {"$set": {"heartbeat_at": datetime.utcnow()}},
+    )
+    return result.matched_count > 0
+
+
+async def finish_job(job_id: str, worker: str, success: bool, message: str):
+    db = get_database()
+    await db.crawl_jobs.update_one(
+        {"_id": ObjectId(job_id), "worker": worker},
+        {
+            "$set": {
+                "status": "done" if success else "failed",
+                "message": message,
+                "finished_at": datetime.utcnow(),
+            },
+            "$unset": {"active": ""},
+        },
+    )
+
+
+async def requeue_job(job_id: str, worker: str):
+    """Hand a job back untouched, e.g. when the worker shuts down first."""
+    db = get_database()
+    await db.crawl_jobs.update_one(
+        {"_id": ObjectId(job_id), "worker": worker, "status": "running"},
+        {"$set": {"status": "queued"}, "$unset": {"worker": ""}, "$inc": {"attempts": -1}},
+    )
+
+
+async def get_job(job_id: str) -> Optional[Dict]:
+    try:
+        oid = ObjectId(job_id)
+    except InvalidId:
+        return None
+    db = get_database()
+    doc = await db.crawl_jobs.find_one({"_id": oid})
+    return _serialize(doc) if doc else None
+
+
+async def queue_status(recent: int = 10) -> Dict:
+    db = get_database()
+    counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+    async for doc in db.crawl_jobs.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}]):
+        counts[doc["_id"]] = doc["n"]
+
+    jobs: List[Dict] = []
+    async for doc in db.crawl_jobs.find().sort("enqueued_at", -1).limit(recent):
+        jobs.append(_serialize(doc))
+    return {"counts": counts, "recent": jobs}
@@ -1,97 +1,235 @@
-import requests
 import asyncio
+import itertools
+import os
+import time
+from typing import Dict, List, Optional, Set
 from bs4 import BeautifulSoup
-from datetime import datetime
-from app.services.rag_service import index_document
+from pymongo import UpdateOne
+from datetime import datetime, timedelta, timezone
+from app.models import CrawlState
+from app.services.rag_service import (
+    build_chunk_docs,
+    swap_document_chunks,
+    new_index_stats,
+    format_index_stats,
+)
+from app.services.chunker import chunk_blocks
+from app.services.extractor import extract_page_async
+from app.services.crawl_client import get_crawl_client
+from app.services.ingest_pipeline import IngestCheckpoint, Pipeline, Stage
 from app.database import get_database
+from app.core.config import settings
 from app.core.logging import logger
 
-CRAWL_DELAY = 2  # Delay between requests (seconds)
+# Per-URL progress lines; sampled through LOG_SAMPLE_RATES
+page_logger = logger.getChild("crawler")
 
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
+LOOKUP_BATCH_SIZE = 5000
 
-async def is_url_indexed(url: str) -> bool:
-    """Check if URL exists in database"""
+async def get_crawl_state(url: str) -> Optional[CrawlState]:
     db = get_database()
-    existing = await db.knowledge_articles.find_one({"url": url})
-    return existing is not None
+    doc = await db.crawl_state.find_one({"url": url}, {"_id": 0})
+    return CrawlState(**doc) if doc else None
 
-async def crawl_and_index(url: str, max_pages: int = 10):
+async def load_crawl_states(urls: List[str]) -> Dict[str, CrawlState]:
+    """Fetch crawl state for many URLs with batched `$in` queries."""
+    db = get_database()
+    states = {}
+    for i in range(0, len(urls), LOOKUP_BATCH_SIZE):
+        batch = urls[i:i + LOOKUP_BATCH_SIZE]
+        async for doc in db.crawl_state.find({"url": {"$in": batch}}, {"_id": 0}):
+            states[doc["url"]] = CrawlState(**doc)
+    return states
+
+async def find_indexed_urls(urls: List[str]) -> Set[str]:
+    """Return which of `urls` already have chunks in knowledge_articles."""
+    db = get_database()
+    indexed = set()
+    for i in range(0, len(urls), LOOKUP_BATCH_SIZE):
+        batch = urls[i:i + LOOKUP_BATCH_SIZE]
+        indexed.update(await db.knowledge_articles.distinct("url", {"url": {"$in": batch}}))
+    return indexed
+
+async def save_crawl_state(state: CrawlState):
+    db = get_database()
+    await db.crawl_state.update_one(
+        {"url": state.url}, {"$set": state.model_dump()}, upsert=True
+    )
+
+class PageJob:
+    """A page on its way through the ingest stages."""
+
+    def __init__(
+        self,
+        url: str,
+        lastmod: Optional[datetime] = None,
+        state: Optional[CrawlState] = None,
+        stats: Optional[Dict] = None,
+    ):
+        self.url = url
+        self.lastmod = lastmod
+        self.state = state
+        self.stats = stats if stats is not None else new_index_stats()
+        self.html: Optional[str] = None
+        self.page = None
+        self.chunks: List[str] = []
+        self.docs: List[Dict] = []
+
+# Each stage returns None to continue, or the page's final status
+
+async def fetch_stage(job: PageJob) -> Optional[str]:
+    """Conditional GET against the stored ETag / Last-Modified."""
+    if job.state is None:
+        job.state = await get_crawl_state(job.url) or CrawlState(url=job.url)
+    state = job.state
+
+    headers = {}
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+
+    page_logger.info("Crawling: %s", job.url)
+    response = await get_crawl_client().get(job.url, headers=headers)
+    state.last_checked_at = datetime.utcnow()
+    if job.lastmod and job.lastmod != datetime.min:
+        state.lastmod = job.lastmod
+
+    if response.status_code == 304:
+        await save_crawl_state(state)
+        return "not_modified"
+    response.raise_for_status()
+
+    state.etag = response.headers.get("ETag")
+    state.last_modified = response.headers.get("Last-Modified")
+    job.html = response.text
+    return None
+
+async def extract_stage(job: PageJob) -> Optional[str]:
+    job.page = await extract_page_async(job.html, job.url)
+    job.html = None
+    if job.page.fingerprint == job.state.content_hash:
+        await save_crawl_state(job.state)
+        return "unchanged"
+    return None
+
+async def chunk_stage(job: PageJob) -> Optional[str]:
+    # Structure-aware chunks: section headings as context, sentence boundaries
+    job.chunks = list(chunk_blocks(job.page.blocks, max_tokens=settings.CHUNK_MAX_TOKENS))
+    return None
+
+async def embed_stage(job: PageJob) -> Optional[str]:
+    # Raises EmbeddingFailed before anything is written: the stored chunks and
+    # content hash stay as they were, so the page is retried on the next run
+    job.docs = await build_chunk_docs(job.url, job.page.title, job.chunks, job.stats)
+    return None
+
+async def write_stage(job: PageJob) -> Optional[str]:
+    if not job.docs:
+        # Likely an extraction miss (layout change, interstitial); never let
+        # it wipe what the page had. The hash stays, so it is retried.
+        page_logger.warning("No chunks extracted from %s, keeping its indexed chunks", job.url)
+        await save_crawl_state(job.state)
+        return "empty"
+    await swap_document_chunks(job.url, job.docs)
+
+    state = job.state
+    state.content_hash = job.page.fingerprint
+    state.chunk_count = len(job.chunks)
+    state.last_crawled_at = state.last_checked_at
+    await save_crawl_state(state)
+    return "indexed"
+
+PAGE_STAGES = [
+    ("fetch", fetch_stage),
+    ("extract", extract_stage),
+    ("chunk", chunk_stage),
+    ("embed", embed_stage),
+    ("write", write_stage),
+]
+
+def _stage_concurrency() -> Dict[str, int]:
+    extract_workers = settings.CRAWL_EXTRACT_WORKERS
+    return {
+        "fetch": settings.CRAWL_CONCURRENCY,
+        "extract": (os.cpu_count() or 1) if extract_workers < 0 else max(1, extract_workers),
+        "chunk": 1,
+        "embed": settings.INGEST_EMBED_CONCURRENCY,
+        "write": settings.INGEST_WRITE_CONCURRENCY,
+    }
+
+async def refresh_page(
+    url: str,
+    lastmod: Optional[datetime] = None,
+    stats: Optional[Dict] = None,
+    state: Optional[CrawlState] = None,
+) -> str:
+    """Fetch a page conditionally and (re)index it only if its content changed.
+
+    Runs the ingest stages back to back for a single page. `state` can be
+    passed when the caller already loaded it in bulk. Returns one of
+    "indexed", "not_modified", "unchanged" or "empty".
+    """
+    job = PageJob(url, lastmod, state, stats)
+    for _, handler in PAGE_STAGES:
+        status = await handler(job)
+        if status:
+            return status
+    return "indexed"
+
+def needs_refresh(state: Optional[CrawlState], lastmod: datetime) -> bool:
+    if state is None:
+        return True
+    if lastmod != datetime.min:
+        return state.lastmod is None or lastmod > state.lastmod
+    # No lastmod in the sitemap: fall back to a periodic conditional re-check
+    return datetime.utcnow() - state.last_checked_at > timedelta(days=settings.CRAWL_RECHECK_DAYS)
+
+async def crawl_and_index(url: str, max_pages: int = 10, stats: Optional[Dict] = None):
     try:
         if "sitemap" in url and url.endswith(".xml"):
             return await crawl_sitemap(url, max_pages)
 
-        logger.info(f"Crawling {url}...")
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        title = soup.title.string.strip() if soup.title else url
-        
-        # Cleanup page structure
-        for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'iframe', 'ads']):
-            tag.decompose()
-
-        # Custom logic for bunnyann.tw content selection
-        content_area = soup.find('div', class_='entry-content') or soup.find('div', class_='post-content')
-        if not content_area:
-             content_area = soup.find('article')
-        
-        target = content_area if content_area else soup
+        page_logger.info("Crawling %s...", url)
+        page_stats = stats if stats is not None else new_index_stats()
+        status = await refresh_page(url, stats=page_stats)
+        if stats is None:
+            page_logger.info("Dedup report for %s: %s", url, format_index_stats(page_stats))
 
-        text = target.get_text(separator='\n', strip=True)
-        
-        chunk_size = 1500
-        overlap = 200
-        chunks = []
-        
-        current_pos = 0
-        while current_pos < len(text):
-            end_pos = min(current_pos + chunk_size, len(text))
-            chunk = text[current_pos:end_pos]
-            
-            # Basic validation
-            if len(chunk) > 100: 
-                chunks.append(chunk)
-                
-            current_pos += (chunk_size - overlap)
-                
-        if chunks:
-            await index_document(url, title, chunks)
-            return True, f"Successfully indexed {len(chunks)} chunks from {title}"
-        else:
-            return False, "No valid content found to index"
+        if status == "indexed":
+            return True, f"Successfully indexed {url}"
+        if status in ("not_modified", "unchanged"):
+            return True, f"{url} is up to date"
+        return False, "No valid content found to index"
 
     except Exception as e:
-        logger.error(f"Crawler error for {url}: {e}")
+        logger.error("Crawler error for %s: %s", url, e)
         return False, str(e)
 
 async def collect_urls_from_sitemap(sitemap_url: str) -> list:
     """Collect article URLs from sitemap index or list"""
-    logger.info(f"Reading sitemap: {sitemap_url}")
+    logger.info("Reading sitemap: %s", sitemap_url)
     all_urls = []
     
     try:
-        response = requests.get(sitemap_url, headers=HEADERS, timeout=10)
+        response = await get_crawl_client().get(sitemap_url)
         response.raise_for_status()
         soup = BeautifulSoup(response.content, 'xml')
         
         sitemaps = soup.find_all('sitemap')
         if sitemaps:
-            logger.info(f"Found {len(sitemaps)} sub-sitemaps")
-            for sm in sitemaps:
-                loc = sm.find('loc').text
-                if "post-sitemap" in loc:
-                    logger.info(f"  → Processing sub-sitemap: {loc}")
-                    sub_urls = await collect_urls_from_sitemap(loc)
-                    all_urls.extend(sub_urls)
+            logger.info("Found %s sub-sitemaps", len(sitemaps))
+            locs = [sm.find('loc').text for sm in sitemaps]
+            locs = [loc for loc in locs if "post-sitemap" in loc]
+            for loc in locs:
+                logger.info("  → Processing sub-sitemap: %s", loc)
+            # Sub-sitemaps are independent; the crawl client bounds concurrency
+            for sub_urls in await asyncio.gather(*(collect_urls_from_sitemap(loc) for loc in locs)):
+                all_urls.extend(sub_urls)
             return all_urls
         
         urls = soup.find_all('url')
-        logger.info(f"Found {len(urls)} URLs in sitemap")
+        logger.info("Found %s URLs in sitemap", len(urls))
         
         for url_tag in urls:
             loc = url_tag.find('loc')
@@ -101,8 +239,10 @@ async def collect_urls_from_sitemap(sitemap_url: str) -> list:
                 lastmod_date = None
                 if lastmod and lastmod.text:
                     try:
-                        # Try ISO format
+                        # Try ISO format, stored as naive UTC like MongoDB returns it
                         lastmod_date = datetime.fromisoformat(lastmod.text.replace('Z', '+00:00'))
+                        if lastmod_date.tzinfo:
+                            lastmod_date = lastmod_date.astimezone(timezone.utc).replace(tzinfo=None)
                     except:
                         try:
                             # Try other common formats
@@ -120,49 +260,193 @@ async def collect_urls_from_sitemap(sitemap_url: str) -> list:
         return all_urls
         
     except Exception as e:
-        logger.error(f"Error reading sitemap {sitemap_url}: {e}")
+        logger.error("Error reading sitemap %s: %s", sitemap_url, e)
         return []
 
 
 async def crawl_sitemap(sitemap_url: str, max_pages: int = 10):
     """Crawl articles from sitemap, prioritizing newest"""
     try:
-        logger.info(f"Sitemap Crawl Start (Max: {max_pages if max_pages > 0 else '∞'})")
+        logger.info("Sitemap Crawl Start (Max: %s)", max_pages if max_pages > 0 else '∞')
+        plan_started = time.perf_counter()
         all_url_entries = await collect_urls_from_sitemap(sitemap_url)
         
         if not all_url_entries:
             return False, "No URLs found in sitemap"
         
         all_url_entries.sort(key=lambda x: x['lastmod'], reverse=True)
-        logger.info(f"Total URLs collected: {len(all_url_entries)}")
+        logger.info("Total URLs collected: %s", len(all_url_entries))
         
-        indexed_count = 0
+        # Resolve what we already know about every URL in bulk, then plan in memory
+        urls = [entry['url'] for entry in all_url_entries]
+        states = await load_crawl_states(urls)
+        legacy = await find_indexed_urls([url for url in urls if url not in states])
+
         skipped_count = 0
+        frontier = []
+        adopted = []
         
         for entry in all_url_entries:
             url = entry['url']
+            lastmod = entry['lastmod']
             
-            # Check if already indexed
-            if await is_url_indexed(url):
+            state = states.get(url)
+            if state is None and url in legacy:
+                # Indexed before crawl state existed: adopt it without refetching
+                adopted.append(CrawlState(
+                    url=url, lastmod=lastmod if lastmod != datetime.min else None
+                ))
                 skipped_count += 1
                 continue
-            
-            logger.info(f"[{indexed_count + 1}/{max_pages if max_pages > 0 else '∞'}] Crawling: {url}")
-            success, msg = await crawl_and_index(url)
-            
-            if success:
-                indexed_count += 1
-            else:
-                logger.warning(f"Failed to index {url}: {msg}")
-            
-            await asyncio.sleep(CRAWL_DELAY)
-            
-            if max_pages > 0 and indexed_count >= max_pages:
-                break
+
+            if not needs_refresh(state, lastmod):
+                skipped_count += 1
+                continue
+
+            frontier.append(entry)
+
+        if adopted:
+            db = get_database()
+            await db.crawl_state.bulk_write([
+                UpdateOne({"url": state.url}, {"$set": state.model_dump()}, upsert=True)
+                for state in adopted
+            ], ordered=False)
+
+        plan_seconds = time.perf_counter() - plan_started
+        logger.info(
+            "Crawl plan: %d to fetch, %d up to date (%.2fs planning)",
+            len(frontier), skipped_count, plan_seconds,
+        )
+
+        checkpoint = await IngestCheckpoint.create(sitemap_url, len(frontier), max_pages)
+        logger.info("Ingest run %s started", checkpoint.run_id)
+        counts, crawl_seconds = await run_ingest(checkpoint, frontier, states, max_pages)
         
-        logger.info(f"Indexed {indexed_count}, Skipped {skipped_count}, Total {len(all_url_entries)}")
-        return True, f"Success: {indexed_count} new, {skipped_count} skipped"
+        logger.info(
+            "Indexed %d, Unchanged %d, Failed %d, Skipped %d, Total %d",
+            counts['indexed'], counts['unchanged'], counts['failed'], skipped_count, len(all_url_entries),
+        )
+        logger.info("Timing: planning %.2fs, crawling %.2fs", plan_seconds, crawl_seconds)
+        return True, (
+            f"Success: {counts['indexed']} indexed, {counts['unchanged']} unchanged, "
+            f"{counts['failed']} failed, {skipped_count} skipped "
+            f"(plan {plan_seconds:.2f}s, crawl {crawl_seconds:.2f}s, run {checkpoint.run_id})"
+        )
         
     except Exception as e:
-        logger.error(f"Sitemap error: {e}")
+        logger.error("Sitemap error: %s", e)
+        return False, str(e)
+
+
+async def run_ingest(
+    checkpoint: IngestCheckpoint,
+    entries: List[Dict],
+    states: Dict[str, CrawlState],
+    max_pages: int,
+):
+    """Push planned entries through the staged pipeline, checkpointing each URL.
+
+    At most `max_pages` pages are (re)indexed; pages that turn out to be
+    unchanged do not count against the budget.
+    """
+    index_stats = new_index_stats()
+    counts = {"indexed": 0, "unchanged": 0, "failed": 0, "in_flight": 0}
+    progress = asyncio.Condition()
+    positions = itertools.count()
+
+    def has_budget() -> bool:
+        # Pages in flight may all turn out to be new, so reserve for them
+        return max_pages <= 0 or counts["indexed"] + counts["in_flight"] < max_pages
+
+    async def admit(job: PageJob) -> bool:
+        async with progress:
+            await progress.wait_for(lambda: has_budget() or counts["in_flight"] == 0)
+            if not has_budget():
+                return False
+            counts["in_flight"] += 1
+        try:
+            await checkpoint.admit(job.url, job.lastmod, next(positions))
+        except BaseException:
+            async with progress:
+                counts["in_flight"] -= 1
+                progress.notify_all()
+            raise
+        return True
+
+    async def on_done(job: PageJob, status: str, error: Optional[str]):
+        if error:
+            logger.warning("Failed to index %s: %s", job.url, error)
+        try:
+            await checkpoint.mark(job.url, status, error)
+        finally:
+            # Even when the checkpoint write fails, or admit() waits forever
+            async with progress:
+                counts["in_flight"] -= 1
+                if status == "indexed":
+                    counts["indexed"] += 1
+                elif status in ("not_modified", "unchanged"):
+                    counts["unchanged"] += 1
+                elif status == "failed":
+                    counts["failed"] += 1
+                progress.notify_all()
+
+    concurrency = _stage_concurrency()
+    pipeline = Pipeline(
+        [Stage(name, handler, concurrency[name]) for name, handler in PAGE_STAGES],
+        on_done,
+        queue_size=settings.INGEST_QUEUE_SIZE,
+    )
+    jobs = (
+        PageJob(entry['url'], entry['lastmod'], states.get(entry['url']), index_stats)
+        for entry in entries
+    )
+
+    try:
+        await pipeline.run(jobs, admit)
+    except BaseException:
+        await checkpoint.finish("interrupted", pipeline.elapsed, {"stages": pipeline.report()})
+        raise
+
+    counts.pop("in_flight")
+    logger.info("Dedup report: %s", format_index_stats(index_stats))
+    logger.info("Pipeline: %s", pipeline.format_report())
+    await checkpoint.finish(
+        "failed" if counts["failed"] else "completed",
+        pipeline.elapsed,
+        {"stages": pipeline.report(), "dedup": index_stats},
+    )
+    return counts, pipeline.elapsed
+
+
+async def resume_sitemap_crawl(run_id: str):
+    """Continue an interrupted or partly failed ingest run from its checkpoint."""
+    try:
+        checkpoint = IngestCheckpoint(run_id)
+        run = await checkpoint.load()
+        if run is None:
+            return False, f"Unknown ingest run {run_id}"
+
+        entries = await checkpoint.remaining()
+        if not entries:
+            await checkpoint.finish("completed", 0.0, run.get("summary", {}))
+            return True, f"Run {run_id} has nothing left to do"
+
+        max_pages = run["max_pages"]
+        if max_pages > 0:
+            max_pages -= await checkpoint.count("indexed")
+            if max_pages <= 0:
+                await checkpoint.finish("completed", 0.0, run.get("summary", {}))
+                return True, f"Run {run_id} already reached its page budget"
+
+        logger.info("Resuming ingest run %s: %s pages left", run_id, len(entries))
+        await checkpoint.start_attempt()
+        states = await load_crawl_states([entry['url'] for entry in entries])
+        counts, crawl_seconds = await run_ingest(checkpoint, entries, states, max_pages)
+        return True, (
+            f"Resumed {run_id}: {counts['indexed']} indexed, {counts['unchanged']} unchanged, "
+            f"{counts['failed']} failed (crawl {crawl_seconds:.2f}s)"
+        )
+
+    except Exception as e:
+        logger.error("Resume error for run %s: %s", run_id, e)
         return False, str(e)
@@ -0,0 +1,172 @@
+import random
+import time
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.services.route_optimizer import Matrix, haversine_matrix, optimize_day
+
+RESTARTS = 4
+MAX_ITERATIONS = 25
+
+
+def _stay(activity: Dict) -> int:
+    try:
+        return int(activity.get("stayDuration") or 60)
+    except (TypeError, ValueError):
+        return 60
+
+
+def _seed_medoids(distances: Matrix, k: int, fixed: Dict[int, int], candidates: List[int], rng: random.Random) -> List[Optional[int]]:
+    """k-means++ seeding: clusters with pinned stops start at their most
+    central pinned stop, the others at points drawn with probability
+    proportional to their squared distance from the medoids chosen so far.
+    """
+    medoids: List[Optional[int]] = [fixed.get(c) for c in range(k)]
+    chosen = [m for m in medoids if m is not None]
+    for c in range(k):
+        if medoids[c] is not None:
+            continue
+        pool = [p for p in candidates if p not in chosen]
+        if not pool:
+            break
+        if chosen:
+            weights = [min(distances[p][m] for m in chosen) ** 2 for p in pool]
+            pick = rng.choices(pool, weights=weights)[0] if sum(weights) > 0 else rng.choice(pool)
+        else:
+            pick = rng.choice(pool)
+        medoids[c] = pick
+        chosen.append(pick)
+    return medoids
+
+
+def _assign(distances: Matrix, medoids: List[Optional[int]], free: List[int], stays: List[int],
+            loads: List[int], capacity: float) -> Dict[int, int]:
+    """Capacitated assignment of free points, most constrained first.
+
+    Points with the largest regret (gap between their nearest and second
+    nearest medoid) pick first, so the ones that lose most by being moved
+    keep their nearest day, and the rest fill up the days with room.
+    """
+    live = [c for c, m in enumerate(medoids) if m is not None]
+    loads = list(loads)
+
+    def ranked(p: int) -> List[int]:
+        return sorted(live, key=lambda c: distances[p][medoids[c]])
+
+    preferences = {p: ranked(p) for p in free}
+
+    def regret(p: int) -> float:
+        order = preferences[p]
+        if len(order) < 2:
+            return 0.0
+        return distances[p][medoids[order[1]]] - distances[p][medoids[order[0]]]
+
+    assignment = {}
+    for p in sorted(free, key=regret, reverse=True):
+        cluster = next((c for c in preferences[p] if loads[c] + stays[p] <= capacity), None)
+        if cluster is None:
+            cluster = min(live, key=lambda c: loads[c])
+        assignment[p] = cluster
+        loads[cluster] += stays[p]
+    return assignment
+
+
+def _central(distances: Matrix, members: List[int]) -> int:
+    return min(members, key=lambda m: sum(distances[m][o] for o in members))
+
+
+def balanced_k_medoids(distances: Matrix, k: int, stays: List[int], pinned: Optional[Dict[int, int]] = None,
+                       tolerance: float = 0.25, seed: int = 0) -> List[int]:
+    """Cluster points into k groups of similar total stay.
+
+    `pinned` maps point -> cluster for points that must stay where they
+    are (already scheduled activities); they count towards their
+    cluster's load and position its medoid. A cluster may take up to
+    (1 + tolerance) times the mean load. Returns the cluster of every point.
+    """
+    n = len(distances)
+    pinned = pinned or {}
+    free = [p for p in range(n) if p not in pinned]
+    capacity = max(sum(stays) / k * (1 + tolerance), max(stays, default=0))
+
+    base_loads = [0] * k
+    members_pinned: Dict[int, List[int]] = {}
+    for p, c in pinned.items():
+        base_loads[c] += stays[p]
+        members_pinned.setdefault(c, []).append(p)
+    fixed = {c: _central(distances, members) for c, members in members_pinned.items()}
+
+    best, best_cost = None, float("inf")
+    for restart in range(RESTARTS if free else 1):
+        rng = random.Random(seed + restart)
+        medoids = _seed_medoids(distances, k, fixed, free, rng)
+        assignment: Dict[int, int] = {}
+        for _ in range(MAX_ITERATIONS):
+            assignment = _assign(distances, medoids, free, stays, base_loads, capacity)
+            clusters = {c: list(members_pinned.get(c, [])) for c in range(k)}
+            for p, c in assignment.items():
+                clusters[c].append(p)
+            updated = [_central(distances, clusters[c]) if clusters[c] else medoids[c] for c in range(k)]
+            if updated == medoids:
+                break
+            medoids = updated
+
+        labels = [pinned.get(p, assignment.get(p, 0)) for p in range(n)]
+        cost = sum(distances[p][medoids[labels[p]]] for p in range(n) if medoids[labels[p]] is not None)
+        if cost < best_cost:
+            best, best_cost = labels, cost
+    return best or [0] * n
+
+
+def distribute(
+    locations: List[Dict],
+    num_days: int,
+    pinned_days: Optional[Sequence[List[Dict]]] = None,
+    start_times: Optional[Sequence[Optional[str]]] = None,
+    tolerance: Optional[float] = None,
+    seed: int = 0,
+) -> Dict:
+    """Spread `locations` over `num_days` days by geography and stay time.
+
+    Days are balanced on total `stayDuration` and then ordered with the
+    route optimizer. `pinned_days[i]` holds activities already on day i:
+    they stay on that day (its first stop stays first) and pull nearby
+    locations towards it. Returns the activities per day with each
+    day's stay and travel totals.
+    """
+    started = time.perf_counter()
+    if tolerance is None:
+        tolerance = settings.DISTRIBUTE_BALANCE_TOLERANCE
+    pinned_days = list(pinned_days or [])[:num_days]
+    pinned_days += [[] for _ in range(num_days - len(pinned_days))]
+    start_times = list(start_times or [])
+
+    points = []
+    pinned: Dict[int, int] = {}
+    for day_index, activities in enumerate(pinned_days):
+        for activity in activities:
+            pinned[len(points)] = day_index
+            points.append(activity)
+    points.extend(locations)
+
+    labels = []
+    if points:
+        distances = haversine_matrix([(float(a["lat"]), float(a["lng"])) for a in points])
+        labels = balanced_k_medoids(distances, num_days, [_stay(a) for a in points], pinned, tolerance, seed)
+
+    days = []
+    for day_index in range(num_days):
+        members = [a for a, label in zip(points, labels) if label == day_index]
+        start_time = start_times[day_index] if day_index < len(start_times) else None
+        if len(members) > 1:
+            result = optimize_day(members, start_time, fixed_start=bool(pinned_days[day_index]), fixed_end=False)
+            members, travel = result["activities"], result["travel_seconds_after"]
+        else:
+            travel = 0
+        days.append({
+            "activities": members,
+            "stay_minutes": sum(_stay(a) for a in members),
+            "travel_seconds": travel,
+        })
+
+    return {"days": days, "solve_ms": round((time.perf_counter() - started) * 1000, 2)}
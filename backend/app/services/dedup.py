@@ -0,0 +1,71 @@
+import hashlib
+import re
+import unicodedata
+from typing import List
+
+# MinHash over character shingles, bucketed with LSH so near-duplicate
+# candidates can be found with a single indexed `$in` query.
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed permutations so signatures stay comparable across processes and runs
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big")
+        % (_MERSENNE_PRIME - 1) + 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big")
+        % _MERSENNE_PRIME,
+    )
+    for i in range(NUM_PERM)
+]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of a chunk, insensitive to whitespace and width variants."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _shingles(text: str) -> set:
+    text = normalize_text(text).replace(" ", "")
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> List[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+        for s in _shingles(text)
+    ]
+    signature = []
+    for a, b in _PERMUTATIONS:
+        signature.append(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes))
+    return signature
+
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    """Band keys for LSH; chunks sharing any key are near-duplicate candidates."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def estimated_jaccard(sig_a: List[int], sig_b: List[int]) -> float:
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
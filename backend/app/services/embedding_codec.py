@@ -0,0 +1,76 @@
+import math
+from typing import Any, Dict, List, Optional
+
+from bson.binary import Binary, BinaryVectorDtype
+
+# Supported values for settings.EMBEDDING_STORAGE:
+#   "array"   - plain BSON array of doubles (~11 bytes per dimension)
+#   "float32" - packed BSON vector binary, 4 bytes per dimension
+#   "int8"    - symmetric scalar quantization, 1 byte per dimension plus a
+#               per-vector scale stored in `embedding_scale`
+#
+# Both binary formats use the BSON vector subtype that Atlas Vector Search
+# indexes natively. The index uses cosine similarity, which ignores the
+# per-vector int8 scale, so quantized vectors can be searched without
+# dequantizing them first.
+STORAGE_FORMATS = ("array", "float32", "int8")
+
+
+def encode_embedding(vector: List[float], storage: str) -> Dict[str, Any]:
+    """Encode a vector into the knowledge_articles fields for `storage`."""
+    if storage == "array":
+        return {"embedding": list(vector)}
+
+    if storage == "float32":
+        return {"embedding": Binary.from_vector(list(vector), BinaryVectorDtype.FLOAT32)}
+
+    if storage == "int8":
+        peak = max((abs(x) for x in vector), default=0.0)
+        scale = peak / 127 if peak else 1.0
+        quantized = [max(-127, min(127, round(x / scale))) for x in vector]
+        return {
+            "embedding": Binary.from_vector(quantized, BinaryVectorDtype.INT8),
+            "embedding_scale": scale,
+        }
+
+    raise ValueError(f"Unknown embedding storage format: {storage}")
+
+
+def encode_query_vector(vector: List[float], storage: str) -> Any:
+    """Encode a query vector to match the stored type for $vectorSearch."""
+    return encode_embedding(vector, storage)["embedding"]
+
+
+def storage_format(value: Any) -> str:
+    if isinstance(value, Binary):
+        dtype = value.as_vector().dtype
+        return "int8" if dtype == BinaryVectorDtype.INT8 else "float32"
+    return "array"
+
+
+def decode_embedding(value: Any, scale: Optional[float] = None) -> List[float]:
+    """Return a stored embedding as a list of floats, whatever its format."""
+    if isinstance(value, Binary):
+        vec = value.as_vector()
+        if vec.dtype == BinaryVectorDtype.INT8:
+            s = scale if scale is not None else 1.0
+            return [x * s for x in vec.data]
+        return list(vec.data)
+    return list(value)
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def quantized_cosine(query: List[float], value: Any) -> float:
+    """Cosine similarity scored directly on stored values, without rescaling.
+
+    For int8 vectors the per-vector scale cancels out, so the raw integers
+    are used as-is.
+    """
+    if isinstance(value, Binary):
+        return cosine_similarity(query, value.as_vector().data)
+    return cosine_similarity(query, value)
@@ -0,0 +1,110 @@
+import asyncio
+import html as html_lib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from app.services.chunker import Block, iter_blocks
+from app.services.dedup import content_hash
+from app.core.config import settings
+
+# Content containers used by bunnyann.tw (WordPress), in order of preference
+CONTENT_CLASSES = ("entry-content", "post-content")
+NOISE_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'iframe', 'ads']
+PARSER = "lxml"
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+class ExtractedPage(NamedTuple):
+    title: str
+    blocks: List[Block]
+    fingerprint: str
+
+
+def _is_content_class(value) -> bool:
+    # Strainers see the raw attribute string, before BeautifulSoup splits classes
+    if not value:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return any(c in CONTENT_CLASSES for c in classes)
+
+
+_CONTENT_STRAINER = SoupStrainer("div", class_=_is_content_class)
+_ARTICLE_STRAINER = SoupStrainer("article")
+
+
+def parse_content_area(html: str, url: str) -> Tuple[str, Tag]:
+    """Return the page title and the element holding the article body.
+
+    Only the content container is turned into a tree: lxml tokenizes the
+    page in C and the strainer discards everything outside it. Pages
+    without a known container fall back to a full parse.
+    """
+    match = _TITLE_RE.search(html)
+    title = html_lib.unescape(match.group(1)).strip() if match else ""
+    title = title or url
+
+    soup = BeautifulSoup(html, PARSER, parse_only=_CONTENT_STRAINER)
+    target = None
+    for class_name in CONTENT_CLASSES:
+        target = soup.find('div', class_=class_name)
+        if target:
+            break
+
+    if target is None:
+        soup = BeautifulSoup(html, PARSER, parse_only=_ARTICLE_STRAINER)
+        target = soup.find('article')
+
+    if target is None:
+        soup = BeautifulSoup(html, PARSER)
+        target = soup
+
+    for tag in target(NOISE_TAGS):
+        tag.decompose()
+
+    return title, target
+
+
+def extract_page(html: str, url: str) -> ExtractedPage:
+    """Parse, clean and split a page into blocks. Runs in a worker process."""
+    title, target = parse_content_area(html, url)
+    blocks = list(iter_blocks(target))
+    fingerprint = content_hash("\n".join(block.text for block in blocks))
+    return ExtractedPage(title, blocks, fingerprint)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    workers = settings.CRAWL_EXTRACT_WORKERS
+    if workers == 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers if workers > 0 else os.cpu_count())
+    return _pool
+
+
+async def extract_page_async(html: str, url: str) -> ExtractedPage:
+    """Run extract_page in the process pool, off the event loop.
+
+    CPU-bound parsing then scales with cores; CRAWL_EXTRACT_WORKERS=0 runs
+    it inline instead.
+    """
+    pool = _get_pool()
+    if pool is None:
+        return extract_page(html, url)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, extract_page, html, url)
+
+
+def shutdown_extractor_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,297 @@
+import gzip
+import json
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.services.geocode_cache import normalize_place_name
+from app.core.config import settings
+from app.core.logging import logger
+
+# (min_lat, min_lng, max_lat, max_lng) for destinations the assistant plans for
+DESTINATION_BBOXES = {
+    "台北": (24.96, 121.45, 25.21, 121.67),
+    "新北": (24.67, 121.28, 25.30, 122.01),
+    "基隆": (25.05, 121.62, 25.20, 121.80),
+    "桃園": (24.59, 120.98, 25.13, 121.49),
+    "新竹": (24.40, 120.88, 24.95, 121.42),
+    "苗栗": (24.22, 120.61, 24.75, 121.27),
+    "台中": (23.99, 120.46, 24.45, 121.46),
+    "彰化": (23.78, 120.25, 24.21, 120.70),
+    "南投": (23.44, 120.62, 24.25, 121.35),
+    "雲林": (23.50, 120.13, 23.85, 120.73),
+    "嘉義": (23.25, 120.12, 23.65, 120.90),
+    "台南": (22.88, 120.03, 23.42, 120.66),
+    "高雄": (22.47, 120.17, 23.47, 121.05),
+    "屏東": (21.89, 120.38, 22.89, 120.93),
+    "宜蘭": (24.30, 121.30, 24.99, 121.99),
+    "花蓮": (23.08, 121.05, 24.37, 121.72),
+    "台東": (22.00, 120.73, 23.45, 121.60),
+    "澎湖": (23.15, 119.30, 23.80, 119.75),
+    "金門": (24.35, 118.13, 24.55, 118.50),
+    "馬祖": (25.93, 119.89, 26.40, 120.52),
+    "墾丁": (21.89, 120.70, 22.10, 120.90),
+    "日月潭": (23.80, 120.86, 23.90, 120.97),
+    "阿里山": (23.40, 120.70, 23.60, 120.90),
+    "九份": (25.09, 121.82, 25.13, 121.87),
+    "淡水": (25.13, 121.40, 25.22, 121.48),
+}
+TAIWAN_BBOX = (21.80, 118.10, 26.40, 122.10)
+# Destinations that mean "somewhere in Taiwan" without naming a county
+TAIWAN_NAMES = ("台灣", "taiwan", "formosa")
+BBOX_MARGIN = 0.02  # Degrees (~2 km) of slack around a destination
+
+# Shortest name that counts as contained in a longer one (e.g. "台北101")
+MIN_CONTAINED = 3
+MAX_PREFIX_MATCHES = 20
+
+BBox = Tuple[float, float, float, float]
+
+
+class Match(NamedTuple):
+    name: str
+    lat: float
+    lng: float
+    score: float  # 1.0 for exact matches
+
+
+def _bigrams(key: str) -> List[str]:
+    if len(key) < 2:
+        return [key] if key else []
+    return [key[i:i + 2] for i in range(len(key) - 1)]
+
+
+_DESTINATIONS = [(normalize_place_name(name), bbox) for name, bbox in DESTINATION_BBOXES.items()]
+_TAIWAN_KEYS = [normalize_place_name(name) for name in TAIWAN_NAMES]
+
+
+def destination_bbox(destination: Optional[str]) -> Optional[BBox]:
+    """Bounding box to search for places of `destination`.
+
+    The box of the first known destination it names, TAIWAN_BBOX when it
+    only names Taiwan (or is empty), and None for anywhere else: the
+    gazetteer only covers Taiwan, so a 龍山寺 in a trip to 東京 is not ours.
+    """
+    key = normalize_place_name(destination or "")
+    if not key:
+        return TAIWAN_BBOX
+    for name, bbox in _DESTINATIONS:
+        if name in key:
+            return bbox
+    if any(name in key for name in _TAIWAN_KEYS):
+        return TAIWAN_BBOX
+    return None
+
+
+class Gazetteer:
+    """In-memory place-name index for offline geocoding.
+
+    POIs live in parallel arrays (names, float32 latitudes and longitudes).
+    Normalized names and aliases are kept sorted for exact and prefix
+    lookups by bisection, and a character-bigram posting list over them
+    answers fuzzy lookups. Building it costs a few MB for a full OSM extract of Taiwan;
+    lookups take microseconds.
+    """
+
+    def __init__(self, names: List[str], lats: Iterable[float], lngs: Iterable[float], aliases: Iterable[Tuple[int, str]] = ()):
+        self.names = names
+        self.lats = array("f", lats)
+        self.lngs = array("f", lngs)
+
+        entries = {(normalize_place_name(name), i) for i, name in enumerate(names)}
+        entries.update((normalize_place_name(alias), i) for i, alias in aliases)
+        entries = sorted(e for e in entries if e[0])
+        self._keys = [key for key, _ in entries]
+        self._ids = array("I", (i for _, i in entries))
+        self._sizes = array("H", (len(set(_bigrams(key))) for key in self._keys))
+        # First position of each key, for O(1) substring probes in fuzzy()
+        self._first: Dict[str, int] = {}
+        for position, key in enumerate(self._keys):
+            self._first.setdefault(key, position)
+
+        postings: Dict[str, array] = {}
+        for position, key in enumerate(self._keys):
+            for gram in set(_bigrams(key)):
+                postings.setdefault(gram, array("I")).append(position)
+        self._postings = postings
+        self.stats = {"exact": 0, "fuzzy": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["names"], data["lat"], data["lng"], [tuple(a) for a in data.get("aliases", [])])
+
+    def _match(self, i: int, score: float) -> Match:
+        # float32 keeps ~1 m precision; trim the representation noise
+        return Match(self.names[i], round(self.lats[i], 5), round(self.lngs[i], 5), score)
+
+    def _inside(self, i: int, bbox: BBox) -> bool:
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return (
+            min_lat - BBOX_MARGIN <= self.lats[i] <= max_lat + BBOX_MARGIN
+            and min_lng - BBOX_MARGIN <= self.lngs[i] <= max_lng + BBOX_MARGIN
+        )
+
+    def exact(self, key: str) -> List[int]:
+        ids = []
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            ids.append(self._ids[position])
+            position += 1
+        return ids
+
+    def _containing(self, key: str) -> List[int]:
+        """Key positions whose name contains, or starts with, the query.
+
+        Covers names an LLM decorates ("九份老街一日遊") or truncates
+        ("花蓮東大門"): every substring of at least MIN_CONTAINED chars is
+        probed with a hash lookup, and keys sharing the query as prefix are
+        read off the sorted list.
+        """
+        positions = []
+        for length in range(len(key) - 1, MIN_CONTAINED - 1, -1):
+            for start in range(len(key) - length + 1):
+                sub = key[start:start + length]
+                position = self._first.get(sub)
+                while position is not None and position < len(self._keys) and self._keys[position] == sub:
+                    positions.append(position)
+                    position += 1
+        if len(key) >= MIN_CONTAINED:
+            position = bisect_left(self._keys, key)
+            end = min(len(self._keys), position + MAX_PREFIX_MATCHES)
+            while position < end and self._keys[position].startswith(key):
+                positions.append(position)
+                position += 1
+        return positions
+
+    def fuzzy(self, key: str, threshold: float) -> List[Tuple[float, int]]:
+        """(score, poi id) pairs above `threshold`, best first.
+
+        The score is the Dice coefficient over character bigrams, or 0.9
+        when one name contains the other. Candidates for the Dice score come
+        from prefix filtering: a name reaching the threshold must share one
+        of the query's rarest bigrams, so common ones ("夜市", "老街") never
+        have their long posting lists scanned.
+        """
+        grams = set(_bigrams(key))
+        if not grams:
+            return []
+
+        scores: Dict[int, float] = {position: 0.9 for position in self._containing(key)}
+
+        # Dice >= t needs an overlap of at least t * |A| / (2 - t) bigrams
+        needed = math.ceil(threshold * len(grams) / (2 - threshold))
+        by_rarity = sorted(grams, key=lambda g: len(self._postings.get(g, ())))
+        candidates = set()
+        for gram in by_rarity[:len(grams) - needed + 1]:
+            candidates.update(self._postings.get(gram, ()))
+
+        for position in candidates:
+            candidate = self._keys[position]
+            # A bigram occurs in a name iff it is a substring of it
+            shared = sum(1 for gram in grams if gram in candidate)
+            score = 2 * shared / (len(grams) + self._sizes[position])
+            if score > scores.get(position, 0.0):
+                scores[position] = score
+
+        scored = sorted(
+            ((score, len(self._keys[position]), self._ids[position])
+             for position, score in scores.items() if score >= threshold),
+            reverse=True,
+        )
+        return [(score, i) for score, _, i in scored]
+
+    def lookup(self, name: str, destination: Optional[str] = None) -> Optional[Match]:
+        """Resolve a place name, preferring POIs inside the destination's bbox.
+
+        Matches outside the destination's bounding box (all of Taiwan when
+        none is given) are rejected, so an ambiguous name (two 龍山寺)
+        resolves to the one the plan is about, or falls through to the
+        remote geocoder. Destinations outside Taiwan skip the gazetteer.
+        """
+        key = normalize_place_name(name)
+        bbox = destination_bbox(destination)
+        if not key or bbox is None:
+            return None
+
+        for i in self.exact(key):
+            if self._inside(i, bbox):
+                self.stats["exact"] += 1
+                return self._match(i, 1.0)
+
+        for score, i in self.fuzzy(key, settings.GAZETTEER_FUZZY_THRESHOLD):
+            if self._inside(i, bbox):
+                self.stats["fuzzy"] += 1
+                return self._match(i, score)
+
+        self.stats["misses"] += 1
+        return None
+
+    def report(self) -> Dict:
+        lookups = sum(self.stats.values())
+        hits = self.stats["exact"] + self.stats["fuzzy"]
+        return {
+            **self.stats,
+            "pois": len(self.names),
+            "keys": len(self._keys),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def save_gazetteer(path: str, records: List[Dict]):
+    """Write records ({"name", "lat", "lng", "aliases"}) in the compact format."""
+    data = {"version": 1, "names": [], "lat": [], "lng": [], "aliases": []}
+    for i, record in enumerate(records):
+        data["names"].append(record["name"])
+        data["lat"].append(round(record["lat"], 6))
+        data["lng"].append(round(record["lng"], 6))
+        data["aliases"].extend([i, alias] for alias in record.get("aliases", []))
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+_gazetteer: Optional[Gazetteer] = None
+_load_started = False
+
+
+def _load(path: str):
+    global _gazetteer
+    try:
+        gazetteer = Gazetteer.load(path)
+    except Exception as e:
+        logger.error("Could not load gazetteer from %s: %s", path, e)
+        return
+    _gazetteer = gazetteer
+    logger.info("Loaded gazetteer with %s places from %s", len(gazetteer), path)
+
+
+def start_gazetteer_load():
+    """Build the gazetteer on a background thread, once.
+
+    Reading and indexing a full extract takes seconds of CPU; doing it on
+    the event loop would stall every request in flight. Called from the
+    app's startup, and by get_gazetteer() for processes that skip it.
+    """
+    global _load_started
+    if _load_started:
+        return
+    _load_started = True
+    path = settings.GAZETTEER_PATH
+    if path and os.path.exists(path):
+        threading.Thread(target=_load, args=(path,), name="gazetteer-load", daemon=True).start()
+    elif path:
+        logger.warning("Gazetteer file not found at %s, local geocoding disabled", path)
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """The gazetteer, or None while it is loading or when none is configured."""
+    if not _load_started:
+        start_gazetteer_load()
+    return _gazetteer
@@ -0,0 +1,194 @@
+import re
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.database import db as mongo, get_database
+from app.core.config import settings
+from app.core.logging import logger
+
+try:
+    # opencc-python-reimplemented (requirements.txt); without it only the
+    # _VARIANTS below are folded
+    from opencc import OpenCC
+except ImportError:
+    OpenCC = None
+
+# Variant characters folded even without OpenCC
+_VARIANTS = str.maketrans({"臺": "台", "峯": "峰", "沈": "沉"})
+_SPACES = re.compile(r"\s+")
+
+
+def _load_converter():
+    if OpenCC is None:
+        return None
+    for config in ("t2s", "t2s.json"):
+        try:
+            return OpenCC(config)
+        except Exception:
+            continue
+    return None
+
+
+_converter = _load_converter()
+
+
+def normalize_place_name(name: str) -> str:
+    """Fold a place name so spelling variants share a cache key.
+
+    NFKC turns full-width letters, digits and punctuation into their
+    half-width forms; Traditional characters are folded to Simplified when
+    OpenCC is installed; case and whitespace are ignored.
+    """
+    text = unicodedata.normalize("NFKC", name or "").translate(_VARIANTS)
+    if _converter is not None:
+        text = _converter.convert(text)
+    return _SPACES.sub("", text).lower()
+
+
+def cache_key(name: str, hint: Optional[str] = None) -> str:
+    key = normalize_place_name(name)
+    if hint:
+        key = f"{key}|{normalize_place_name(hint)}"
+    return key
+
+
+class GeocodeCache:
+    """Two-tier cache of geocoding results: in-process LRU, then Mongo.
+
+    Entries are `(lat, lng)` tuples, or None for places the API could not
+    find. Negative entries expire after GEOCODE_NEGATIVE_TTL_HOURS so a
+    typo does not block a place for long; Mongo drops expired documents
+    through a TTL index on `expires_at`.
+    """
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Optional[Tuple[float, float]], datetime]]" = OrderedDict()
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "negative_hits": 0, "misses": 0, "stores": 0}
+
+    def _remember(self, key: str, coords: Optional[Tuple[float, float]], expires_at: datetime):
+        self._entries[key] = (coords, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _from_memory(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        coords, expires_at = entry
+        if expires_at <= datetime.utcnow():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, coords
+
+    async def get_many(
+        self, keys: Iterable[str], fallbacks: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Optional[Tuple[float, float]]]:
+        """Return cached results for the keys that have one (misses are absent).
+
+        `fallbacks` maps a key to another whose entry answers for it when it
+        has none of its own, e.g. the hint-less key of a place: the API
+        result does not depend on the hint, and warm() only writes those.
+        """
+        fallbacks = fallbacks or {}
+        wanted = list(dict.fromkeys(keys))
+        probes = list(dict.fromkeys([*wanted, *(fallbacks[k] for k in wanted if k in fallbacks)]))
+        entries: Dict[str, Optional[Tuple[float, float]]] = {}
+        missing: List[str] = []
+        for key in probes:
+            hit, coords = self._from_memory(key)
+            if hit:
+                entries[key] = coords
+            else:
+                missing.append(key)
+
+        if missing and mongo.client:
+            try:
+                cursor = get_database().geocode_cache.find(
+                    {"_id": {"$in": missing}, "expires_at": {"$gt": datetime.utcnow()}}
+                )
+                async for doc in cursor:
+                    coords = (doc["lat"], doc["lng"]) if doc.get("found") else None
+                    self._remember(doc["_id"], coords, doc["expires_at"])
+                    entries[doc["_id"]] = coords
+            except Exception as e:
+                logger.warning("Geocode cache lookup failed: %s", e)
+
+        found: Dict[str, Optional[Tuple[float, float]]] = {}
+        for key in wanted:
+            source = key if key in entries else fallbacks.get(key)
+            if source not in entries:
+                self.stats["misses"] += 1
+                continue
+            found[key] = entries[source]
+            self.stats["mongo_hits" if source in missing else "memory_hits"] += 1
+            if found[key] is None:
+                self.stats["negative_hits"] += 1
+        return found
+
+    async def get(self, key: str, fallback: Optional[str] = None):
+        """Return (hit, coords); coords is None for a cached negative result."""
+        found = await self.get_many([key], {key: fallback} if fallback else None)
+        return (key in found), found.get(key)
+
+    async def set(self, key: str, name: str, coords: Optional[Tuple[float, float]], hint: Optional[str] = None):
+        if coords is None:
+            ttl = timedelta(hours=settings.GEOCODE_NEGATIVE_TTL_HOURS)
+        else:
+            ttl = timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS)
+        expires_at = datetime.utcnow() + ttl
+        self._remember(key, coords, expires_at)
+        self.stats["stores"] += 1
+
+        if not mongo.client:
+            return
+        doc = {"name": name, "hint": hint, "found": coords is not None, "expires_at": expires_at}
+        if coords is not None:
+            doc["lat"], doc["lng"] = coords
+        try:
+            await get_database().geocode_cache.update_one({"_id": key}, {"$set": doc}, upsert=True)
+        except Exception as e:
+            logger.warning("Geocode cache write failed: %s", e)
+
+    async def warm(self, places: Iterable[Tuple[str, float, float]]) -> int:
+        """Seed Mongo with known coordinates without overwriting entries.
+
+        Entries go under the hint-less key of each name, which lookups with
+        any hint fall back to.
+        """
+        expires_at = datetime.utcnow() + timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS)
+        operations = {}
+        for name, lat, lng in places:
+            key = cache_key(name)
+            if key and key not in operations:
+                operations[key] = UpdateOne(
+                    {"_id": key},
+                    {"$setOnInsert": {
+                        "name": name, "hint": None, "found": True,
+                        "lat": lat, "lng": lng, "expires_at": expires_at,
+                    }},
+                    upsert=True,
+                )
+        if not operations:
+            return 0
+        result = await get_database().geocode_cache.bulk_write(list(operations.values()), ordered=False)
+        return result.upserted_count
+
+    def report(self) -> Dict:
+        hits = self.stats["memory_hits"] + self.stats["mongo_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "opencc": _converter is not None,
+        }
+
+
+geocode_cache = GeocodeCache(settings.GEOCODE_CACHE_SIZE)
@@ -1,104 +1,205 @@
+import asyncio
+import time
 import httpx
 from typing import Optional, Dict, Tuple
 import logging
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import span
+from app.core.singleflight import SingleFlight
+from app.services.geocode_cache import cache_key, geocode_cache
+from app.services.gazetteer import get_gazetteer
 
 logger = logging.getLogger(__name__)
+# One line per resolved place; sampled through LOG_SAMPLE_RATES
+hit_logger = logger.getChild("hits")
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+DEFAULT_COORDINATES = (25.0330, 121.5654)  # Taipei
+
+# Cache misses for the same normalized place share one API call
+_lookups = SingleFlight("geocode")
+
+
+class PlaceNotFound(ValueError):
+    """The Geocoding API answered, but has no result for the place."""
 
 
 class GeocodingService:
     """Service for geocoding place names using Google Maps Places API"""
-    
+
+    @staticmethod
+    async def lookup(place_name: str) -> Tuple[float, float]:
+        """Query the Geocoding API; raises when the place cannot be resolved."""
+        params = {
+            "address": place_name,
+            "key": settings.GOOGLE_MAPS_API_KEY,
+            "language": "zh-TW"
+        }
+
+        with span("geocode.api"):
+            response = await get_http_client().get(GEOCODE_URL, params=params)
+            response.raise_for_status()
+
+        data = response.json()
+
+        if data.get("status") == "OK" and data.get("results"):
+            location = data["results"][0]["geometry"]["location"]
+            lat = location["lat"]
+            lng = location["lng"]
+            hit_logger.info("Successfully geocoded '%s' to (%s, %s)", place_name, lat, lng)
+            return (lat, lng)
+
+        logger.warning("Geocoding failed for '%s': %s", place_name, data.get("status"))
+        if data.get("status") == "ZERO_RESULTS":
+            raise PlaceNotFound(f"Geocoding failed: {data.get('status')}")
+        raise ValueError(f"Geocoding failed: {data.get('status')}")
+
     @staticmethod
-    async def geocode_place(place_name: str, fallback_lat: Optional[float] = None, fallback_lng: Optional[float] = None) -> Tuple[float, float]:
-        """Convert a place name to coordinates, with optional AI fallback."""
+    def local_lookup(place_name: str, hint: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """Resolve a place from the offline gazetteer, without any I/O."""
+        gazetteer = get_gazetteer()
+        if gazetteer is None:
+            return None
+        with span("geocode.gazetteer"):
+            match = gazetteer.lookup(place_name, hint)
+        if match is None:
+            return None
+        hit_logger.info("Gazetteer matched '%s' to '%s' (score %.2f)", place_name, match.name, match.score)
+        return (match.lat, match.lng)
+
+    @staticmethod
+    async def cached_lookup(place_name: str, hint: Optional[str] = None) -> Tuple[float, float]:
+        """lookup() behind the geocode cache; known misses raise PlaceNotFound."""
+        key = cache_key(place_name, hint)
+        hit, coords = await geocode_cache.get(key, cache_key(place_name) if hint else None)
+        if not hit:
+            coords = await _lookups.do(key, GeocodingService._lookup_and_cache, place_name, key, hint)
+        if coords is None:
+            raise PlaceNotFound(f"No geocoding result for '{place_name}'")
+        return coords
+
+    @staticmethod
+    async def _lookup_and_cache(place_name: str, key: str, hint: Optional[str]) -> Optional[Tuple[float, float]]:
+        try:
+            coords = await GeocodingService.lookup(place_name)
+        except PlaceNotFound:
+            coords = None
+        # Other errors (quota, network) propagate and are not cached
+        await geocode_cache.set(key, place_name, coords, hint)
+        return coords
+
+    @staticmethod
+    async def geocode_place(place_name: str, fallback_lat: Optional[float] = None, fallback_lng: Optional[float] = None, hint: Optional[str] = None) -> Tuple[float, float]:
+        """Convert a place name to coordinates, with optional AI fallback.
+
+        The offline gazetteer is tried first; the Geocoding API (through the
+        geocode cache) only sees places it does not know.
+        """
+        local = GeocodingService.local_lookup(place_name, hint)
+        if local is not None:
+            return local
+
         api_key = settings.GOOGLE_MAPS_API_KEY
-        
+
         if not api_key:
             logger.warning("Google Maps API Key not found, using fallback coordinates")
             if fallback_lat is not None and fallback_lng is not None:
                 return (fallback_lat, fallback_lng)
             raise ValueError("No API key and no fallback coordinates provided")
-        
+
         try:
-            async with httpx.AsyncClient() as client:
-                url = "https://maps.googleapis.com/maps/api/geocode/json"
-                params = {
-                    "address": place_name,
-                    "key": api_key,
-                    "language": "zh-TW"
-                }
-                
-                response = await client.get(url, params=params, timeout=10.0)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if data.get("status") == "OK" and data.get("results"):
-                    location = data["results"][0]["geometry"]["location"]
-                    lat = location["lat"]
-                    lng = location["lng"]
-                    logger.info(f"Successfully geocoded '{place_name}' to ({lat}, {lng})")
-                    return (lat, lng)
-                else:
-                    logger.warning(f"Geocoding failed for '{place_name}': {data.get('status')}")
-                    # Use fallback coordinates if available
-                    if fallback_lat is not None and fallback_lng is not None:
-                        logger.info(f"Using AI-generated fallback coordinates for '{place_name}'")
-                        return (fallback_lat, fallback_lng)
-                    raise ValueError(f"Geocoding failed: {data.get('status')}")
-                    
+            return await GeocodingService.cached_lookup(place_name, hint)
+
         except httpx.HTTPError as e:
-            logger.error(f"HTTP error during geocoding for '{place_name}': {str(e)}")
+            logger.error("HTTP error during geocoding for '%s': %s", place_name, e)
             if fallback_lat is not None and fallback_lng is not None:
-                logger.info(f"Using AI-generated fallback coordinates for '{place_name}'")
+                hit_logger.info("Using AI-generated fallback coordinates for '%s'", place_name)
                 return (fallback_lat, fallback_lng)
             raise
-            
+
         except Exception as e:
-            logger.error(f"Unexpected error during geocoding for '{place_name}': {str(e)}")
+            logger.error("Unexpected error during geocoding for '%s': %s", place_name, e)
             if fallback_lat is not None and fallback_lng is not None:
-                logger.info(f"Using AI-generated fallback coordinates for '{place_name}'")
+                hit_logger.info("Using AI-generated fallback coordinates for '%s'", place_name)
                 return (fallback_lat, fallback_lng)
             raise
-    
+
     @staticmethod
-    async def geocode_itinerary_activities(itinerary_data: Dict) -> Dict:
-        """Geocode all activities in an itinerary, using AI coordinates as fallback."""
+    async def geocode_itinerary_activities(itinerary_data: Dict, destination: Optional[str] = None) -> Dict:
+        """Geocode all activities in an itinerary, using AI coordinates as fallback.
+
+        Each distinct title is looked up once: the offline gazetteer answers
+        known places, cached places come from one batched cache read, and
+        the rest run concurrently (at most GEOCODE_CONCURRENCY at a time), so
+        a whole plan costs at most about one API round trip. `destination`
+        restricts gazetteer matches to its area and scopes the cache keys.
+        """
         if not itinerary_data.get("days"):
             return itinerary_data
-        
+
+        started = time.perf_counter()
+        activities = [
+            activity
+            for day in itinerary_data["days"]
+            for activity in day.get("activities", [])
+        ]
+        titles = list(dict.fromkeys(activity.get("title", "") for activity in activities))
+
+        local = {title: GeocodingService.local_lookup(title, destination) for title in titles}
+        remote = [title for title in titles if local[title] is None]
+        keys = {title: cache_key(title, destination) for title in remote}
+        # Warmed entries have no hint; they answer for any destination
+        bare = {keys[title]: cache_key(title) for title in remote} if destination else None
+        cached = await geocode_cache.get_many(keys.values(), bare) if remote else {}
+        missing = [title for title in remote if keys[title] not in cached]
+        semaphore = asyncio.Semaphore(settings.GEOCODE_CONCURRENCY)
+
+        async def resolve(title: str):
+            if not settings.GOOGLE_MAPS_API_KEY:
+                return None
+            async with semaphore:
+                try:
+                    # Shares the call with plans looking up the same place right now
+                    return await _lookups.do(keys[title], GeocodingService._lookup_and_cache, title, keys[title], destination)
+                except Exception as e:
+                    logger.error("Failed to geocode '%s': %s", title, e)
+                    return None
+
+        resolved = {title: local[title] or cached.get(keys[title]) for title in titles}
+        resolved.update(zip(missing, await asyncio.gather(*(resolve(t) for t in missing))))
+
         updated_days = []
-        
+
         for day in itinerary_data["days"]:
             updated_activities = []
-            
+
             for activity in day.get("activities", []):
                 place_name = activity.get("title", "")
                 ai_lat = activity.get("lat")
                 ai_lng = activity.get("lng")
-                
-                try:
-                    lat, lng = await GeocodingService.geocode_place(
-                        place_name,
-                        fallback_lat=ai_lat,
-                        fallback_lng=ai_lng
-                    )
-                    
-                    activity["lat"] = lat
-                    activity["lng"] = lng
-                    
-                except Exception as e:
-                    logger.error(f"Failed to geocode activity '{place_name}': {str(e)}")
-                    # Keep AI-generated coordinates if they exist
-                    if ai_lat is None or ai_lng is None:
-                        logger.warning(f"No coordinates available for '{place_name}', setting to default")
-                        activity["lat"] = 25.0330  # Default to Taipei
-                        activity["lng"] = 121.5654
-                
+                coords = resolved.get(place_name)
+
+                if coords is not None:
+                    activity["lat"], activity["lng"] = coords
+                    activity["coordsSource"] = "geocoder"
+                elif ai_lat is not None and ai_lng is not None:
+                    # Keep AI-generated coordinates
+                    hit_logger.info("Using AI-generated fallback coordinates for '%s'", place_name)
+                    activity["coordsSource"] = "ai"
+                else:
+                    logger.warning("No coordinates available for '%s', setting to default", place_name)
+                    activity["lat"], activity["lng"] = DEFAULT_COORDINATES
+                    activity["coordsSource"] = "default"
+
                 updated_activities.append(activity)
-            
+
             updated_day = {**day, "activities": updated_activities}
             updated_days.append(updated_day)
-        
+
+        logger.info(
+            "Geocoded %d activities (%d places, %d local, %d cached, %d looked up) in %.2fs",
+            len(activities), len(titles), len(titles) - len(remote), len(remote) - len(missing),
+            len(missing), time.perf_counter() - started,
+        )
         return {**itinerary_data, "days": updated_days}
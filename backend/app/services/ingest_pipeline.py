@@ -0,0 +1,268 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from app.database import get_database
+from app.core.config import settings
+from app.services.job_lease import NODE_ID
+from app.core.logging import logger
+from app.core.metrics import record
+
+# Statuses that end an item's trip through the pipeline. Anything else
+# recorded in a checkpoint ("pending", "failed") is retried on resume.
+DONE_STATUSES = ("indexed", "empty", "not_modified", "unchanged")
+# Run statuses another node may pick up again
+RESUMABLE_STATUSES = ("failed", "interrupted")
+
+# A stage handler returns None to pass the item on, or a final status
+Handler = Callable[[Any], Awaitable[Optional[str]]]
+
+
+class Stage:
+    def __init__(self, name: str, handler: Handler, concurrency: int = 1):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.inbox: Optional[asyncio.Queue] = None
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+
+    def report(self, elapsed: float) -> Dict:
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_second": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            # Share of the stage's worker time spent in the handler
+            "utilization": round(self.busy_seconds / (elapsed * self.concurrency), 2) if elapsed else 0.0,
+            "max_queue": self.max_depth,
+        }
+
+
+class Pipeline:
+    """Run items through async stages joined by bounded queues.
+
+    Each stage has its own worker count. A full queue blocks the stage in
+    front of it, so a slow embedder holds back fetching instead of piling
+    pages up in memory. `on_done(item, status, error)` is called exactly
+    once per item, when a handler returns a status or raises.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        on_done: Callable[[Any, str, Optional[str]], Awaitable[None]],
+        queue_size: int = 16,
+    ):
+        self.stages = stages
+        self.on_done = on_done
+        self.queue_size = queue_size
+        self.elapsed = 0.0
+        for stage in stages:
+            stage.inbox = asyncio.Queue(maxsize=queue_size)
+
+    async def _put(self, stage: Stage, item):
+        await stage.inbox.put(item)
+        stage.max_depth = max(stage.max_depth, stage.inbox.qsize())
+
+    async def _work(self, stage: Stage, next_stage: Optional[Stage]):
+        while True:
+            item = await stage.inbox.get()
+            started = time.perf_counter()
+            try:
+                status = await stage.handler(item)
+                error = None
+            except Exception as e:
+                stage.failed += 1
+                status, error = "failed", str(e)
+            busy = time.perf_counter() - started
+            stage.busy_seconds += busy
+            record(f"crawl.{stage.name}", busy, error is not None)
+            stage.processed += 1
+
+            try:
+                if status is None and next_stage is not None:
+                    await self._put(next_stage, item)
+                else:
+                    await self.on_done(item, status or "done", error)
+            except Exception as e:
+                logger.error("Pipeline stage %s could not hand off an item: %s", stage.name, e)
+            finally:
+                stage.inbox.task_done()
+
+    async def run(self, items: Iterable, admit: Optional[Callable[[Any], Awaitable[bool]]] = None):
+        """Feed `items` into the first stage and wait until all are done.
+
+        `admit(item)` is awaited before each item is queued; returning False
+        stops feeding (used for the crawl's page budget).
+        """
+        started = time.perf_counter()
+        workers = []
+        for stage, next_stage in zip(self.stages, self.stages[1:] + [None]):
+            workers.extend(
+                asyncio.create_task(self._work(stage, next_stage))
+                for _ in range(stage.concurrency)
+            )
+
+        try:
+            first = self.stages[0]
+            for item in items:
+                if admit is not None and not await admit(item):
+                    break
+                await self._put(first, item)
+
+            # Items only move forward, so draining stages in order drains all
+            for stage in self.stages:
+                await stage.inbox.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.elapsed = time.perf_counter() - started
+
+    def report(self) -> Dict[str, Dict]:
+        return {stage.name: stage.report(self.elapsed) for stage in self.stages}
+
+    def format_report(self) -> str:
+        return ", ".join(
+            f"{name} {r['processed']} ({r['per_second']}/s, {r['utilization']:.0%} busy, max queue {r['max_queue']})"
+            for name, r in self.report().items()
+        )
+
+
+def _item_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(days=settings.INGEST_ITEMS_TTL_DAYS)
+
+
+class IngestCheckpoint:
+    """Progress of one ingest run, persisted so it can be resumed.
+
+    The run lives in `ingest_runs`; every URL admitted into the pipeline
+    gets a row in `ingest_items` with its status, updated as the pipeline
+    finishes it. URLs the page budget never reached get no row: the next
+    planned crawl finds them stale again. Rows of a completed run are
+    deleted, and all rows expire INGEST_ITEMS_TTL_DAYS after their last
+    update. Runs record the node working on them, how many attempts they
+    took, their crawl time and per-status counts.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+
+    @classmethod
+    async def create(cls, source: str, planned: int, max_pages: int) -> "IngestCheckpoint":
+        db = get_database()
+        run_id = str(ObjectId())
+        now = datetime.utcnow()
+        await db.ingest_runs.insert_one({
+            "_id": run_id,
+            "source": source,
+            "max_pages": max_pages,
+            "status": "running",
+            "node": NODE_ID,
+            "attempts": 1,
+            "total": planned,
+            "crawl_seconds": 0.0,
+            "started_at": now,
+            "updated_at": now,
+        })
+        return cls(run_id)
+
+    async def admit(self, url: str, lastmod: Optional[datetime], position: int):
+        """Record a URL entering the pipeline; a row left from an earlier attempt is kept."""
+        db = get_database()
+        await db.ingest_items.update_one(
+            {"run_id": self.run_id, "url": url},
+            {
+                "$setOnInsert": {"position": position, "lastmod": lastmod, "status": "pending"},
+                "$set": {"expires_at": _item_expiry()},
+            },
+            upsert=True,
+        )
+
+    @staticmethod
+    async def find_resumable(max_attempts: int, stale_after: timedelta) -> List[Dict]:
+        """Runs that failed, were interrupted, or stopped making progress.
+
+        A "running" run counts as abandoned once it has not recorded a page
+        for `stale_after`, i.e. its node died without marking it.
+        """
+        db = get_database()
+        cursor = db.ingest_runs.find({
+            "attempts": {"$lt": max_attempts},
+            "$or": [
+                {"status": {"$in": list(RESUMABLE_STATUSES)}},
+                {"status": "running", "updated_at": {"$lt": datetime.utcnow() - stale_after}},
+            ],
+        }).sort("started_at", -1)
+        return [doc async for doc in cursor]
+
+    async def load(self) -> Optional[Dict]:
+        db = get_database()
+        return await db.ingest_runs.find_one({"_id": self.run_id})
+
+    async def start_attempt(self):
+        db = get_database()
+        await db.ingest_runs.update_one(
+            {"_id": self.run_id},
+            {
+                "$set": {"status": "running", "node": NODE_ID, "updated_at": datetime.utcnow()},
+                "$inc": {"attempts": 1},
+            },
+        )
+
+    async def remaining(self) -> List[Dict]:
+        """Admitted entries that have not reached a final status yet."""
+        db = get_database()
+        cursor = db.ingest_items.find(
+            {"run_id": self.run_id, "status": {"$nin": list(DONE_STATUSES)}},
+            {"_id": 0, "url": 1, "lastmod": 1},
+        ).sort("position", 1)
+        return [doc async for doc in cursor]
+
+    async def count(self, status: str) -> int:
+        db = get_database()
+        return await db.ingest_items.count_documents({"run_id": self.run_id, "status": status})
+
+    async def counts(self) -> Dict[str, int]:
+        db = get_database()
+        pipeline = [
+            {"$match": {"run_id": self.run_id}},
+            {"$group": {"_id": "$status", "n": {"$sum": 1}}},
+        ]
+        return {doc["_id"]: doc["n"] async for doc in db.ingest_items.aggregate(pipeline)}
+
+    async def mark(self, url: str, status: str, error: Optional[str] = None):
+        db = get_database()
+        now = datetime.utcnow()
+        await db.ingest_items.update_one(
+            {"run_id": self.run_id, "url": url},
+            {"$set": {"status": status, "error": error, "updated_at": now, "expires_at": _item_expiry()}},
+        )
+        # Doubles as the run's liveness signal for find_resumable
+        await db.ingest_runs.update_one({"_id": self.run_id}, {"$set": {"updated_at": now}})
+
+    async def finish(self, status: str, crawl_seconds: float, summary: Dict):
+        """Close this attempt; counts cover every attempt of the run."""
+        db = get_database()
+        now = datetime.utcnow()
+        await db.ingest_runs.update_one(
+            {"_id": self.run_id},
+            {
+                "$set": {
+                    "status": status,
+                    "counts": await self.counts(),
+                    "summary": summary,
+                    "finished_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"crawl_seconds": round(crawl_seconds, 2)},
+            },
+        )
+        if status == "completed":
+            # Nothing left to resume; the run keeps the counts
+            await db.ingest_items.delete_many({"run_id": self.run_id})
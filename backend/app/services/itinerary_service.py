@@ -5,6 +5,9 @@ from fastapi import HTTPException
 
 from app.database import get_database
 from app.models import Itinerary, ItineraryUpdate, Day
+from app.services.day_distributor import distribute
+from app.services.route_optimizer import majority_mode, optimize_day
+from app.services.travel_time_service import MAX_MATRIX_POINTS, TravelTimeService
 
 class ItineraryService:
     @staticmethod
@@ -75,6 +78,95 @@ class ItineraryService:
         
         return await ItineraryService.get_one(itinerary_id, user_id)
 
+    @staticmethod
+    async def optimize_activities(
+        activities: List[Dict[str, Any]], start_time: Optional[str] = "09:00",
+        fixed_start: bool = True, fixed_end: bool = True,
+    ) -> Dict[str, Any]:
+        located = [a for a in activities if a.get("lat") is not None and a.get("lng") is not None]
+        if len(located) > MAX_MATRIX_POINTS:
+            # n² Distance Matrix cells would be slow and costly; use the haversine estimate
+            result = optimize_day(activities, start_time, fixed_start, fixed_end)
+            result["estimated_legs"] = len(located) ** 2
+            return result
+        travel = await TravelTimeService.matrix(
+            [(a["lat"], a["lng"]) for a in located], majority_mode(located)
+        )
+        result = optimize_day(activities, start_time, fixed_start, fixed_end, matrix=travel["seconds"])
+        result["estimated_legs"] = travel["estimated"]
+        return result
+
+    @staticmethod
+    async def optimize_day_route(
+        itinerary_id: str, user_id: str, day_id: str,
+        fixed_start: bool = True, fixed_end: bool = True, apply: bool = False,
+    ) -> Dict[str, Any]:
+        itinerary = await ItineraryService.get_one(itinerary_id, user_id)
+        day = next((d for d in itinerary.days if d.id == day_id), None)
+        if day is None:
+            raise HTTPException(status_code=404, detail="Day not found")
+
+        activities = [a.model_dump() for a in day.activities]
+        result = await ItineraryService.optimize_activities(
+            activities, itinerary.start_times.get(day_id, "09:00"), fixed_start, fixed_end
+        )
+
+        if apply and result["order"] != list(range(len(activities))):
+            db = get_database()
+            await db["itineraries"].update_one(
+                {"_id": ObjectId(itinerary_id), "days.id": day_id},
+                {"$set": {"days.$.activities": result["activities"], "updated_at": datetime.utcnow()}}
+            )
+        return result
+
+    @staticmethod
+    async def distribute_pocket_list(
+        itinerary_id: str, user_id: str, num_days: Optional[int] = None,
+        include_scheduled: bool = False, apply: bool = False,
+    ) -> Dict[str, Any]:
+        """Propose days built from the pocket list, clustered by location.
+
+        Activities already on a day stay there unless `include_scheduled`,
+        in which case they are redistributed along with the pocket list.
+        Days beyond `num_days` are returned unchanged.
+        """
+        itinerary = await ItineraryService.get_one(itinerary_id, user_id)
+        num_days = num_days or max(len(itinerary.days), 1)
+
+        days = [d.model_dump() for d in itinerary.days]
+        for i in range(len(days), num_days):
+            days.append(Day(date=f"Day {i + 1}").model_dump())
+
+        targets = days[:num_days]
+        locations = [a.model_dump() for a in itinerary.pocket_list]
+        if include_scheduled:
+            locations = [a for d in targets for a in d["activities"]] + locations
+            pinned = None
+        else:
+            pinned = [d["activities"] for d in targets]
+
+        result = distribute(
+            locations, num_days, pinned,
+            [itinerary.start_times.get(d["id"], "09:00") for d in targets],
+        )
+        for day, proposed in zip(targets, result["days"]):
+            day["activities"] = proposed["activities"]
+
+        if apply:
+            db = get_database()
+            await db["itineraries"].update_one(
+                {"_id": ObjectId(itinerary_id)},
+                {"$set": {"days": days, "pocket_list": [], "updated_at": datetime.utcnow()}}
+            )
+        return {
+            "days": days,
+            "stats": [
+                {"id": d["id"], "stay_minutes": p["stay_minutes"], "travel_seconds": p["travel_seconds"]}
+                for d, p in zip(targets, result["days"])
+            ],
+            "solve_ms": result["solve_ms"],
+        }
+
     @staticmethod
     async def delete(itinerary_id: str, user_id: str) -> bool:
         db = get_database()
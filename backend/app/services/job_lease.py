@@ -0,0 +1,81 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.database import get_database
+from app.core.logging import logger
+
+# Identifies this process in leases and run records
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobLease:
+    """Mongo-backed mutual exclusion for a named job.
+
+    The lease is one document in `job_leases` keyed by job name. Whoever
+    holds it renews `expires_at` in the background; if the holder dies the
+    lease simply expires and the next node to try takes it over. A holder
+    that finds its lease taken over (it stalled past the TTL) cancels the
+    task that acquired it, so two nodes never keep working side by side.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int = 300, owner: str = NODE_ID):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = owner
+        self.lost = False
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._holder: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> bool:
+        db = get_database()
+        now = datetime.utcnow()
+        try:
+            # Matches only a free (expired) lease or our own; otherwise the
+            # upsert collides with the existing _id
+            await db.job_leases.find_one_and_update(
+                {"_id": self.name, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "acquired_at": now, "expires_at": now + self.ttl}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+
+        self.lost = False
+        self._holder = asyncio.current_task()
+        self._heartbeat = asyncio.create_task(self._renew_forever())
+        logger.info("Lease %s acquired by %s", self.name, self.owner)
+        return True
+
+    async def _renew_forever(self):
+        interval = self.ttl.total_seconds() / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                db = get_database()
+                result = await db.job_leases.update_one(
+                    {"_id": self.name, "owner": self.owner},
+                    {"$set": {"expires_at": datetime.utcnow() + self.ttl}},
+                )
+            except Exception as e:
+                # Transient; the lease survives until expiry, try again next beat
+                logger.warning("Lease %s heartbeat failed: %s", self.name, e)
+                continue
+            if result.matched_count == 0:
+                self.lost = True
+                logger.error("Lease %s was lost by %s", self.name, self.owner)
+                if self._holder is not None:
+                    self._holder.cancel()
+                return
+
+    async def release(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        db = get_database()
+        await db.job_leases.delete_one({"_id": self.name, "owner": self.owner})
+        logger.info("Lease %s released by %s", self.name, self.owner)
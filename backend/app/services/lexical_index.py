@@ -0,0 +1,268 @@
+import asyncio
+import math
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from app.database import get_database
+from app.core.config import settings
+from app.core.logging import logger
+
+# kb_meta document whose `version` every knowledge_articles write bumps
+KB_VERSION_ID = "knowledge_articles"
+
+# Han, Hiragana/Katakana and Hangul runs are tokenized as character bigrams,
+# everything else (latin words, numbers) as whole lowercase words.
+_CJK_RANGES = (
+    "\u3040-\u30ff"  # Hiragana / Katakana
+    "\u3400-\u4dbf"  # CJK Extension A
+    "\u4e00-\u9fff"  # CJK Unified Ideographs
+    "\uac00-\ud7af"  # Hangul
+    "\uf900-\ufaff"  # CJK Compatibility Ideographs
+)
+_TOKEN_RE = re.compile(rf"[{_CJK_RANGES}]+|[a-z0-9]+")
+_CJK_RE = re.compile(rf"[{_CJK_RANGES}]")
+
+
+def tokenize(text: str) -> List[str]:
+    """CJK-aware tokenizer: character bigrams for CJK runs, words otherwise."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for run in _TOKEN_RE.findall(text):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class BM25Index:
+    """In-memory Okapi BM25 index over knowledge base chunks.
+
+    Documents can be added and removed one at a time so the index can follow
+    the crawler instead of being rebuilt from scratch.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_len: Dict[str, int] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._doc_meta: Dict[str, Dict] = {}
+        self._url_docs: Dict[str, List[str]] = defaultdict(list)
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, doc_id: str, text: str, meta: Optional[Dict] = None):
+        if doc_id in self._doc_len:
+            self.remove(doc_id)
+
+        tf = Counter(tokenize(text))
+        for term, count in tf.items():
+            self._postings[term][doc_id] = count
+
+        length = sum(tf.values())
+        self._doc_len[doc_id] = length
+        self._doc_terms[doc_id] = list(tf)
+        self._total_len += length
+        self._doc_meta[doc_id] = meta or {}
+
+        url = self._doc_meta[doc_id].get("url")
+        if url:
+            self._url_docs[url].append(doc_id)
+
+    def remove(self, doc_id: str):
+        length = self._doc_len.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_len -= length
+
+        meta = self._doc_meta.pop(doc_id, {})
+        url = meta.get("url")
+        if url and doc_id in self._url_docs.get(url, []):
+            self._url_docs[url].remove(doc_id)
+            if not self._url_docs[url]:
+                del self._url_docs[url]
+
+        for term in self._doc_terms.pop(doc_id, []):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def remove_url(self, url: str):
+        for doc_id in list(self._url_docs.get(url, [])):
+            self.remove(doc_id)
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        n_docs = len(self._doc_len)
+        if not n_docs:
+            return []
+
+        avg_len = self._total_len / n_docs
+        scores: Dict[str, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            # Snapshot: the event loop may patch the index while this runs in a thread
+            for doc_id, tf in list(postings.items()):
+                length = self._doc_len.get(doc_id)
+                if length is None:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_len
+
+    def get_meta(self, doc_id: str) -> Dict:
+        return self._doc_meta.get(doc_id, {})
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[str]], k: int = 60, limit: Optional[int] = None
+) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists with Reciprocal Rank Fusion."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return fused[:limit] if limit else fused
+
+
+_index: Optional[BM25Index] = None
+_index_version = -1
+_checked_at = 0.0
+_index_lock = asyncio.Lock()
+
+
+async def _kb_version() -> int:
+    doc = await get_database().kb_meta.find_one({"_id": KB_VERSION_ID})
+    return doc["version"] if doc else 0
+
+
+async def bump_kb_version():
+    """Record a knowledge_articles write so other processes reload their index.
+
+    The writing process keeps its own index current incrementally; it only
+    adopts the new version if no other writer got in between.
+    """
+    global _index_version
+    doc = await get_database().kb_meta.find_one_and_update(
+        {"_id": KB_VERSION_ID},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    if _index is not None and doc["version"] == _index_version + 1:
+        _index_version = doc["version"]
+
+
+_PROJECTION = {"_id": 1, "url": 1, "title": 1, "content_chunk": 1}
+_FETCH_BATCH = 500
+
+
+def _add_doc(index: BM25Index, doc: Dict):
+    index.add(
+        str(doc["_id"]),
+        doc.get("content_chunk", ""),
+        {
+            "url": doc.get("url", "#"),
+            "title": doc.get("title", "Unknown Source"),
+            "content": doc.get("content_chunk", ""),
+        },
+    )
+
+
+async def _sync_index(index: BM25Index) -> BM25Index:
+    """Bring `index` in line with the newest RAG_LEXICAL_MAX_CHUNKS chunks.
+
+    Chunks are never edited in place (re-indexing a page deletes and inserts),
+    so diffing ids is enough: only the ids are read for the whole window and
+    content is fetched for chunks the index does not have yet.
+    """
+    db = get_database()
+    cursor = (
+        db.knowledge_articles.find({}, {"_id": 1})
+        .sort("_id", -1)
+        .limit(settings.RAG_LEXICAL_MAX_CHUNKS)
+    )
+    wanted = {doc["_id"] async for doc in cursor}
+    by_key = {str(oid): oid for oid in wanted}
+
+    for doc_id in [doc_id for doc_id in list(index._doc_len) if doc_id not in by_key]:
+        index.remove(doc_id)
+
+    missing = [oid for key, oid in by_key.items() if key not in index]
+    for i in range(0, len(missing), _FETCH_BATCH):
+        batch = missing[i:i + _FETCH_BATCH]
+        async for doc in db.knowledge_articles.find({"_id": {"$in": batch}}, _PROJECTION):
+            _add_doc(index, doc)
+    return index
+
+
+async def get_lexical_index() -> BM25Index:
+    """Return the process-wide BM25 index, loading it from MongoDB on first use.
+
+    Crawls run in the worker, so every RAG_LEXICAL_REFRESH_SECONDS the
+    kb_meta version is checked and, when another process changed the
+    knowledge base, only the added and removed chunks are applied. The
+    index is bounded to the newest RAG_LEXICAL_MAX_CHUNKS chunks.
+    """
+    global _index, _index_version, _checked_at
+    now = time.monotonic()
+    if _index is not None and (now - _checked_at < settings.RAG_LEXICAL_REFRESH_SECONDS or _index_lock.locked()):
+        return _index
+
+    async with _index_lock:
+        if _index is not None and time.monotonic() - _checked_at < settings.RAG_LEXICAL_REFRESH_SECONDS:
+            return _index
+        _checked_at = time.monotonic()
+
+        version = await _kb_version()
+        if _index is not None and version == _index_version:
+            return _index
+
+        # The first load builds a fresh index; later syncs patch the live one
+        _index = await _sync_index(_index if _index is not None else BM25Index())
+        _index_version = version
+        logger.info("Synced BM25 index to %d chunks (knowledge base version %d)", len(_index), version)
+    return _index
+
+
+def add_to_lexical_index(docs: List[Dict]):
+    """Incrementally add freshly inserted knowledge_articles docs to a loaded index."""
+    if _index is None:
+        # Not loaded yet; the first search will pick these up from MongoDB.
+        return
+    for doc in docs:
+        _index.add(
+            str(doc["_id"]),
+            doc["content_chunk"],
+            {"url": doc["url"], "title": doc["title"], "content": doc["content_chunk"]},
+        )
+
+
+def remove_from_lexical_index(url: str):
+    if _index is not None:
+        _index.remove_url(url)
@@ -1,16 +1,47 @@
-import google.generativeai as genai
-from typing import List, Dict
+import asyncio
+import bson
+from typing import List, Dict, Iterable
 from app.database import get_database
 from app.models import KnowledgeArticle
+from app.services.embedding_codec import encode_embedding, encode_query_vector
+from app.services.dedup import content_hash, estimated_jaccard, lsh_bands, minhash_signature
+from pymongo.errors import OperationFailure
+from app.services.lexical_index import (
+    add_to_lexical_index,
+    bump_kb_version,
+    remove_from_lexical_index,
+    get_lexical_index,
+    reciprocal_rank_fusion,
+)
 from app.core.config import settings
+from app.core.genai import get_genai
+from app.core.singleflight import SingleFlight
 from app.core.logging import logger
+from app.core.metrics import span
 
-# Gemini Config
+# Gemini Config (the SDK itself is imported on first use, see get_genai)
 GOOGLE_API_KEY = settings.LLM_API_KEY
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
 
 EMBEDDING_MODEL = "models/text-embedding-004"
+EMBEDDING_DIMENSIONS = 768
+
+# Concurrent requests embedding the same text share one billed call
+_embeddings = SingleFlight("embedding")
+
+def _embed(text: str, task_type: str, **kwargs):
+    # embed_content blocks; run it in a thread so concurrent callers overlap
+    return _embeddings.do(
+        (task_type, text), asyncio.to_thread, get_genai().embed_content,
+        model=EMBEDDING_MODEL, content=text, task_type=task_type, **kwargs
+    )
+
+class EmbeddingFailed(RuntimeError):
+    """A chunk could not be embedded (quota, missing key, API error)."""
+
+def _embedding_size() -> int:
+    """Approximate stored size of one embedding in the configured format."""
+    fields = encode_embedding([0.0] * EMBEDDING_DIMENSIONS, settings.EMBEDDING_STORAGE)
+    return len(bson.encode(fields))
 
 async def get_embedding(text: str) -> List[float]:
     try:
@@ -18,50 +49,161 @@ async def get_embedding(text: str) -> List[float]:
             logger.error("GOOGLE_API_KEY not set")
             return []
             
-        result = genai.embed_content(
-            model=EMBEDDING_MODEL,
-            content=text,
-            task_type="retrieval_document",
-            title="Travel Article Chunk"
-        )
+        with span("embedding.document"):
+            result = await _embed(text, "retrieval_document", title="Travel Article Chunk")
         return result['embedding']
     except Exception as e:
-        logger.error(f"Embedding failed: {e}")
+        logger.error("Embedding failed: %s", e)
         return []
 
-async def index_document(url: str, title: str, chunks: List[str]):
+def new_index_stats() -> Dict[str, int]:
+    return {"chunks": 0, "embedding_calls": 0, "reused": 0, "skipped": 0, "bytes_saved": 0}
+
+async def _find_duplicates(collection, url: str, hashes: List[str], bands: List[List[str]]):
+    """Look up exact (content hash) and near (MinHash LSH) duplicates in bulk.
+
+    Chunks of `url` itself are ignored so re-indexing a page never matches
+    against the version it is replacing.
+    """
+    exact = {}
+    async for doc in collection.find(
+        {"content_hash": {"$in": list(set(hashes))}, "url": {"$ne": url}},
+        {"content_hash": 1}
+    ):
+        exact.setdefault(doc["content_hash"], doc)
+
+    all_bands = list({key for chunk_bands in bands for key in chunk_bands})
+    candidates = []
+    async for doc in collection.find(
+        {"minhash_bands": {"$in": all_bands}, "url": {"$ne": url}},
+        {"minhash": 1, "minhash_bands": 1}
+    ):
+        candidates.append(doc)
+
+    return exact, candidates
+
+def _best_near_duplicate(signature: List[int], chunk_bands: List[str], candidates: List[Dict]):
+    band_set = set(chunk_bands)
+    best, best_score = None, 0.0
+    for doc in candidates:
+        if band_set.isdisjoint(doc.get("minhash_bands", [])):
+            continue
+        score = estimated_jaccard(signature, doc.get("minhash", []))
+        if score > best_score:
+            best, best_score = doc, score
+    if best_score >= settings.CHUNK_NEAR_DUP_THRESHOLD:
+        return best
+    return None
+
+async def build_chunk_docs(
+    url: str, title: str, chunks: Iterable[str], stats: Dict[str, int]
+) -> List[Dict]:
+    """Embed chunks into knowledge_articles documents, skipping known chunks.
+
+    Chunks are matched against existing ones by content hash and by MinHash
+    similarity. Depending on CHUNK_DEDUP_MODE a duplicate either reuses the
+    stored vector ("reuse") or is not stored at all ("skip").
+
+    Raises EmbeddingFailed if any chunk cannot be embedded, so callers never
+    replace a page's stored chunks with a partial set.
+    """
     db = get_database()
     collection = db.knowledge_articles
 
-    existing = await collection.find_one({"url": url})
-    if existing:
-        return 
+    # Duplicate lookups are batched per page, so materialize lazy chunkers here
+    chunks = list(chunks)
+    hashes = [content_hash(chunk) for chunk in chunks]
+    signatures = [minhash_signature(chunk) for chunk in chunks]
+    bands = [lsh_bands(sig) for sig in signatures]
+    exact, candidates = await _find_duplicates(collection, url, hashes, bands)
 
     docs_to_insert = []
-    for chunk in chunks:
-        vector = await get_embedding(chunk)
-        if not vector:
+    for chunk, chunk_hash, signature, chunk_bands in zip(chunks, hashes, signatures, bands):
+        stats["chunks"] += 1
+        match = exact.get(chunk_hash) or _best_near_duplicate(signature, chunk_bands, candidates)
+
+        if match and settings.CHUNK_DEDUP_MODE == "skip":
+            stats["skipped"] += 1
+            stats["bytes_saved"] += len(chunk.encode("utf-8")) + _embedding_size()
             continue
+
+        if match and "embedding" not in match:
+            # Candidates are fetched without vectors; load the one we reuse
+            match = await collection.find_one(
+                {"_id": match["_id"]}, {"embedding": 1, "embedding_scale": 1}
+            ) or {}
+
+        if match and match.get("embedding") is not None:
+            embedding_fields = {"embedding": match["embedding"]}
+            if "embedding_scale" in match:
+                embedding_fields["embedding_scale"] = match["embedding_scale"]
+            stats["reused"] += 1
+        else:
+            vector = await get_embedding(chunk)
+            stats["embedding_calls"] += 1
+            if not vector:
+                raise EmbeddingFailed(f"Could not embed a chunk of {url}")
+            embedding_fields = encode_embedding(vector, settings.EMBEDDING_STORAGE)
             
-        doc = KnowledgeArticle(url=url, title=title, content_chunk=chunk, embedding=vector)
-        docs_to_insert.append(doc.model_dump(by_alias=True, exclude_none=True))
-        
-    if docs_to_insert:
-        await collection.insert_many(docs_to_insert)
-        logger.info(f"Indexed {len(docs_to_insert)} chunks for {url}")
+        doc = KnowledgeArticle(
+            url=url,
+            title=title,
+            content_chunk=chunk,
+            content_hash=chunk_hash,
+            minhash=signature,
+            minhash_bands=chunk_bands,
+        )
+        doc_dict = doc.model_dump(by_alias=True, exclude_none=True)
+        doc_dict.update(embedding_fields)
+        docs_to_insert.append(doc_dict)
 
-async def search_knowledge_base(query: str, limit: int = 5) -> List[Dict]:
-    if not GOOGLE_API_KEY:
-        return []
+        # Let later chunks of the same page match this one too
+        exact.setdefault(chunk_hash, doc_dict)
+        candidates.append(doc_dict)
+
+    return docs_to_insert
+
+async def swap_document_chunks(url: str, new_docs: List[Dict]):
+    """Replace the stored chunks of `url` with already embedded documents."""
+    db = get_database()
+    collection = db.knowledge_articles
+
+    try:
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                await collection.delete_many({"url": url}, session=session)
+                if new_docs:
+                    await collection.insert_many(new_docs, session=session)
+    except OperationFailure as e:
+        if e.code != 20:  # IllegalOperation: transactions unsupported
+            raise
+        for doc in new_docs:
+            doc.pop("_id", None)
+        if new_docs:
+            await collection.insert_many(new_docs)
+        new_ids = [doc["_id"] for doc in new_docs]
+        await collection.delete_many({"url": url, "_id": {"$nin": new_ids}})
+
+    remove_from_lexical_index(url)
+    add_to_lexical_index(new_docs)
+    await bump_kb_version()
+    logger.info("Re-indexed %s with %s chunks", url, len(new_docs))
 
+def format_index_stats(stats: Dict[str, int]) -> str:
+    saved_calls = stats["reused"] + stats["skipped"]
+    return (
+        f"{stats['chunks']} chunks, {stats['embedding_calls']} embedding calls, "
+        f"{saved_calls} saved ({stats['reused']} reused, {stats['skipped']} skipped), "
+        f"~{stats['bytes_saved'] / 1024:.1f} KB storage saved"
+    )
+
+async def vector_search(query: str, limit: int = 5) -> List[Dict]:
     try:
-        query_embedding = genai.embed_content(
-            model=EMBEDDING_MODEL,
-            content=query,
-            task_type="retrieval_query"
-        )['embedding']
+        # Off the loop (see _embed) so the lexical search runs alongside it
+        with span("embedding.query"):
+            query_embedding = (await _embed(query.strip(), "retrieval_query"))['embedding']
     except Exception as e:
-        logger.error(f"Query embedding failed: {e}")
+        logger.error("Query embedding failed: %s", e)
         return []
 
     db = get_database()
@@ -73,14 +215,14 @@ async def search_knowledge_base(query: str, limit: int = 5) -> List[Dict]:
             "$vectorSearch": {
                 "index": "vector_index",
                 "path": "embedding",
-                "queryVector": query_embedding,
+                "queryVector": encode_query_vector(query_embedding, settings.EMBEDDING_STORAGE),
                 "numCandidates": limit * 10,
                 "limit": limit
             }
         },
         {
             "$project": {
-                "_id": 0,
+                "_id": 1,
                 "content_chunk": 1,
                 "title": 1,
                 "url": 1,
@@ -90,11 +232,84 @@ async def search_knowledge_base(query: str, limit: int = 5) -> List[Dict]:
     ]
     
     results = []
-    async for doc in collection.aggregate(pipeline):
-        results.append({
-            "content": doc['content_chunk'],
-            "title": doc.get('title', 'Unknown Source'),
-            "url": doc.get('url', '#')
-        })
+    with span("vector_search"):
+        async for doc in collection.aggregate(pipeline):
+            results.append({
+                "id": str(doc["_id"]),
+                "content": doc['content_chunk'],
+                "title": doc.get('title', 'Unknown Source'),
+                "url": doc.get('url', '#')
+            })
         
     return results
+
+async def atlas_text_search(query: str, limit: int = 5) -> List[Dict]:
+    """Keyword search through the Atlas Search index (see create_vector_index.py)."""
+    pipeline = [
+        {
+            "$search": {
+                "index": settings.RAG_ATLAS_SEARCH_INDEX,
+                "text": {"query": query, "path": ["content_chunk", "title"]},
+            }
+        },
+        {"$limit": limit},
+        {"$project": {"_id": 1, "content_chunk": 1, "title": 1, "url": 1}},
+    ]
+
+    results = []
+    with span("lexical_search"):
+        async for doc in get_database().knowledge_articles.aggregate(pipeline):
+            results.append({
+                "id": str(doc["_id"]),
+                "content": doc["content_chunk"],
+                "title": doc.get("title", "Unknown Source"),
+                "url": doc.get("url", "#"),
+            })
+    return results
+
+async def lexical_search(query: str, limit: int = 5) -> List[Dict]:
+    if settings.RAG_LEXICAL_BACKEND == "atlas":
+        try:
+            return await atlas_text_search(query, limit)
+        except Exception as e:
+            logger.error("Atlas text search failed: %s", e)
+            return []
+
+    try:
+        index = await get_lexical_index()
+        with span("lexical_search"):
+            hits = await asyncio.to_thread(index.search, query, limit)
+    except Exception as e:
+        logger.error("Lexical search failed: %s", e)
+        return []
+
+    return [{"id": doc_id, **index.get_meta(doc_id)} for doc_id, _ in hits]
+
+def fuse_results(result_lists: List[List[Dict]], limit: int = 5) -> List[Dict]:
+    """Merge ranked result lists with reciprocal rank fusion, keyed by chunk id."""
+    by_id = {}
+    for results in result_lists:
+        for doc in results:
+            by_id.setdefault(doc["id"], doc)
+
+    fused = reciprocal_rank_fusion(
+        [[doc["id"] for doc in results] for results in result_lists],
+        k=settings.RAG_RRF_K,
+        limit=limit,
+    )
+    return [by_id[doc_id] for doc_id, _ in fused]
+
+async def search_knowledge_base(query: str, limit: int = 5) -> List[Dict]:
+    if not GOOGLE_API_KEY:
+        return []
+
+    if not settings.RAG_HYBRID_SEARCH:
+        return await vector_search(query, limit)
+
+    # Over-fetch from both retrievers so fusion has overlap to work with
+    candidates = limit * 2
+    vector_results, lexical_results = await asyncio.gather(
+        vector_search(query, candidates),
+        lexical_search(query, candidates),
+    )
+    return fuse_results([vector_results, lexical_results], limit)
@@ -0,0 +1,361 @@
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+EARTH_RADIUS_M = 6371000.0
+
+# Door-to-door speed (m/s) for straight-line estimates, and how much longer
+# real roads are than the straight line
+MODE_SPEEDS = {
+    "WALKING": 1.25,
+    "BICYCLING": 3.5,
+    "TRANSIT": 5.5,
+    "DRIVING": 8.5,
+}
+DETOUR_FACTOR = 1.3
+
+# Days with up to this many movable stops are solved exactly
+EXACT_MAX_STOPS = 9
+
+Matrix = List[List[float]]
+
+
+def haversine_distance(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle distance in metres between two (lat, lng) points."""
+    lat_a, lat_b = math.radians(a[0]), math.radians(b[0])
+    h = (
+        math.sin((lat_b - lat_a) / 2) ** 2
+        + math.cos(lat_a) * math.cos(lat_b) * math.sin(math.radians(b[1] - a[1]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def estimate_travel_seconds(meters: float, mode: str = "DRIVING") -> float:
+    return meters * DETOUR_FACTOR / MODE_SPEEDS.get(mode, MODE_SPEEDS["DRIVING"])
+
+
+def haversine_matrix(points: Sequence[Tuple[float, float]]) -> Matrix:
+    """Great-circle distances in metres between all pairs of (lat, lng).
+
+    Trigonometry is computed once per point, leaving only a few
+    multiplications per pair, so a 60-stop day takes well under 10 ms.
+    """
+    lats = [math.radians(lat) for lat, _ in points]
+    lngs = [math.radians(lng) for _, lng in points]
+    cos_lats = [math.cos(lat) for lat in lats]
+    n = len(points)
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        lat_i, lng_i, cos_i = lats[i], lngs[i], cos_lats[i]
+        row = matrix[i]
+        for j in range(i + 1, n):
+            a = (
+                math.sin((lats[j] - lat_i) / 2) ** 2
+                + cos_i * cos_lats[j] * math.sin((lngs[j] - lng_i) / 2) ** 2
+            )
+            d = 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+            row[j] = d
+            matrix[j][i] = d
+    return matrix
+
+
+def estimate_travel_matrix(points: Sequence[Tuple[float, float]], mode: str = "DRIVING") -> Matrix:
+    """Travel seconds between all pairs, from straight-line distance."""
+    return [[estimate_travel_seconds(d, mode) for d in row] for row in haversine_matrix(points)]
+
+
+def route_cost(route: Sequence[int], matrix: Matrix) -> float:
+    return sum(matrix[a][b] for a, b in zip(route, route[1:]))
+
+
+def nearest_neighbor(matrix: Matrix, start: int, end: Optional[int]) -> List[int]:
+    """Greedy tour from `start`, leaving `end` (if fixed) for last."""
+    n = len(matrix)
+    remaining = set(range(n)) - {start} - ({end} if end is not None else set())
+    route = [start]
+    while remaining:
+        current = route[-1]
+        nxt = min(remaining, key=lambda j: (matrix[current][j], j))
+        route.append(nxt)
+        remaining.remove(nxt)
+    if end is not None:
+        route.append(end)
+    return route
+
+
+def exact_route(matrix: Matrix, start: Optional[int], end: Optional[int]) -> List[int]:
+    """Optimal order by Held-Karp dynamic programming, for small days.
+
+    O(2^n * n^2) over the free stops, so it is only used up to
+    EXACT_MAX_STOPS of them.
+    """
+    n = len(matrix)
+    free = [i for i in range(n) if i != start and i != end]
+    k = len(free)
+    full = (1 << k) - 1
+    # cost[mask][j]: cheapest path covering `mask` and ending at free[j]
+    cost = [[math.inf] * k for _ in range(1 << k)]
+    parent = [[-1] * k for _ in range(1 << k)]
+    for j, node in enumerate(free):
+        cost[1 << j][j] = matrix[start][node] if start is not None else 0.0
+    for mask in range(1, 1 << k):
+        row = cost[mask]
+        for j in range(k):
+            if row[j] == math.inf:
+                continue
+            from_node = free[j]
+            for t in range(k):
+                if mask & (1 << t):
+                    continue
+                next_mask = mask | (1 << t)
+                value = row[j] + matrix[from_node][free[t]]
+                if value < cost[next_mask][t]:
+                    cost[next_mask][t] = value
+                    parent[next_mask][t] = j
+
+    def closing(j: int) -> float:
+        return cost[full][j] + (matrix[free[j]][end] if end is not None else 0.0)
+
+    j = min(range(k), key=closing)
+    mask = full
+    tail = []
+    while j != -1:
+        tail.append(free[j])
+        j, mask = parent[mask][j], mask & ~(1 << j)
+    route = ([start] if start is not None else []) + tail[::-1]
+    return route + ([end] if end is not None else [])
+
+
+class _Deadline:
+    def __init__(self, limit_ms: float):
+        self.deadline = time.perf_counter() + limit_ms / 1000
+
+    def passed(self) -> bool:
+        return time.perf_counter() >= self.deadline
+
+
+def two_opt(route: List[int], matrix: Matrix, first: int, last: int, deadline: _Deadline) -> bool:
+    """Reverse segments route[i..j] within [first, last] while that helps.
+
+    Works for asymmetric matrices: the cost of a reversed segment comes
+    from prefix sums of the backward edge costs.
+    """
+    improved_any = False
+    improved = True
+    while improved and not deadline.passed():
+        improved = False
+        forward = [0.0]
+        backward = [0.0]
+        for a, b in zip(route, route[1:]):
+            forward.append(forward[-1] + matrix[a][b])
+            backward.append(backward[-1] + matrix[b][a])
+
+        for i in range(first, last):
+            if deadline.passed():
+                break
+            for j in range(i + 1, last + 1):
+                prev_node, next_index = route[i - 1] if i > 0 else None, j + 1
+                before = forward[j] - forward[i]
+                after = backward[j] - backward[i]
+                if prev_node is not None:
+                    before += matrix[prev_node][route[i]]
+                    after += matrix[prev_node][route[j]]
+                if next_index < len(route):
+                    before += matrix[route[j]][route[next_index]]
+                    after += matrix[route[i]][route[next_index]]
+                if after < before - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = improved_any = True
+                    break
+            if improved:
+                break
+    return improved_any
+
+
+def or_opt(route: List[int], matrix: Matrix, first: int, last: int, deadline: _Deadline, max_segment: int = 3) -> bool:
+    """Move segments of 1..max_segment stops to a cheaper position."""
+    improved_any = False
+    improved = True
+    while improved and not deadline.passed():
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(first, last - length + 2):
+                j = i + length - 1  # Segment route[i..j]
+                prev_node = route[i - 1] if i > 0 else None
+                next_node = route[j + 1] if j + 1 < len(route) else None
+                seg_head, seg_tail = route[i], route[j]
+
+                removed = 0.0
+                if prev_node is not None:
+                    removed += matrix[prev_node][seg_head]
+                if next_node is not None:
+                    removed += matrix[seg_tail][next_node]
+                if prev_node is not None and next_node is not None:
+                    removed -= matrix[prev_node][next_node]
+
+                rest = route[:i] + route[j + 1:]
+                # Insert between rest[k - 1] and rest[k], inside the movable range
+                for k in range(first, last - length + 2):
+                    if k == i:
+                        continue
+                    a = rest[k - 1] if k > 0 else None
+                    b = rest[k] if k < len(rest) else None
+                    added = 0.0
+                    if a is not None:
+                        added += matrix[a][seg_head]
+                    if b is not None:
+                        added += matrix[seg_tail][b]
+                    if a is not None and b is not None:
+                        added -= matrix[a][b]
+                    if added < removed - 1e-9:
+                        route[:] = rest[:k] + route[i:j + 1] + rest[k:]
+                        improved = improved_any = True
+                        break
+                if improved or deadline.passed():
+                    break
+            if improved or deadline.passed():
+                break
+    return improved_any
+
+
+def solve_route(
+    matrix: Matrix,
+    fixed_start: bool = True,
+    fixed_end: bool = True,
+    time_limit_ms: Optional[float] = None,
+) -> List[int]:
+    """Order stops 0..n-1 to minimise total travel cost.
+
+    With `fixed_start`/`fixed_end` the first/last stop keeps its place.
+    Small days are solved exactly. Otherwise nearest neighbour builds the
+    initial tour, then 2-opt and Or-opt take turns until neither improves
+    or the time limit is reached.
+    """
+    n = len(matrix)
+    if n <= 2:
+        return list(range(n))
+    end = n - 1 if fixed_end else None
+    if n - fixed_start - fixed_end <= EXACT_MAX_STOPS:
+        return exact_route(matrix, 0 if fixed_start else None, end)
+
+    if time_limit_ms is None:
+        time_limit_ms = settings.ROUTE_OPTIMIZE_TIME_LIMIT_MS
+    deadline = _Deadline(time_limit_ms)
+
+    if fixed_start:
+        route = nearest_neighbor(matrix, 0, end)
+    else:
+        # Try every free start and keep the cheapest greedy tour
+        starts = [s for s in range(n) if s != end]
+        route = min((nearest_neighbor(matrix, s, end) for s in starts), key=lambda r: route_cost(r, matrix))
+
+    first = 1 if fixed_start else 0
+    last = n - 2 if fixed_end else n - 1
+    while not deadline.passed():
+        changed = two_opt(route, matrix, first, last, deadline)
+        changed = or_opt(route, matrix, first, last, deadline) or changed
+        if not changed:
+            break
+    return route
+
+
+def _parse_clock(value: Optional[str]) -> int:
+    try:
+        hours, minutes = (value or "09:00").split(":")[:2]
+        return int(hours) * 60 + int(minutes)
+    except ValueError:
+        return 9 * 60
+
+
+def _format_clock(minutes: float) -> str:
+    minutes = int(round(minutes))
+    days, minutes = divmod(minutes, 24 * 60)
+    clock = f"{minutes // 60:02d}:{minutes % 60:02d}"
+    return f"{clock} (+{days})" if days else clock
+
+
+def build_schedule(activities: List[Dict], matrix: Matrix, route: List[int], start_time: Optional[str]) -> List[Dict]:
+    """Arrival and departure times along `route`, like the frontend timeline."""
+    cursor = _parse_clock(start_time)
+    schedule = []
+    for position, index in enumerate(route):
+        activity = activities[index]
+        try:
+            stay = int(activity.get("stayDuration") or 60)
+        except (TypeError, ValueError):
+            stay = 60
+        travel = matrix[index][route[position + 1]] / 60 if position + 1 < len(route) else 0.0
+        schedule.append({
+            "id": activity.get("id"),
+            "arrival": _format_clock(cursor),
+            "departure": _format_clock(cursor + stay),
+            "travel_minutes": round(travel),
+        })
+        cursor += stay + round(travel)
+    return schedule
+
+
+def majority_mode(activities: List[Dict]) -> str:
+    counts: Dict[str, int] = {}
+    for activity in activities:
+        mode = activity.get("transportMode") or "DRIVING"
+        counts[mode] = counts.get(mode, 0) + 1
+    return max(counts, key=lambda m: counts[m]) if counts else "DRIVING"
+
+
+def optimize_day(
+    activities: List[Dict],
+    start_time: Optional[str] = None,
+    fixed_start: bool = True,
+    fixed_end: bool = True,
+    matrix: Optional[Matrix] = None,
+    time_limit_ms: Optional[float] = None,
+) -> Dict:
+    """Reorder a day's activities to cut travel time.
+
+    Activities without coordinates are left out of the optimisation and
+    kept, in their original order, after the located ones. `matrix` (travel seconds) defaults to a haversine estimate for the
+    day's majority transport mode. The result carries the new order, the
+    travel time before and after, and a schedule from `start_time` that
+    includes each stop's `stayDuration`.
+    """
+    located_idx = [i for i, a in enumerate(activities) if a.get("lat") is not None and a.get("lng") is not None]
+    unlocated_idx = [i for i, a in enumerate(activities) if a.get("lat") is None or a.get("lng") is None]
+    located = [activities[i] for i in located_idx]
+
+    if matrix is None:
+        points = [(float(a["lat"]), float(a["lng"])) for a in located]
+        matrix = estimate_travel_matrix(points, majority_mode(located))
+
+    started = time.perf_counter()
+    route = solve_route(matrix, fixed_start, fixed_end, time_limit_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    identity = list(range(len(located)))
+    order = [located_idx[i] for i in route] + unlocated_idx
+    return {
+        "activities": [activities[i] for i in order],
+        "order": order,
+        "travel_seconds_before": round(route_cost(identity, matrix)),
+        "travel_seconds_after": round(route_cost(route, matrix)),
+        "schedule": build_schedule(located, matrix, route, start_time),
+        "solve_ms": round(elapsed_ms, 2),
+    }
+
+
+def optimize_plan(plan_data: Dict, start_time: Optional[str] = None) -> Dict:
+    """Reorder every day of a generated plan in place.
+
+    The first and last stops of each day are kept: the LLM usually starts
+    the day somewhere deliberate and ends it at dinner or the hotel. Only
+    travel time is minimised, so the stops in between lose any meal-time or
+    opening-hours placement the LLM gave them; ROUTE_OPTIMIZE_GENERATED
+    turns this pass off.
+    """
+    for day in plan_data.get("days", []):
+        activities = day.get("activities") or []
+        if len(activities) > 3:
+            day["activities"] = optimize_day(activities, start_time, fixed_start=True, fixed_end=True)["activities"]
+    return plan_data
@@ -0,0 +1,291 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple
+
+from pymongo import UpdateOne
+
+from app.database import db as mongo, get_database
+from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.logging import logger
+from app.core.metrics import span
+from app.services.route_optimizer import estimate_travel_seconds, haversine_distance
+
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+TRAVEL_MODES = ("DRIVING", "WALKING", "BICYCLING", "TRANSIT")
+# Distance Matrix API limits per request
+MAX_DIMENSION = 25
+MAX_ELEMENTS = 100
+# Largest matrix fetched from the API per call; bigger ones are estimated
+MAX_MATRIX_POINTS = 60
+# Full matrices a client may request: n points bill n*(n-1) elements, so this
+# keeps one call at 210 instead of 3,540. Consecutive legs stay at the above.
+MAX_REQUEST_MATRIX_POINTS = 15
+
+Point = Tuple[float, float]
+Pair = Tuple[Point, Point]
+
+
+class Leg(NamedTuple):
+    seconds: float
+    meters: float
+    estimated: bool  # True when derived from straight-line distance
+
+
+def round_point(point: Sequence[float]) -> Point:
+    """Snap coordinates so nearby requests for the same stop share cache entries."""
+    digits = settings.TRAVEL_TIME_ROUND_DIGITS
+    return (round(float(point[0]), digits), round(float(point[1]), digits))
+
+
+def leg_key(origin: Point, destination: Point, mode: str) -> str:
+    return f"{mode}|{origin[0]},{origin[1]}|{destination[0]},{destination[1]}"
+
+
+def estimate_leg(origin: Point, destination: Point, mode: str) -> Leg:
+    meters = haversine_distance(origin, destination)
+    return Leg(estimate_travel_seconds(meters, mode), meters, True)
+
+
+class TravelTimeCache:
+    """Two-tier cache of Distance Matrix cells: in-process LRU, then Mongo.
+
+    Entries are `(seconds, meters)`; Mongo drops expired documents through
+    a TTL index on `expires_at`. Estimates are never stored, so a leg
+    computed offline is fetched for real once the API is reachable.
+    """
+
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, float, datetime]]" = OrderedDict()
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0}
+
+    def _remember(self, key: str, seconds: float, meters: float, expires_at: datetime):
+        self._entries[key] = (seconds, meters, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+        """Return cached cells for the keys that have one (misses are absent)."""
+        found: Dict[str, Tuple[float, float]] = {}
+        missing: List[str] = []
+        now = datetime.utcnow()
+        for key in dict.fromkeys(keys):
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                found[key] = entry[:2]
+            else:
+                missing.append(key)
+
+        if missing and mongo.client:
+            try:
+                cursor = get_database().travel_times.find(
+                    {"_id": {"$in": missing}, "expires_at": {"$gt": now}}
+                )
+                async for doc in cursor:
+                    self._remember(doc["_id"], doc["seconds"], doc["meters"], doc["expires_at"])
+                    self.stats["mongo_hits"] += 1
+                    found[doc["_id"]] = (doc["seconds"], doc["meters"])
+            except Exception as e:
+                logger.warning("Travel time cache lookup failed: %s", e)
+
+        self.stats["misses"] += sum(1 for key in missing if key not in found)
+        return found
+
+    async def set_many(self, cells: Dict[str, Tuple[float, float]]):
+        if not cells:
+            return
+        expires_at = datetime.utcnow() + timedelta(days=settings.TRAVEL_TIME_TTL_DAYS)
+        for key, (seconds, meters) in cells.items():
+            self._remember(key, seconds, meters, expires_at)
+        self.stats["stores"] += len(cells)
+
+        if not mongo.client:
+            return
+        operations = [
+            UpdateOne(
+                {"_id": key},
+                {"$set": {"seconds": seconds, "meters": meters, "expires_at": expires_at}},
+                upsert=True,
+            )
+            for key, (seconds, meters) in cells.items()
+        ]
+        try:
+            await get_database().travel_times.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning("Travel time cache write failed: %s", e)
+
+    def report(self) -> Dict:
+        hits = self.stats["memory_hits"] + self.stats["mongo_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._entries),
+        }
+
+
+travel_time_cache = TravelTimeCache(settings.TRAVEL_TIME_CACHE_SIZE)
+api_stats = {"requests": 0, "elements": 0, "estimated": 0, "failures": 0}
+
+
+def _group_rows(missing: Dict[Point, Set[Point]], with_self: bool) -> List[Tuple[List[Point], List[Point]]]:
+    groups: Dict[frozenset, List[Point]] = {}
+    for origin, destinations in missing.items():
+        key = frozenset(destinations | {origin}) if with_self else frozenset(destinations)
+        groups.setdefault(key, []).append(origin)
+    return [(origins, sorted(destinations)) for destinations, origins in groups.items()]
+
+
+def _tile(origins: List[Point], destinations: List[Point]) -> List[Tuple[List[Point], List[Point]]]:
+    dest_chunk = min(MAX_DIMENSION, len(destinations))
+    origin_chunk = max(1, min(MAX_DIMENSION, MAX_ELEMENTS // dest_chunk))
+    return [
+        (origins[i:i + origin_chunk], destinations[j:j + dest_chunk])
+        for i in range(0, len(origins), origin_chunk)
+        for j in range(0, len(destinations), dest_chunk)
+    ]
+
+
+def plan_requests(missing: Dict[Point, Set[Point]]) -> List[Tuple[List[Point], List[Point]]]:
+    """Cover the missing cells with Distance Matrix requests.
+
+    Origins missing the same destinations share a request, so adding one
+    stop to a cached day costs one row and one column. Grouping is tried
+    with and without each origin's own cell: for a cold matrix, paying for
+    the zero-length diagonal turns n one-row requests into a few blocks.
+    The plan with fewer requests wins, then the one with fewer elements.
+    """
+    plans = []
+    for with_self in (False, True):
+        blocks = [tile for group in _group_rows(missing, with_self) for tile in _tile(*group)]
+        elements = sum(len(o) * len(d) for o, d in blocks)
+        plans.append((len(blocks), elements, blocks))
+    return min(plans, key=lambda plan: plan[:2])[2]
+
+
+class TravelTimeService:
+    """Travel times between stops, from the Distance Matrix API behind a cache."""
+
+    @staticmethod
+    async def fetch_block(origins: List[Point], destinations: List[Point], mode: str) -> Dict[Pair, Leg]:
+        params = {
+            "origins": "|".join(f"{lat},{lng}" for lat, lng in origins),
+            "destinations": "|".join(f"{lat},{lng}" for lat, lng in destinations),
+            "mode": mode.lower(),
+            "key": settings.GOOGLE_MAPS_API_KEY,
+        }
+        api_stats["requests"] += 1
+        api_stats["elements"] += len(origins) * len(destinations)
+        with span("distance_matrix.api"):
+            response = await get_http_client().get(DISTANCE_MATRIX_URL, params=params)
+            response.raise_for_status()
+        data = response.json()
+        if data.get("status") != "OK":
+            raise ValueError(f"Distance Matrix failed: {data.get('status')}")
+
+        legs = {}
+        for origin, row in zip(origins, data.get("rows", [])):
+            for destination, element in zip(destinations, row.get("elements", [])):
+                if element.get("status") == "OK":
+                    legs[(origin, destination)] = Leg(
+                        element["duration"]["value"], element["distance"]["value"], False
+                    )
+        return legs
+
+    @staticmethod
+    async def get_legs(pairs: Iterable[Pair], mode: str = "DRIVING") -> Dict[Pair, Leg]:
+        """Travel time for each (origin, destination), keyed by rounded points.
+
+        Cached cells are read in one batch; only the missing ones are sent
+        to the API, in as few requests as plan_requests() can manage.
+        Cells the API cannot provide (no key, network error, no route)
+        fall back to a straight-line estimate.
+        """
+        started = time.perf_counter()
+        wanted = list(dict.fromkeys((round_point(o), round_point(d)) for o, d in pairs))
+        legs: Dict[Pair, Leg] = {pair: Leg(0.0, 0.0, False) for pair in wanted if pair[0] == pair[1]}
+        keys = {pair: leg_key(*pair, mode) for pair in wanted if pair not in legs}
+
+        cached = await travel_time_cache.get_many(keys.values())
+        missing: Dict[Point, Set[Point]] = {}
+        for pair, key in keys.items():
+            if key in cached:
+                legs[pair] = Leg(*cached[key], False)
+            else:
+                missing.setdefault(pair[0], set()).add(pair[1])
+
+        fetched: Dict[Pair, Leg] = {}
+        blocks = plan_requests(missing) if missing else []
+        if blocks and settings.GOOGLE_MAPS_API_KEY:
+            semaphore = asyncio.Semaphore(settings.TRAVEL_TIME_CONCURRENCY)
+
+            async def fetch(origins: List[Point], destinations: List[Point]):
+                async with semaphore:
+                    try:
+                        return await TravelTimeService.fetch_block(origins, destinations, mode)
+                    except Exception as e:
+                        api_stats["failures"] += 1
+                        logger.error("Distance Matrix request failed: %s", e)
+                        return {}
+
+            for block in await asyncio.gather(*(fetch(o, d) for o, d in blocks)):
+                fetched.update(block)
+            await travel_time_cache.set_many({
+                leg_key(*pair, mode): (leg.seconds, leg.meters) for pair, leg in fetched.items()
+            })
+
+        estimated = 0
+        for pair in keys:
+            if pair in legs:
+                continue
+            if pair in fetched:
+                legs[pair] = fetched[pair]
+            else:
+                legs[pair] = estimate_leg(*pair, mode)
+                estimated += 1
+        api_stats["estimated"] += estimated
+
+        logger.info(
+            "Travel times for %d legs: %d cached, %d fetched in %d requests, %d estimated in %.2fs",
+            len(wanted), len(cached), len(fetched),
+            len(blocks) if settings.GOOGLE_MAPS_API_KEY else 0, estimated, time.perf_counter() - started,
+        )
+        return legs
+
+    @staticmethod
+    async def matrix(points: Sequence[Point], mode: str = "DRIVING") -> Dict:
+        """Full travel-time matrix between `points` (seconds and metres)."""
+        rounded = [round_point(p) for p in points]
+        legs = await TravelTimeService.get_legs(((o, d) for o in rounded for d in rounded), mode)
+        return {
+            "mode": mode,
+            "seconds": [[legs[(o, d)].seconds for d in rounded] for o in rounded],
+            "meters": [[legs[(o, d)].meters for d in rounded] for o in rounded],
+            "estimated": sum(1 for o in rounded for d in rounded if legs[(o, d)].estimated),
+        }
+
+    @staticmethod
+    async def route_legs(points: Sequence[Point], modes: Sequence[str]) -> List[Dict]:
+        """Legs between consecutive points; modes[i] is the mode out of points[i]."""
+        rounded = [round_point(p) for p in points]
+        by_mode: Dict[str, List[Pair]] = {}
+        for i in range(len(rounded) - 1):
+            by_mode.setdefault(modes[i], []).append((rounded[i], rounded[i + 1]))
+        results = dict(zip(by_mode, await asyncio.gather(
+            *(TravelTimeService.get_legs(pairs, mode) for mode, pairs in by_mode.items())
+        )))
+        legs = []
+        for i in range(len(rounded) - 1):
+            leg = results[modes[i]][(rounded[i], rounded[i + 1])]
+            legs.append({"seconds": round(leg.seconds), "meters": round(leg.meters), "estimated": leg.estimated})
+        return legs
+
+    @staticmethod
+    def report() -> Dict:
+        return {**travel_time_cache.report(), "api": dict(api_stats)}
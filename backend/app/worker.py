@@ -0,0 +1,150 @@
+"""Standalone crawl worker.
+
+Runs crawl jobs from the `crawl_jobs` queue outside the API process, so
+fetching, parsing and embedding never share an event loop with user
+requests:
+
+    python -m app.worker --concurrency 2
+
+SIGINT/SIGTERM stop claiming new jobs; running jobs get
+CRAWL_WORKER_SHUTDOWN_SECONDS to finish before they are handed back to the
+queue for another worker.
+"""
+import argparse
+import asyncio
+import signal
+from typing import Dict, Tuple
+
+from dotenv import load_dotenv
+
+from app.database import connect_to_mongo, close_mongo_connection, ensure_indexes
+from app.services.crawler import crawl_and_index, resume_sitemap_crawl
+from app.services.crawl_jobs import run_scheduled_crawl
+from app.services.crawl_client import close_crawl_client
+from app.services.crawl_queue import claim_next_job, finish_job, heartbeat_job, requeue_job
+from app.services.extractor import shutdown_extractor_pool
+from app.services.job_lease import NODE_ID
+from app.core.config import settings
+from app.core.logging import logger, setup_logging
+
+
+async def run_job(job: Dict) -> Tuple[bool, str]:
+    kind = job["kind"]
+    if kind == "crawl":
+        max_pages = job["max_pages"] if job["max_pages"] is not None else 10
+        return await crawl_and_index(job["url"], max_pages=max_pages)
+    if kind == "resume":
+        return await resume_sitemap_crawl(job["run_id"])
+    if kind == "scheduled":
+        results = await run_scheduled_crawl(max_pages=job["max_pages"])
+        if results is None:
+            return True, "Scheduled crawl already running on another node"
+        return all(ok for ok, _ in results), "; ".join(message for _, message in results)
+    return False, f"Unknown job kind: {kind}"
+
+
+class CrawlWorker:
+    def __init__(self, concurrency: int, poll_seconds: float):
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self.stopping = asyncio.Event()
+
+    def stop(self):
+        if not self.stopping.is_set():
+            logger.info("Worker shutting down, finishing running jobs...")
+            self.stopping.set()
+
+    async def _heartbeat(self, job_id: str, worker: str):
+        """Keep the job claimed; returns once another worker has reclaimed it."""
+        interval = settings.CRAWL_JOB_TIMEOUT_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await heartbeat_job(job_id, worker):
+                    return
+            except Exception as e:
+                logger.warning("Heartbeat failed for job %s: %s", job_id, e)
+
+    async def _process(self, job: Dict, worker: str):
+        logger.info("[%s] Running %s job %s (%s)", worker, job['kind'], job['id'], job.get('url') or job.get('run_id') or '')
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"], worker))
+        task = asyncio.create_task(run_job(job))
+        stop_wait = asyncio.create_task(self.stopping.wait())
+        try:
+            await asyncio.wait({task, stop_wait, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+            if heartbeat.done() and not task.done():
+                # We stalled past the timeout and the job was reclaimed; the
+                # other worker's run is the one that counts
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                logger.warning("[%s] Job %s was reclaimed by another worker, abandoned", worker, job['id'])
+                return
+            if not task.done():
+                # Shutting down: give the job a grace period, then hand it back
+                done, _ = await asyncio.wait({task}, timeout=settings.CRAWL_WORKER_SHUTDOWN_SECONDS)
+                if not done:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    await requeue_job(job["id"], worker)
+                    logger.warning("[%s] Job %s returned to the queue", worker, job['id'])
+                    return
+            try:
+                success, message = task.result()
+            except Exception as e:
+                success, message = False, str(e)
+            await finish_job(job["id"], worker, success, message)
+            logger.info("[%s] Job %s %s: %s", worker, job['id'], 'done' if success else 'failed', message)
+        finally:
+            heartbeat.cancel()
+            stop_wait.cancel()
+
+    async def _consume(self, slot: int):
+        worker = f"{NODE_ID}#{slot}"
+        while not self.stopping.is_set():
+            try:
+                job = await claim_next_job(worker)
+            except Exception as e:
+                logger.error("[%s] Could not claim a job: %s", worker, e)
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job, worker)
+
+    async def run(self):
+        logger.info("Crawl worker %s started with %s slot(s)", NODE_ID, self.concurrency)
+        await asyncio.gather(*(self._consume(slot) for slot in range(self.concurrency)))
+
+
+async def main(concurrency: int, poll_seconds: float):
+    setup_logging()
+    await connect_to_mongo()
+    await ensure_indexes()
+
+    worker = CrawlWorker(concurrency, poll_seconds)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await close_crawl_client()
+        shutdown_extractor_pool()
+        await close_mongo_connection()
+        logger.info("Crawl worker stopped")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Crawl job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.CRAWL_WORKER_CONCURRENCY, help="Jobs to run at the same time")
+    parser.add_argument("--poll", type=float, default=settings.CRAWL_WORKER_POLL_SECONDS, help="Seconds between polls of an empty queue")
+
+    args = parser.parse_args()
+
+    asyncio.run(main(args.concurrency, args.poll))
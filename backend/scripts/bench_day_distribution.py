@@ -0,0 +1,85 @@
+import argparse
+import random
+from app.services.day_distributor import distribute
+from app.services.route_optimizer import estimate_travel_matrix, route_cost
+
+# Spreads a synthetic pocket list (places around a few hotspots, stays of
+# 30-180 minutes) over N days and compares:
+#   in-order    the list cut into N consecutive chunks, as when dragging items
+#               into days top to bottom
+#   unbalanced  k-medoids on location alone (no stay-time limit)
+#   balanced    day_distributor.distribute (stay-balanced k-medoids)
+# Travel is the optimized in-day route time summed over days; imbalance is
+# the longest day's stay time over the mean.
+#
+#   python scripts/bench_day_distribution.py --places 20 40 80 --days 3 5
+
+
+def pocket_list(count, rng):
+    hotspots = [(25.0 + rng.random() * 0.3, 121.3 + rng.random() * 0.4) for _ in range(rng.randint(3, 6))]
+    places = []
+    for i in range(count):
+        lat, lng = rng.choice(hotspots)
+        places.append({
+            "id": f"p{i}",
+            "title": f"Place {i}",
+            "lat": lat + rng.gauss(0, 0.01),
+            "lng": lng + rng.gauss(0, 0.01),
+            "stayDuration": rng.choice([30, 60, 60, 90, 120, 180]),
+        })
+    return places
+
+
+def day_travel(activities):
+    if len(activities) < 2:
+        return 0.0
+    matrix = estimate_travel_matrix([(a["lat"], a["lng"]) for a in activities])
+    return route_cost(range(len(activities)), matrix)
+
+
+def measure(days):
+    stays = [sum(a["stayDuration"] for a in day) for day in days]
+    travel = sum(day_travel(day) for day in days) / 60
+    return travel, max(stays) / (sum(stays) / len(stays))
+
+
+def main(place_counts, day_counts, trials, seed):
+    rng = random.Random(seed)
+    print(f"{'places':>7}{'days':>6}  {'travel min (in-order / unbalanced / balanced)':<46}"
+          f"{'imbalance':>22}{'ms':>8}")
+    for places in place_counts:
+        for num_days in day_counts:
+            totals = {"in-order": [0.0, 0.0], "unbalanced": [0.0, 0.0], "balanced": [0.0, 0.0]}
+            worst_ms = 0.0
+            for _ in range(trials):
+                pocket = pocket_list(places, rng)
+                size = -(-places // num_days)
+                chunks = [pocket[i:i + size] for i in range(0, places, size)]
+                # Order chunks the same way distribute() does, so only the grouping differs
+                in_order = [distribute(chunk, 1)["days"][0]["activities"] for chunk in chunks]
+                unbalanced = distribute(pocket, num_days, tolerance=1000)
+                balanced = distribute(pocket, num_days)
+                worst_ms = max(worst_ms, balanced["solve_ms"])
+                for label, days in [
+                    ("in-order", in_order),
+                    ("unbalanced", [d["activities"] for d in unbalanced["days"]]),
+                    ("balanced", [d["activities"] for d in balanced["days"]]),
+                ]:
+                    travel, imbalance = measure(days)
+                    totals[label][0] += travel / trials
+                    totals[label][1] += imbalance / trials
+            travel = " / ".join(f"{totals[k][0]:.0f}" for k in totals)
+            imbalance = " / ".join(f"{totals[k][1]:.2f}" for k in totals)
+            print(f"{places:>7}{num_days:>6}  {travel:<46}{imbalance:>22}{worst_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pocket-list distribution into days")
+    parser.add_argument("--places", type=int, nargs="+", default=[20, 40, 80], help="Pocket list sizes")
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 5], help="Day counts")
+    parser.add_argument("--trials", type=int, default=5, help="Random pocket lists per size")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+
+    args = parser.parse_args()
+
+    main(args.places, args.days, args.trials, args.seed)
@@ -0,0 +1,95 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup
+from app.services.chunker import iter_blocks
+from app.services.extractor import CONTENT_CLASSES, NOISE_TAGS, extract_page
+
+# Measures HTML extraction throughput over saved pages:
+#   baseline  full html.parser tree, then find + decompose (the old crawler path)
+#   strained  lxml parse of the content container only (extract_page)
+#   pool      extract_page fanned out over a process pool
+#
+#   python scripts/bench_extraction.py --repeat 20 --workers 4
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "html", "*.html")
+
+
+def baseline_extract(html: str, url: str):
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.title.string.strip() if soup.title and soup.title.string else url
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    target = None
+    for class_name in CONTENT_CLASSES:
+        target = soup.find('div', class_=class_name)
+        if target:
+            break
+    return title, list(iter_blocks(target or soup))
+
+
+def _extract_pair(args):
+    return extract_page(*args)
+
+
+def run_serial(fn, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url, html in pages:
+            fn(html, url)
+    return time.perf_counter() - start
+
+
+def run_pool(pages, repeat, workers):
+    jobs = [(html, url) for _ in range(repeat) for url, html in pages]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Warm the workers so process start-up is not timed
+        list(pool.map(_extract_pair, jobs[:workers]))
+        start = time.perf_counter()
+        list(pool.map(_extract_pair, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+        return time.perf_counter() - start
+
+
+def main(pattern, repeat, workers):
+    pages = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8") as f:
+            pages.append((path, f.read()))
+    if not pages:
+        print(f"No HTML files match {pattern}")
+        return
+
+    size_kb = sum(len(html.encode("utf-8")) for _, html in pages) / 1024
+    print(f"{len(pages)} pages, {size_kb:.0f} KB, x{repeat} repetitions")
+
+    # Sanity check: both paths must see the same article text
+    for url, html in pages:
+        _, old_blocks = baseline_extract(html, url)
+        new_blocks = extract_page(html, url).blocks
+        if [b.text for b in old_blocks] != [b.text for b in new_blocks]:
+            print(f"  warning: block mismatch for {url} ({len(old_blocks)} vs {len(new_blocks)})")
+
+    total = len(pages) * repeat
+    results = [
+        ("baseline", run_serial(baseline_extract, pages, repeat)),
+        ("strained", run_serial(extract_page, pages, repeat)),
+        (f"pool x{workers}", run_pool(pages, repeat, workers)),
+    ]
+
+    print(f"{'method':<14}{'seconds':>10}{'pages/s':>10}{'speedup':>10}")
+    base = results[0][1]
+    for name, elapsed in results:
+        print(f"{name:<14}{elapsed:>10.2f}{total / elapsed:>10.1f}{base / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction throughput")
+    parser.add_argument("--pages", type=str, default=DEFAULT_FIXTURES, help="Glob of saved HTML files")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the page set")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Process pool size")
+
+    args = parser.parse_args()
+
+    main(args.pages, args.repeat, args.workers)
@@ -0,0 +1,83 @@
+import argparse
+import random
+import time
+import tracemalloc
+from app.core.config import settings
+from app.services.gazetteer import Gazetteer
+from scripts.build_gazetteer import DEFAULT_SEED, read_csv
+
+# Measures offline geocoding on the seed POIs padded with synthetic places to
+# the size of a full OSM extract of Taiwan (~50k named POIs):
+#
+#   python scripts/bench_gazetteer.py --places 50000 --queries 2000
+
+PREFIXES = "台北新竹苗栗彰化南投雲林嘉義屏東宜蘭花蓮金門澎湖基隆桃園高雄"
+MIDDLES = "中正信義大安松山萬華文山北投士林內湖南港永和板橋三重蘆洲新店"
+SUFFIXES = ["老街", "夜市", "公園", "車站", "國小", "廟", "宮", "步道", "博物館", "咖啡", "商圈", "市場", "觀景台"]
+
+
+def synthetic_records(count, rng):
+    records = []
+    for i in range(count):
+        name = (
+            rng.choice(PREFIXES) + rng.choice(PREFIXES)
+            + rng.choice(MIDDLES) + rng.choice(MIDDLES)
+            + f"{i % 97}" + rng.choice(SUFFIXES)
+        )
+        records.append({"name": name, "lat": rng.uniform(22.0, 25.3), "lng": rng.uniform(120.1, 121.9), "aliases": []})
+    return records
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    hits = sum(1 for q in queries if fn(q) is not None)
+    elapsed = time.perf_counter() - start
+    return hits, elapsed / len(queries) * 1e6
+
+
+def main(places, query_count, seed):
+    rng = random.Random(seed)
+    records = list(read_csv(DEFAULT_SEED))
+    records += synthetic_records(max(0, places - len(records)), rng)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    gazetteer = Gazetteer(
+        [r["name"] for r in records],
+        [r["lat"] for r in records],
+        [r["lng"] for r in records],
+        [(i, alias) for i, r in enumerate(records) for alias in r["aliases"]],
+    )
+    build_seconds = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    names = [r["name"] for r in records]
+    exact = [rng.choice(names) for _ in range(query_count)]
+    # Fuzzy: the names as an LLM tends to write them, with extra words
+    fuzzy = [rng.choice(names) + rng.choice(["一日遊", "周邊", "散步"]) for _ in range(query_count)]
+    missing = [f"不存在的地點{i}" for i in range(query_count)]
+    threshold = settings.GAZETTEER_FUZZY_THRESHOLD
+
+    print(f"{len(records)} places, built in {build_seconds:.2f}s, ~{memory / 1024 / 1024:.1f} MB")
+    print(f"{'query':<10}{'hit rate':>10}{'µs/lookup':>12}")
+    for label, fn, queries in [
+        ("exact", gazetteer.lookup, exact),
+        ("fuzzy", gazetteer.lookup, fuzzy),
+        ("miss", gazetteer.lookup, missing),
+        ("bbox", lambda q: gazetteer.lookup(q, "台南"), exact),
+    ]:
+        hits, micros = timed(fn, queries)
+        print(f"{label:<10}{hits / len(queries):>10.1%}{micros:>12.1f}")
+    print(f"(fuzzy threshold {threshold})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the offline gazetteer")
+    parser.add_argument("--places", type=int, default=50000, help="Total places, seed plus synthetic")
+    parser.add_argument("--queries", type=int, default=2000, help="Queries per lookup kind")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+
+    args = parser.parse_args()
+
+    main(args.places, args.queries, args.seed)
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import copy
+import time
+import httpx
+from app.core.config import settings
+from app.core.http import close_http_client
+from app.services import geocoding_service
+from app.services.geocoding_service import GeocodingService
+from scripts.fakes import FakeGeocodeServer
+
+# Times plan post-processing (geocoding every activity) against a local fake
+# of the Geocoding API with a fixed per-request latency:
+#   serial      one new client per place, awaited one by one (the old path)
+#   concurrent  GeocodingService.geocode_itinerary_activities, cold cache
+#   cached      the same plan again, served from the in-memory geocode cache
+#
+#   python scripts/bench_geocoding.py --days 5 --per-day 5 --latency 0.15
+
+
+def make_plan(days: int, per_day: int, repeats: int):
+    # A few titles recur across days, as they do in generated plans
+    distinct = max(1, days * per_day - repeats)
+    return {
+        "days": [
+            {
+                "id": f"day-{d}",
+                "date": f"Day {d + 1}",
+                "activities": [
+                    {"title": f"景點 {(d * per_day + i) % distinct}", "lat": None, "lng": None}
+                    for i in range(per_day)
+                ],
+            }
+            for d in range(days)
+        ]
+    }
+
+
+async def serial_geocode(plan, url):
+    for day in plan["days"]:
+        for activity in day["activities"]:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(url, params={"address": activity["title"]}, timeout=10.0)
+                location = response.json()["results"][0]["geometry"]["location"]
+                activity["lat"], activity["lng"] = location["lat"], location["lng"]
+
+
+async def main(days, per_day, repeats, latency):
+    server = FakeGeocodeServer(latency=latency).start()
+    geocoding_service.GEOCODE_URL = server.url
+    settings.GOOGLE_MAPS_API_KEY = settings.GOOGLE_MAPS_API_KEY or "fake-key"
+    plan = make_plan(days, per_day, repeats)
+    activities = days * per_day
+
+    try:
+        server.requests = 0
+        start = time.perf_counter()
+        await serial_geocode(copy.deepcopy(plan), server.url)
+        serial = time.perf_counter() - start
+        serial_requests = server.requests
+
+        server.requests = 0
+        start = time.perf_counter()
+        await GeocodingService.geocode_itinerary_activities(copy.deepcopy(plan))
+        concurrent = time.perf_counter() - start
+        concurrent_requests = server.requests
+
+        # Same plan again: every place is now in the geocode cache
+        server.requests = 0
+        start = time.perf_counter()
+        await GeocodingService.geocode_itinerary_activities(copy.deepcopy(plan))
+        cached = time.perf_counter() - start
+        cached_requests = server.requests
+    finally:
+        await close_http_client()
+        server.stop()
+
+    print(f"{activities} activities, {latency * 1000:.0f} ms per request")
+    print(f"{'method':<12}{'requests':>10}{'seconds':>10}")
+    print(f"{'serial':<12}{serial_requests:>10}{serial:>10.2f}")
+    print(f"{'concurrent':<12}{concurrent_requests:>10}{concurrent:>10.2f}")
+    print(f"{'cached':<12}{cached_requests:>10}{cached:>10.2f}")
+    print(f"Speedup: {serial / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark geocoding of a generated plan")
+    parser.add_argument("--days", type=int, default=5, help="Days in the plan")
+    parser.add_argument("--per-day", type=int, default=5, help="Activities per day")
+    parser.add_argument("--repeats", type=int, default=3, help="Activities whose title repeats an earlier one")
+    parser.add_argument("--latency", type=float, default=0.15, help="Simulated API latency in seconds")
+
+    args = parser.parse_args()
+
+    asyncio.run(main(args.days, args.per_day, args.repeats, args.latency))
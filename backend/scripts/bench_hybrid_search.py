@@ -0,0 +1,72 @@
+import asyncio
+import argparse
+import json
+import time
+from dotenv import load_dotenv
+from app.database import connect_to_mongo, close_mongo_connection
+from app.services.rag_service import (
+    vector_search,
+    lexical_search,
+    search_knowledge_base,
+)
+
+load_dotenv()
+
+# Labelled query set format:
+# [{"query": "士林夜市必吃", "relevant_urls": ["https://bunnyann.tw/..."]}, ...]
+
+
+def score(results, relevant_urls, k):
+    urls = [r["url"] for r in results[:k]]
+    hit = any(u in relevant_urls for u in urls)
+    rr = 0.0
+    for rank, url in enumerate(urls, start=1):
+        if url in relevant_urls:
+            rr = 1.0 / rank
+            break
+    return hit, rr
+
+
+async def run_benchmark(queries_path: str, k: int):
+    with open(queries_path, encoding="utf-8") as f:
+        queries = json.load(f)
+
+    await connect_to_mongo()
+
+    modes = {
+        "vector": vector_search,
+        "lexical": lexical_search,
+        "hybrid": search_knowledge_base,
+    }
+
+    # Warm up the lexical index so its one-off load is not counted
+    await lexical_search("warmup", k)
+
+    print(f"{'mode':<10}{'recall@' + str(k):>12}{'MRR':>10}{'avg ms':>10}")
+    for name, search in modes.items():
+        hits = 0
+        rr_total = 0.0
+        elapsed = 0.0
+        for item in queries:
+            start = time.perf_counter()
+            results = await search(item["query"], k)
+            elapsed += time.perf_counter() - start
+
+            hit, rr = score(results, set(item["relevant_urls"]), k)
+            hits += hit
+            rr_total += rr
+
+        n = len(queries) or 1
+        print(f"{name:<10}{hits / n:>12.3f}{rr_total / n:>10.3f}{elapsed / n * 1000:>10.1f}")
+
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare vector, lexical and hybrid retrieval")
+    parser.add_argument("queries", type=str, help="Path to the labelled query set (JSON)")
+    parser.add_argument("--k", type=int, default=5, help="Number of results to evaluate")
+
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.queries, args.k))
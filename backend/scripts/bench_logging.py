@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import logging
+import time
+import httpx
+from fastapi import FastAPI
+from app.core import logging as app_logging
+from app.core.logging import RequestIdMiddleware, setup_logging
+
+# Measures what logging costs a request whose handler writes the lines of a
+# generated plan: one per geocoded place plus a summary. Output goes to a
+# sink that takes --sink-latency per write, like stdout behind a busy log
+# driver or a full pipe. Configurations:
+#   sync      StreamHandler writing on the event loop (the previous setup)
+#   queue     records handed to a background thread, text lines
+#   json      the same with JSON lines
+#   sampled   JSON, keeping 1 in 10 per-place lines (the default LOG_SAMPLE_RATES)
+#
+#   python scripts/bench_logging.py --requests 500 --rounds 3 --sink-latency 0.0002
+
+PLACES_PER_REQUEST = 12
+SAMPLE_RATES = {"bench.hits": 0.1}
+
+
+class SlowStream:
+    def __init__(self, latency):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def flush(self):
+        pass
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+    log = logging.getLogger("bench")
+    hits = log.getChild("hits")
+
+    @app.get("/plan/{plan_id}")
+    async def plan(plan_id: str):
+        for i in range(PLACES_PER_REQUEST):
+            hits.info("Successfully geocoded '%s' to (%s, %s)", f"place-{i}", 25.03 + i / 100, 121.56)
+        log.info("Geocoded %d activities in %.2fs", PLACES_PER_REQUEST, 0.01)
+        return {"id": plan_id}
+
+    return app
+
+
+async def time_requests(client, count):
+    start = time.perf_counter()
+    for i in range(count):
+        await client.get(f"/plan/{i}")
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def main(requests, rounds, sink_latency):
+    configurations = [
+        ("sync", "text", False, {}),
+        ("queue", "text", True, {}),
+        ("json", "json", True, {}),
+        ("sampled", "json", True, SAMPLE_RATES),
+    ]
+    transport = httpx.ASGITransport(app=make_app())
+    results, writes = {}, {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Interleave rounds and keep each configuration's best, so drift in
+        # the machine's speed does not land on one configuration
+        for _ in range(rounds):
+            for label, log_format, use_queue, rates in configurations:
+                stream = SlowStream(sink_latency)
+                setup_logging(stream=stream, log_format=log_format, use_queue=use_queue, sample_rates=rates)
+                logging.getLogger("httpx").setLevel(logging.WARNING)  # the bench client's own lines
+                micros = await time_requests(client, requests)
+                app_logging.shutdown_logging()  # drain the queue outside the timing
+                results[label] = min(results.get(label, micros), micros)
+                writes[label] = stream.writes / requests
+
+    print(f"{PLACES_PER_REQUEST + 1} log calls per request, {sink_latency * 1e6:.0f} µs per sink write")
+    print(f"{'logging':<10}{'µs/request':>12}{'vs sync':>10}{'lines/request':>15}")
+    for label, micros in results.items():
+        print(f"{label:<10}{micros:>12.1f}{micros / results['sync']:>10.0%}{writes[label]:>15.1f}")
+    print(f"Dropped on a full queue: {app_logging.dropped['records']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark logging overhead per request")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per configuration and round")
+    parser.add_argument("--rounds", type=int, default=3, help="Interleaved rounds")
+    parser.add_argument("--sink-latency", type=float, default=0.0002, help="Seconds per write to the log sink")
+
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.rounds, args.sink_latency))
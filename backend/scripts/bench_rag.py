@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from app.services.chunker import chunk_blocks
+from app.services.extractor import extract_page
+from app.services.embedding_codec import encode_embedding, quantized_cosine
+from app.services.lexical_index import BM25Index
+from app.services.rag_service import fuse_results
+from scripts.build_gazetteer import DEFAULT_SEED, read_csv
+from scripts.fakes import fake_embedding
+
+# Offline retrieval benchmark over a frozen corpus of bunnyann.tw-style
+# articles. The fixture holds the source HTML, the frozen chunks and a
+# labelled query set; chunk and query vectors are (fake) embeddings at the
+# production dimension, derived deterministically at load time.
+#
+# Twelve hand-written articles carry the original queries. --generate adds
+# distractors around them: reposts of each article with the phrases its
+# queries ask about scrubbed out (near-duplicates that share most of the
+# text but not the answer), and template articles about other seed places
+# with their own labelled queries. Re-freeze after changing the chunker:
+#
+#   python scripts/bench_rag.py --generate   # implies --freeze
+#   python scripts/bench_rag.py --output bench_rag.json
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "rag_corpus.json")
+EMBEDDING_DIM = 768  # text-embedding-004, as stored in knowledge_articles
+
+PAGE = (
+    "<html><head><title>{title}｜兔兔安安的旅遊日記</title></head><body><nav>首頁 台北 台中 台南</nav>"
+    "<div class='entry-content'>{body}<p>作者簡介：兔兔安安，熱愛旅遊與美食的部落客，走遍台灣各縣市，"
+    "分享最真實的旅遊心得。如果喜歡這篇文章，歡迎追蹤粉絲專頁！</p></div><footer>© bunnyann.tw</footer></body></html>"
+)
+FOODS = ["雞排", "胡椒餅", "芋圓", "蚵仔煎", "臭豆腐", "珍珠奶茶", "蔥油餅", "小籠包", "擔仔麵",
+         "蝦捲", "羊肉湯", "肉圓", "豆花", "刈包", "牛肉麵", "鹽酥雞", "烤玉米", "碗粿"]
+SHOP_FIRST = "阿老陳林王黃張李吳劉蔡楊許鄭謝郭洪"
+SHOP_LAST = ["記", "家", "伯", "姨", "嬤", "師", "兄", "嫂"]
+PRAISE = ["外酥內嫩", "湯頭濃郁", "排隊人潮不斷", "在地人從小吃到大", "份量十足", "價格實在"]
+TRANSPORT = ["搭乘捷運到附近站出口步行約十分鐘", "搭火車到車站後轉乘公車", "開車的話附近有收費停車場",
+             "騎機車最方便，路邊就有停車格", "搭乘台灣好行觀光巴士可以直達"]
+EXTRA = [("營業時間", "大部分攤位從傍晚營業到深夜，假日人潮特別多。"),
+         ("拍照景點", "傍晚時分的夕陽最漂亮，很多遊客會在這裡拍照打卡。"),
+         ("周邊景點", "逛完可以順道走走附近的老街和廟宇。"),
+         ("門票資訊", "全票一百元，學生與長者可以購買優待票。")]
+
+
+class VectorBackend:
+    """Brute-force cosine search, standing in for Atlas $vectorSearch."""
+
+    def __init__(self, storage: str = "array"):
+        self.storage = storage
+        self.docs = []
+
+    def build(self, chunks):
+        self.docs = [
+            {"id": c["id"], "url": c["url"], **encode_embedding(c["embedding"], self.storage)}
+            for c in chunks
+        ]
+
+    def search(self, query, query_vector, k):
+        scored = sorted(
+            self.docs, key=lambda d: quantized_cosine(query_vector, d["embedding"]), reverse=True
+        )
+        return [{"id": d["id"], "url": d["url"]} for d in scored[:k]]
+
+
+class LexicalBackend:
+    def __init__(self):
+        self.index = BM25Index()
+
+    def build(self, chunks):
+        for c in chunks:
+            self.index.add(c["id"], c["content"], {"url": c["url"]})
+
+    def search(self, query, query_vector, k):
+        return [
+            {"id": doc_id, "url": self.index.get_meta(doc_id)["url"]}
+            for doc_id, _ in self.index.search(query, k)
+        ]
+
+
+class HybridBackend:
+    """Same fusion as search_knowledge_base: over-fetch both, then RRF."""
+
+    def __init__(self, storage: str = "array"):
+        self.vector = VectorBackend(storage)
+        self.lexical = LexicalBackend()
+
+    def build(self, chunks):
+        self.vector.build(chunks)
+        self.lexical.build(chunks)
+
+    def search(self, query, query_vector, k):
+        return fuse_results(
+            [
+                self.vector.search(query, query_vector, k * 2),
+                self.lexical.search(query, query_vector, k * 2),
+            ],
+            k,
+        )
+
+
+BACKENDS = {
+    "vector": lambda: VectorBackend("array"),
+    "vector-float32": lambda: VectorBackend("float32"),
+    "vector-int8": lambda: VectorBackend("int8"),
+    "bm25": LexicalBackend,
+    "hybrid": lambda: HybridBackend("array"),
+    "hybrid-int8": lambda: HybridBackend("int8"),
+}
+
+
+def _scrub(html: str, phrases, rng: random.Random) -> str:
+    """Replace every 3+ character piece of `phrases` with filler text."""
+    for phrase in phrases:
+        for length in range(len(phrase), 2, -1):
+            for start in range(len(phrase) - length + 1):
+                piece = phrase[start:start + length]
+                if piece in html:
+                    html = html.replace(piece, "".join(rng.choice(SHOP_FIRST) for _ in piece))
+    return html
+
+
+def generate(fixture: dict, synthetic: int, variants: int, seed: int = 0):
+    """Replace the fixture's generated articles and queries with fresh ones."""
+    rng = random.Random(seed)
+    originals = [a for a in fixture["articles"] if not a.get("generated")]
+    queries = [q for q in fixture["queries"] if not q.get("generated")]
+    articles = list(originals)
+
+    for article in originals:
+        asked = [q["query"] for q in queries if article["url"] in q["relevant_urls"]]
+        for n in range(1, variants + 1):
+            articles.append({
+                "url": article["url"].rstrip("/") + f"-repost-{n}/",
+                "title": f"{article['title']}（第{n}次造訪）",
+                "html": _scrub(article["html"], asked, rng).replace(article["title"], f"{article['title']}（第{n}次造訪）"),
+                "generated": True,
+            })
+
+    # Seed places the hand-written articles mention would make their queries ambiguous
+    known = " ".join(a["html"] for a in originals)
+    places = [p["name"] for p in read_csv(DEFAULT_SEED) if p["name"] not in known]
+    used = set()
+    for i in range(synthetic):
+        place = places[i % len(places)]
+        items = []
+        while len(items) < 3:
+            shop, food = rng.choice(SHOP_FIRST) + rng.choice(SHOP_LAST), rng.choice(FOODS)
+            if (shop, food) not in used:
+                used.add((shop, food))
+                items.append((shop, food))
+        heading, text = rng.choice(EXTRA)
+        body = (
+            f"<h2>交通方式</h2><p>{place}{rng.choice(TRANSPORT)}。</p><h2>必吃美食</h2>"
+            + "".join(f"<li>{shop}{food}：{rng.choice(PRAISE)}。</li>" for shop, food in items)
+            + f"<h2>{heading}</h2><p>{text}</p>"
+        )
+        url = f"https://bunnyann.tw/generated-{i:03d}/"
+        title = f"{place}{rng.choice(['美食攻略', '一日遊', '散策', '必吃清單'])}"
+        articles.append({"url": url, "title": title, "html": PAGE.format(title=title, body=body), "generated": True})
+        shop, food = rng.choice(items)
+        queries.append({"query": f"{shop}{food}", "relevant_urls": [url], "generated": True})
+
+    fixture["articles"] = articles
+    fixture["queries"] = queries
+    fixture["embedding_dim"] = EMBEDDING_DIM
+
+
+def embed(fixture: dict):
+    """Attach fake embeddings to the frozen chunks (not stored in the fixture)."""
+    dim = fixture["embedding_dim"]
+    for chunk in fixture["chunks"]:
+        chunk.setdefault("embedding", fake_embedding(chunk["content"], dim))
+
+
+def freeze(fixture: dict):
+    """Re-chunk the fixture articles."""
+    max_tokens = fixture.get("chunk_max_tokens", 80)
+    chunks = []
+    for article in fixture["articles"]:
+        page = extract_page(article["html"], article["url"])
+        for i, content in enumerate(chunk_blocks(page.blocks, max_tokens=max_tokens, min_chars=20)):
+            chunks.append({
+                "id": f"{article['url']}#{i}",
+                "url": article["url"],
+                "title": article["title"],
+                "content": content,
+            })
+    fixture["chunk_max_tokens"] = max_tokens
+    fixture["chunks"] = chunks
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_backend(name, fixture, k, repeat):
+    tracemalloc.start()
+    backend = BACKENDS[name]()
+    backend.build(fixture["chunks"])
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    dim = fixture["embedding_dim"]
+    latencies = []
+    hits = 0
+    rr_total = 0.0
+    for item in fixture["queries"]:
+        query_vector = fake_embedding(item["query"], dim)
+        relevant = set(item["relevant_urls"])
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = backend.search(item["query"], query_vector, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        urls = [r["url"] for r in results[:k]]
+        hits += any(u in relevant for u in urls)
+        for rank, url in enumerate(urls, start=1):
+            if url in relevant:
+                rr_total += 1.0 / rank
+                break
+
+    n = len(fixture["queries"]) or 1
+    return {
+        f"recall@{k}": round(hits / n, 4),
+        "mrr": round(rr_total / n, 4),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 4),
+            "p99": round(percentile(latencies, 99), 4),
+        },
+        "index_memory_kb": round(memory / 1024, 1),
+    }
+
+
+def main(fixture_path, backends, k, repeat, output, do_freeze, do_generate=False, synthetic=160, variants=2):
+    with open(fixture_path, encoding="utf-8") as f:
+        fixture = json.load(f)
+
+    if do_generate:
+        generate(fixture, synthetic, variants)
+        print(f"Generated {len(fixture['articles'])} articles and {len(fixture['queries'])} queries")
+    if do_freeze or do_generate:
+        freeze(fixture)
+        with open(fixture_path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=1)
+        print(f"Froze {len(fixture['chunks'])} chunks into {fixture_path}")
+        return
+    embed(fixture)
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "fixture": os.path.basename(fixture_path),
+        "chunks": len(fixture["chunks"]),
+        "queries": len(fixture["queries"]),
+        "k": k,
+        "backends": {},
+    }
+
+    print(f"{'backend':<16}{'recall@' + str(k):>10}{'MRR':>8}{'p50 ms':>10}{'p99 ms':>10}{'mem KB':>10}")
+    for name in backends:
+        result = run_backend(name, fixture, k, repeat)
+        report["backends"][name] = result
+        print(
+            f"{name:<16}{result[f'recall@{k}']:>10.3f}{result['mrr']:>8.3f}"
+            f"{result['latency_ms']['p50']:>10.3f}{result['latency_ms']['p99']:>10.3f}"
+            f"{result['index_memory_kb']:>10.1f}"
+        )
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline RAG retrieval benchmark")
+    parser.add_argument("--fixture", type=str, default=DEFAULT_FIXTURE, help="Fixture corpus JSON")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS), help="Backend(s) to run (default: all)")
+    parser.add_argument("--k", type=int, default=5, help="Number of results to evaluate")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per query")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report here")
+    parser.add_argument("--freeze", action="store_true", help="Re-chunk the fixture corpus")
+    parser.add_argument("--generate", action="store_true", help="Regenerate the distractor articles and their queries")
+    parser.add_argument("--synthetic", type=int, default=160, help="Template articles to generate")
+    parser.add_argument("--variants", type=int, default=2, help="Near-duplicate reposts per hand-written article")
+
+    args = parser.parse_args()
+
+    main(
+        args.fixture, args.backend or list(BACKENDS), args.k, args.repeat, args.output,
+        args.freeze, args.generate, args.synthetic, args.variants,
+    )
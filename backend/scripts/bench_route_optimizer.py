@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+from app.services.route_optimizer import (
+    estimate_travel_matrix,
+    nearest_neighbor,
+    route_cost,
+    solve_route,
+)
+
+# Compares day orderings on random stops spread over a city (~10 x 10 km),
+# with the first and last stop pinned as in the itinerary editor:
+#   as-given   the order the stops came in
+#   greedy     nearest neighbour only (what the frontend does)
+#   optimized  route_optimizer.solve_route (exact for small days, otherwise
+#              nearest neighbour + 2-opt / Or-opt under the time limit)
+#
+#   python scripts/bench_route_optimizer.py --sizes 10 20 40 60 --trials 20
+
+
+def random_day(n, rng):
+    return [(25.00 + rng.random() * 0.09, 121.48 + rng.random() * 0.10) for _ in range(n)]
+
+
+def main(sizes, trials, time_limit_ms, seed):
+    rng = random.Random(seed)
+    print(f"{'stops':>6}{'as-given min':>14}{'greedy min':>12}{'optimized min':>15}{'vs greedy':>11}{'ms':>8}")
+    for n in sizes:
+        given = greedy = optimized = 0.0
+        solve_ms = []
+        for _ in range(trials):
+            matrix = estimate_travel_matrix(random_day(n, rng), "DRIVING")
+            given += route_cost(list(range(n)), matrix)
+            greedy += route_cost(nearest_neighbor(matrix, 0, n - 1), matrix)
+
+            start = time.perf_counter()
+            route = solve_route(matrix, fixed_start=True, fixed_end=True, time_limit_ms=time_limit_ms)
+            solve_ms.append((time.perf_counter() - start) * 1000)
+            optimized += route_cost(route, matrix)
+
+        per_day = 60 * trials
+        print(
+            f"{n:>6}{given / per_day:>14.1f}{greedy / per_day:>12.1f}{optimized / per_day:>15.1f}"
+            f"{optimized / greedy - 1:>11.1%}{max(solve_ms):>8.1f}"
+        )
+    print(f"(minutes of travel per day, mean of {trials} days; ms is the worst solve, limit {time_limit_ms} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the day route optimizer")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20, 30, 40, 60], help="Stops per day")
+    parser.add_argument("--trials", type=int, default=20, help="Random days per size")
+    parser.add_argument("--time-limit", type=float, default=200, help="Solver time limit in ms")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+
+    args = parser.parse_args()
+
+    main(args.sizes, args.trials, args.time_limit, args.seed)
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import random
+import time
+import google.generativeai as genai
+from app.core.config import settings
+from app.core.http import close_http_client
+from app.core.singleflight import singleflight_calls
+from app.services import ai_service, geocoding_service, rag_service
+from app.services.ai_service import AIService
+from app.services.geocoding_service import GeocodingService
+from scripts.fakes import FakeGemini, FakeGeocodeServer
+
+# Replays group-chat bursts: a shared suggestion is clicked by --group people
+# at once, so the same plan is generated, the same text embedded and the same
+# new place geocoded concurrently. Clicks arrive spread over --spread
+# seconds, so later ones only share a call that is still running. Against
+# local fakes of Gemini and the Geocoding API, with coalescing off (every
+# call billed) and on.
+#
+#   python scripts/bench_singleflight.py --group 5 --bursts 4 --llm-latency 0.5 --spread 0.3
+
+
+class PassThrough:
+    """A SingleFlight that never coalesces."""
+
+    async def do(self, key, fn, *args, **kwargs):
+        return await fn(*args, **kwargs)
+
+
+async def burst(label, index, group, spread, rng):
+    destination = f"{label}城市{index}"
+
+    async def arrive(call):
+        await asyncio.sleep(rng.uniform(0, spread))
+        return await call()
+
+    await asyncio.gather(
+        *(arrive(lambda: AIService.generate_trip_plan(destination, 2)) for _ in range(group)),
+        *(arrive(lambda: rag_service.get_embedding(f"{destination} 的旅遊筆記")) for _ in range(group)),
+        *(arrive(lambda: GeocodingService.geocode_place(f"{destination}新開的咖啡廳")) for _ in range(group)),
+    )
+
+
+async def run(label, group, bursts, spread, gemini, server):
+    gemini.calls = gemini.embeds = server.requests = 0
+    rng = random.Random(0)  # Same arrival times in both modes
+    started = time.perf_counter()
+    for index in range(bursts):
+        await burst(label, index, group, spread, rng)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<6}{gemini.calls:>14}{gemini.embeds:>12}{server.requests:>14}{elapsed:>10.2f}")
+
+
+async def main(group, bursts, llm_latency, geocode_latency, spread):
+    gemini = FakeGemini(latency=llm_latency, embed_latency=llm_latency / 10)
+    gemini.install(genai)
+    ai_service.AIService._llm_api_key = "fake-key"
+    rag_service.GOOGLE_API_KEY = "fake-key"
+    server = FakeGeocodeServer(latency=geocode_latency).start()
+    geocoding_service.GEOCODE_URL = server.url
+    settings.GOOGLE_MAPS_API_KEY = "fake-key"
+
+    groups = (ai_service._plans, rag_service._embeddings, geocoding_service._lookups)
+    print(f"{bursts} bursts of {group} identical requests over {spread * 1000:.0f} ms, "
+          f"{llm_latency * 1000:.0f} ms per Gemini call")
+    print(f"{'mode':<6}{'gemini calls':>14}{'embeddings':>12}{'geocode API':>14}{'seconds':>10}")
+    try:
+        ai_service._plans, rag_service._embeddings, geocoding_service._lookups = (PassThrough(),) * 3
+        await run("off", group, bursts, spread, gemini, server)
+        ai_service._plans, rag_service._embeddings, geocoding_service._lookups = groups
+        await run("on", group, bursts, spread, gemini, server)
+    finally:
+        await close_http_client()
+        server.stop()
+    print("\n".join(singleflight_calls.samples()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark single-flight coalescing of identical calls")
+    parser.add_argument("--group", type=int, default=5, help="Identical requests per burst")
+    parser.add_argument("--bursts", type=int, default=4, help="Bursts to replay")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake Gemini latency in seconds")
+    parser.add_argument("--geocode-latency", type=float, default=0.1, help="Fake Geocoding API latency in seconds")
+    parser.add_argument("--spread", type=float, default=0.3, help="Seconds over which a burst's requests arrive")
+
+    args = parser.parse_args()
+
+    asyncio.run(main(args.group, args.bursts, args.llm_latency, args.geocode_latency, args.spread))
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Measures a serverless cold start: each run is a fresh interpreter that
+# imports app.main (what api/index.py does on Vercel), runs the lifespan
+# startup and serves GET / in-process.
+#   lazy   the app as shipped
+#   eager  the same, after importing the SDKs the app used to load at import
+#          time (Gemini, google-auth, BeautifulSoup/lxml, APScheduler)
+# Runs set VERCEL=1 and leave MONGODB_URI empty so no network is involved.
+#
+#   python scripts/bench_startup.py --runs 7
+
+EAGER_MODULES = [
+    "google.generativeai",
+    "google.oauth2.id_token",
+    "google.auth.transport.requests",
+    "bs4",
+    "apscheduler.schedulers.asyncio",
+]
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+from app.main import app
+imported = time.perf_counter()
+
+import httpx
+
+async def first_response():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/")
+            assert response.status_code == 200, response.status_code
+
+asyncio.run(first_response())
+served = time.perf_counter()
+heavy = [m for m in ("google.generativeai", "google.oauth2", "bs4", "lxml", "apscheduler", "requests") if m in sys.modules]
+print(json.dumps({"import": imported - started, "first_response": served - started, "heavy": heavy}))
+"""
+
+
+def run_once(modules):
+    env = {**os.environ, "VERCEL": "1", "MONGODB_URI": "", "PYTHONPATH": os.getcwd()}
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, *modules], env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def bench(label, modules, runs):
+    results = [run_once(modules) for _ in range(runs)]
+    medians = {key: statistics.median(r[key] for r in results) * 1000 for key in ("import", "first_response", "process")}
+    print(f"{label:<8}{medians['import']:>12.0f}{medians['first_response']:>16.0f}{medians['process']:>12.0f}"
+          f"   {', '.join(results[-1]['heavy']) or '-'}")
+    return medians
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import time and time to first response")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per variant (median is reported)")
+
+    args = parser.parse_args()
+
+    print(f"Median of {args.runs} cold starts (ms)")
+    print(f"{'variant':<8}{'import':>12}{'first resp.':>16}{'process':>12}   heavy modules loaded")
+    eager = bench("eager", EAGER_MODULES, args.runs)
+    lazy = bench("lazy", [], args.runs)
+    print(f"First response {eager['first_response'] - lazy['first_response']:.0f} ms sooner "
+          f"({lazy['first_response'] / eager['first_response']:.0%} of eager)")
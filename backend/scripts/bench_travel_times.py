@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import random
+import time
+from app.core.config import settings
+from app.core.http import close_http_client
+from app.services import travel_time_service
+from app.services.travel_time_service import TravelTimeService, _tile, round_point
+from scripts.fakes import FakeDistanceMatrixServer
+
+# Replays an itinerary editing session (reorder, add and remove stops) against
+# a local fake of the Distance Matrix API. After every edit the day needs its
+# travel-time matrix (for optimisation) and its consecutive legs (timeline):
+#   uncached  every edit fetches the full matrix and every leg again, which is
+#             what the frontend does today
+#   cached    TravelTimeService, which only requests cells it has not seen
+#
+#   python scripts/bench_travel_times.py --stops 12 --edits 30 --latency 0.1
+
+
+def random_stop(rng):
+    return (25.00 + rng.random() * 0.09, 121.48 + rng.random() * 0.10)
+
+
+def edit_session(stops, edits, rng):
+    day = [random_stop(rng) for _ in range(stops)]
+    yield list(day)
+    for _ in range(edits):
+        action = rng.choice(["move", "move", "add", "remove"])
+        if action == "move" or (action == "remove" and len(day) <= 3):
+            stop = day.pop(rng.randrange(len(day)))
+            day.insert(rng.randrange(len(day) + 1), stop)
+        elif action == "add":
+            day.insert(rng.randrange(len(day) + 1), random_stop(rng))
+        else:
+            day.pop(rng.randrange(len(day)))
+        yield list(day)
+
+
+async def uncached(day):
+    points = [round_point(p) for p in day]
+    blocks = _tile(points, points) + [([a], [b]) for a, b in zip(points, points[1:])]
+    await asyncio.gather(*(TravelTimeService.fetch_block(o, d, "DRIVING") for o, d in blocks))
+
+
+async def cached(day):
+    await TravelTimeService.matrix(day, "DRIVING")
+    await TravelTimeService.route_legs(day, ["DRIVING"] * len(day))
+
+
+async def run(label, fn, days, server):
+    server.requests = server.elements = 0
+    start = time.perf_counter()
+    for day in days:
+        await fn(day)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10}{server.requests:>10}{server.elements:>10}{elapsed:>10.2f}{elapsed / len(days) * 1000:>10.0f}")
+    return server.elements
+
+
+async def main(stops, edits, latency, seed):
+    server = FakeDistanceMatrixServer(latency=latency).start()
+    travel_time_service.DISTANCE_MATRIX_URL = server.url
+    settings.GOOGLE_MAPS_API_KEY = settings.GOOGLE_MAPS_API_KEY or "fake-key"
+    days = list(edit_session(stops, edits, random.Random(seed)))
+
+    print(f"{stops} stops, {edits} edits, {latency * 1000:.0f} ms per request")
+    print(f"{'method':<10}{'requests':>10}{'elements':>10}{'seconds':>10}{'ms/edit':>10}")
+    try:
+        before = await run("uncached", uncached, days, server)
+        after = await run("cached", cached, days, server)
+    finally:
+        await close_http_client()
+        server.stop()
+    print(f"Billed elements: {after / before:.1%} of uncached")
+    print(TravelTimeService.report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the travel-time cache over an editing session")
+    parser.add_argument("--stops", type=int, default=12, help="Stops in the day")
+    parser.add_argument("--edits", type=int, default=30, help="Edits to replay")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated API latency in seconds")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+
+    args = parser.parse_args()
+
+    asyncio.run(main(args.stops, args.edits, args.latency, args.seed))
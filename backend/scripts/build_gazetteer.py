@@ -0,0 +1,100 @@
+import argparse
+import csv
+import json
+import os
+from app.core.config import settings
+from app.services.gazetteer import TAIWAN_BBOX, save_gazetteer
+from app.services.geocode_cache import normalize_place_name
+
+# Builds the offline gazetteer used by GeocodingService from POI datasets:
+#
+#   CSV      name,lat,lng[,aliases]   (aliases separated by "|")
+#   GeoJSON  e.g. an OSM extract of Taiwan exported with osmium / overpass;
+#            Point features are used as-is, other geometries by the centre
+#            of their bounding box. Names come from name, name:zh,
+#            name:zh-Hant, name:en, alt_name and official_name.
+#
+#   python scripts/build_gazetteer.py app/data/taiwan_poi_seed.csv taiwan-poi.geojson
+
+DEFAULT_SEED = os.path.join(os.path.dirname(__file__), "..", "app", "data", "taiwan_poi_seed.csv")
+NAME_TAGS = ("name", "name:zh", "name:zh-Hant", "name:zh-TW", "name:en", "alt_name", "official_name")
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            aliases = [a.strip() for a in (row.get("aliases") or "").split("|") if a.strip()]
+            yield {"name": row["name"].strip(), "lat": float(row["lat"]), "lng": float(row["lng"]), "aliases": aliases}
+
+
+def _flatten(coordinates):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        yield coordinates
+    else:
+        for part in coordinates or []:
+            yield from _flatten(part)
+
+
+def read_geojson(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for feature in data.get("features", []):
+        properties = feature.get("properties") or {}
+        names = []
+        for tag in NAME_TAGS:
+            for value in str(properties.get(tag) or "").split(";"):
+                if value.strip() and value.strip() not in names:
+                    names.append(value.strip())
+        if not names:
+            continue
+
+        points = list(_flatten((feature.get("geometry") or {}).get("coordinates")))
+        if not points:
+            continue
+        lngs = [p[0] for p in points]
+        lats = [p[1] for p in points]
+        yield {
+            "name": names[0],
+            "lat": (min(lats) + max(lats)) / 2,
+            "lng": (min(lngs) + max(lngs)) / 2,
+            "aliases": names[1:],
+        }
+
+
+def in_taiwan(record):
+    min_lat, min_lng, max_lat, max_lng = TAIWAN_BBOX
+    return min_lat <= record["lat"] <= max_lat and min_lng <= record["lng"] <= max_lng
+
+
+def main(sources, output):
+    records = []
+    seen = set()
+    dropped = 0
+    for source in sources:
+        reader = read_geojson if source.endswith((".geojson", ".json")) else read_csv
+        count = 0
+        for record in reader(source):
+            # The same POI often appears as node and way; keep one per ~100 m
+            key = (normalize_place_name(record["name"]), round(record["lat"], 3), round(record["lng"], 3))
+            if not in_taiwan(record) or key in seen:
+                dropped += 1
+                continue
+            seen.add(key)
+            records.append(record)
+            count += 1
+        print(f"{source}: {count} places")
+
+    save_gazetteer(output, records)
+    aliases = sum(len(r["aliases"]) for r in records)
+    print(f"Wrote {len(records)} places ({aliases} aliases, {dropped} dropped) to {output} "
+          f"({os.path.getsize(output) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline POI gazetteer")
+    parser.add_argument("sources", nargs="*", default=[DEFAULT_SEED], help="CSV or GeoJSON POI files")
+    parser.add_argument("--output", type=str, default=settings.GAZETTEER_PATH, help="Gazetteer file to write")
+
+    args = parser.parse_args()
+
+    main(args.sources, args.output)
@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import requests
+from app.services.chunker import chunk_blocks, estimate_tokens, iter_blocks, window_chunks
+from app.services.extractor import parse_content_area
+from app.services.crawl_client import HEADERS
+from app.services.lexical_index import BM25Index
+
+# Compares the fixed 1500/200 character window with the structure-aware
+# chunker on live URLs or saved HTML files.
+#
+# Optional query file for retrieval quality; a query is answered when one of
+# the top-k chunks contains the expected answer text:
+# [{"query": "士林夜市怎麼去", "answer": "劍潭站"}, ...]
+
+
+def load_page(source: str):
+    if os.path.exists(source):
+        with open(source, encoding="utf-8") as f:
+            return source, f.read()
+    response = requests.get(source, headers=HEADERS, timeout=10)
+    response.raise_for_status()
+    return source, response.text
+
+
+def summarize(name, chunks):
+    tokens = [estimate_tokens(c) for c in chunks]
+    total = sum(tokens)
+    print(f"{name:<12}{len(chunks):>8}{total:>12}{(total / len(chunks) if chunks else 0):>12.0f}")
+
+
+def retrieval_quality(chunks, queries, k):
+    index = BM25Index()
+    for i, chunk in enumerate(chunks):
+        index.add(str(i), chunk)
+    hits = 0
+    for item in queries:
+        top = [chunks[int(doc_id)] for doc_id, _ in index.search(item["query"], k)]
+        hits += any(item["answer"] in chunk for chunk in top)
+    return hits / len(queries) if queries else 0.0
+
+
+def main(sources, max_tokens, queries_path, k):
+    window_all, structured_all = [], []
+    for source in sources:
+        url, html = load_page(source)
+        _, target = parse_content_area(html, url)
+        window_all.extend(window_chunks(target.get_text(separator="\n", strip=True)))
+
+        _, target = parse_content_area(html, url)
+        structured_all.extend(chunk_blocks(iter_blocks(target), max_tokens=max_tokens))
+
+    print(f"{'chunker':<12}{'chunks':>8}{'tokens':>12}{'avg/chunk':>12}")
+    summarize("window", window_all)
+    summarize("structured", structured_all)
+
+    if queries_path:
+        with open(queries_path, encoding="utf-8") as f:
+            queries = json.load(f)
+        print(f"\nAnswer found in top-{k} chunks (BM25):")
+        print(f"  window:     {retrieval_quality(window_all, queries, k):.1%}")
+        print(f"  structured: {retrieval_quality(structured_all, queries, k):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare window and structure-aware chunking")
+    parser.add_argument("sources", nargs="+", help="URLs or saved HTML files")
+    parser.add_argument("--max-tokens", type=int, default=500, help="Token budget for the structured chunker")
+    parser.add_argument("--queries", type=str, default=None, help="Optional query/answer JSON file")
+    parser.add_argument("--k", type=int, default=3, help="Top-k chunks for the retrieval check")
+
+    args = parser.parse_args()
+
+    main(args.sources, args.max_tokens, args.queries, args.k)
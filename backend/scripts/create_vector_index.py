@@ -32,9 +32,26 @@ async def create_index():
         "type": "vectorSearch"
     }
 
-    print("Creating Atlas Vector Search Index 'vector_index'...")
+    # Atlas Search (BM25) index for RAG_LEXICAL_BACKEND=atlas; lucene.cjk
+    # splits Chinese/Japanese text into bigrams like the in-memory index does
+    text_model = {
+        "definition": {
+            "mappings": {
+                "dynamic": False,
+                "fields": {
+                    "content_chunk": {"type": "string", "analyzer": "lucene.cjk"},
+                    "title": {"type": "string", "analyzer": "lucene.cjk"},
+                },
+            }
+        },
+        "name": "knowledge_text",
+        "type": "search"
+    }
+
+    print("Creating Atlas Vector Search Index 'vector_index' and Atlas Search Index 'knowledge_text'...")
     try:
         await collection.create_search_index(model=model)
+        await collection.create_search_index(model=text_model)
         print("Index creation initiated. It may take some time to build on Atlas.")
     except Exception as e:
         print(f"Error creating index (Check Atlas UI for manual creation if failed): {e}")
@@ -0,0 +1,560 @@
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.services.lexical_index import tokenize
+
+# Local stand-ins for external services, used by benchmarks so they run
+# offline and deterministically.
+
+
+def fake_embedding(text: str, dim: int = 64) -> List[float]:
+    """Deterministic feature-hashing embedding over CJK-aware tokens.
+
+    Texts sharing tokens get similar vectors, which is enough to exercise
+    vector retrieval without calling the Gemini embedding API.
+    """
+    vector = [0.0] * dim
+    for token in tokenize(text):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "big") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class FakeGeocodeServer:
+    """Local HTTP server answering like the Google Geocoding API.
+
+    Every request sleeps for `latency` seconds to mimic the network round
+    trip; coordinates are derived from the address so they are stable.
+    Addresses in `unknown` get ZERO_RESULTS.
+    """
+
+    def __init__(self, latency: float = 0.1, port: int = 0, unknown: Iterable[str] = ()):
+        self.latency = latency
+        self.unknown = set(unknown)
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.latency)
+                address = parse_qs(urlsplit(self.path).query).get("address", [""])[0]
+                body = json.dumps(server.answer(address)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/maps/api/geocode/json"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def answer(self, address: str) -> Dict:
+        if not address or address in self.unknown:
+            return {"status": "ZERO_RESULTS", "results": []}
+        digest = hashlib.blake2b(address.encode("utf-8"), digest_size=8).digest()
+        lat = 22.0 + int.from_bytes(digest[:4], "big") / 2**32 * 3.3
+        lng = 120.0 + int.from_bytes(digest[4:], "big") / 2**32 * 2.0
+        return {
+            "status": "OK",
+            "results": [{"formatted_address": address, "geometry": {"location": {"lat": lat, "lng": lng}}}],
+        }
+
+    def start(self) -> "FakeGeocodeServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeDistanceMatrixServer:
+    """Local HTTP server answering like the Google Distance Matrix API.
+
+    Sleeps `latency` seconds per request and counts requests and elements
+    (the unit the real API bills by). Durations follow road distance at a
+    constant speed, so they are stable across runs.
+    """
+
+    def __init__(self, latency: float = 0.1, port: int = 0, speed: float = 8.0):
+        self.latency = latency
+        self.speed = speed
+        self.requests = 0
+        self.elements = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query)
+                origins = FakeDistanceMatrixServer.parse(query.get("origins", [""])[0])
+                destinations = FakeDistanceMatrixServer.parse(query.get("destinations", [""])[0])
+                server.requests += 1
+                server.elements += len(origins) * len(destinations)
+                time.sleep(server.latency)
+                body = json.dumps(server.answer(origins, destinations)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/maps/api/distancematrix/json"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @staticmethod
+    def parse(value: str) -> List[tuple]:
+        return [tuple(float(x) for x in point.split(",")) for point in value.split("|") if point]
+
+    def answer(self, origins: List[tuple], destinations: List[tuple]) -> Dict:
+        rows = []
+        for o in origins:
+            elements = []
+            for d in destinations:
+                # Manhattan distance in metres stands in for the road network
+                meters = (abs(o[0] - d[0]) * 111000 + abs(o[1] - d[1]) * 101000)
+                elements.append({
+                    "status": "OK",
+                    "distance": {"value": round(meters)},
+                    "duration": {"value": round(meters / self.speed)},
+                })
+            rows.append({"elements": elements})
+        return {"status": "OK", "rows": rows}
+
+    def start(self) -> "FakeDistanceMatrixServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# --- In-memory Motor stand-in -------------------------------------------------
+
+_MISSING = object()
+
+
+def _path_values(doc, path: str) -> list:
+    """Values at a dotted path; arrays along the way fan out like in Mongo."""
+    values = [doc]
+    for part in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    next_values.append(value[int(part)])
+                else:
+                    next_values.extend(v.get(part, _MISSING) for v in value if isinstance(v, dict))
+            elif isinstance(value, dict):
+                next_values.append(value.get(part, _MISSING))
+        values = next_values
+    flat = []
+    for value in values:
+        flat.extend(value if isinstance(value, list) else [value])
+    return [v for v in flat if v is not _MISSING] if flat else []
+
+
+def _compare(values: list, op: str, arg) -> bool:
+    if op == "$in":
+        return any(v in arg for v in values) or (not values and None in arg)
+    if op == "$nin":
+        return not any(v in arg for v in values)
+    if op == "$ne":
+        return arg not in values
+    if op == "$exists":
+        return bool(values) == bool(arg)
+    comparisons = {
+        "$gt": lambda v: v > arg, "$gte": lambda v: v >= arg,
+        "$lt": lambda v: v < arg, "$lte": lambda v: v <= arg,
+    }
+    if op in comparisons:
+        return any(v is not None and type(v) is type(arg) and comparisons[op](v) for v in values)
+    raise NotImplementedError(f"FakeMotor does not support {op}")
+
+
+def _matches(doc: Dict, query: Dict) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+            continue
+        values = _path_values(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(values, op, arg) for op, arg in condition.items()):
+                return False
+        elif condition not in values and not (condition is None and not values):
+            return False
+    return True
+
+
+def _set_path(doc: Dict, path: str, value, query: Dict):
+    if ".$." in path or path.endswith(".$"):
+        array_path, _, rest = path.partition(".$")
+        rest = rest.lstrip(".")
+        prefix = array_path + "."
+        sub_query = {k[len(prefix):]: v for k, v in query.items() if k.startswith(prefix)}
+        array = doc
+        for part in array_path.split("."):
+            array = array[part]
+        index = next(i for i, item in enumerate(array) if _matches(item, sub_query))
+        if rest:
+            _set_path(array[index], rest, value, {})
+        else:
+            array[index] = value
+        return
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+    target[parts[-1]] = value
+
+
+def _apply_update(doc: Dict, update: Dict, query: Dict, inserting: bool):
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, copy.deepcopy(value), query)
+            elif op == "$inc":
+                current = (_path_values(doc, path) or [0])[0]
+                _set_path(doc, path, current + value, query)
+            elif op == "$unset":
+                parts = path.split(".")
+                target = doc
+                for part in parts[:-1]:
+                    target = target.get(part, {})
+                target.pop(parts[-1], None)
+            elif op != "$setOnInsert":
+                raise NotImplementedError(f"FakeMotor does not support {op}")
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = {k for k, v in projection.items() if v and not isinstance(v, dict)}
+    if included:
+        keep = included | ({"_id"} if projection.get("_id", 1) else set())
+        return {k: v for k, v in doc.items() if k in keep}
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _sort_value(doc: Dict, key: str):
+    values = _path_values(doc, key)
+    # Missing values sort first, as in Mongo
+    return (True, values[0]) if values and values[0] is not None else (False, None)
+
+
+class FakeCursor:
+    def __init__(self, load, latency: float):
+        self._load = load
+        self._latency = latency
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self) -> List[Dict]:
+        docs = self._load()
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d: _sort_value(d, key), reverse=direction < 0)
+        docs = docs[self._skip:]
+        return docs[:self._limit] if self._limit else docs
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(self._latency)
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list(None):
+            yield doc
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeCollection:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.docs: Dict = {}
+
+    def _find(self, query, projection=None) -> List[Dict]:
+        return [_project(d, projection) for d in self.docs.values() if _matches(d, query)]
+
+    def find(self, query=None, projection=None):
+        return FakeCursor(lambda: self._find(query, projection), self.latency)
+
+    async def find_one(self, query=None, projection=None):
+        await asyncio.sleep(self.latency)
+        docs = self._find(query, projection)
+        return docs[0] if docs else None
+
+    async def count_documents(self, query):
+        await asyncio.sleep(self.latency)
+        return sum(1 for d in self.docs.values() if _matches(d, query))
+
+    def _insert(self, doc: Dict):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"Duplicate _id {doc['_id']}")
+        self.docs[doc["_id"]] = doc
+        return doc["_id"]
+
+    async def insert_one(self, doc: Dict):
+        await asyncio.sleep(self.latency)
+        return _Result(inserted_id=self._insert(doc))
+
+    async def insert_many(self, docs: Iterable[Dict], ordered: bool = True):
+        await asyncio.sleep(self.latency)
+        return _Result(inserted_ids=[self._insert(d) for d in docs])
+
+    def _update(self, query, update, upsert: bool, many: bool):
+        matched = [d for d in self.docs.values() if _matches(d, query)]
+        if not many:
+            matched = matched[:1]
+        for doc in matched:
+            _apply_update(doc, update, query, inserting=False)
+        if matched or not upsert:
+            return _Result(matched_count=len(matched), modified_count=len(matched), upserted_id=None)
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        _apply_update(doc, update, query, inserting=True)
+        return _Result(matched_count=0, modified_count=0, upserted_id=self._insert(doc))
+
+    async def update_one(self, query, update, upsert: bool = False):
+        await asyncio.sleep(self.latency)
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query, update, upsert: bool = False):
+        await asyncio.sleep(self.latency)
+        return self._update(query, update, upsert, many=True)
+
+    async def delete_one(self, query):
+        await asyncio.sleep(self.latency)
+        doc = next((d for d in self.docs.values() if _matches(d, query)), None)
+        if doc is not None:
+            del self.docs[doc["_id"]]
+        return _Result(deleted_count=int(doc is not None))
+
+    async def delete_many(self, query):
+        await asyncio.sleep(self.latency)
+        ids = [d["_id"] for d in self.docs.values() if _matches(d, query)]
+        for doc_id in ids:
+            del self.docs[doc_id]
+        return _Result(deleted_count=len(ids))
+
+    async def create_index(self, *args, **kwargs):
+        return None
+
+    def aggregate(self, pipeline: List[Dict]):
+        """Supports $vectorSearch (brute-force cosine), $match, $project, $sort and $limit."""
+        def run():
+            docs = list(self.docs.values())
+            scores = {}
+            for stage in pipeline:
+                (op, spec), = stage.items()
+                if op == "$vectorSearch":
+                    query = spec["queryVector"]
+                    scored = []
+                    for doc in docs:
+                        vector = doc.get(spec["path"])
+                        if isinstance(vector, list) and vector:
+                            dot = sum(a * b for a, b in zip(query, vector))
+                            norm = math.sqrt(sum(a * a for a in vector)) * math.sqrt(sum(b * b for b in query)) or 1.0
+                            scored.append((dot / norm, doc))
+                    scored.sort(key=lambda pair: pair[0], reverse=True)
+                    docs = [doc for _, doc in scored[:spec["limit"]]]
+                    scores = {id(doc): score for score, doc in scored}
+                elif op == "$match":
+                    docs = [d for d in docs if _matches(d, spec)]
+                elif op == "$project":
+                    projected = []
+                    for doc in docs:
+                        out = _project(doc, {k: v for k, v in spec.items() if not isinstance(v, dict)})
+                        for key, value in spec.items():
+                            if isinstance(value, dict) and value.get("$meta") == "vectorSearchScore":
+                                out[key] = scores.get(id(doc), 0.0)
+                        projected.append(out)
+                    docs = projected
+                elif op == "$sort":
+                    for key, direction in reversed(list(spec.items())):
+                        docs.sort(key=lambda d: _sort_value(d, key), reverse=direction < 0)
+                elif op == "$limit":
+                    docs = docs[:spec]
+                else:
+                    raise NotImplementedError(f"FakeMotor does not support {op}")
+            return [copy.deepcopy(d) for d in docs]
+        return FakeCursor(run, self.latency)
+
+
+class FakeDatabase:
+    def __init__(self, latency: float):
+        self._latency = latency
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self._latency)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class FakeMotorClient:
+    """In-memory stand-in for AsyncIOMotorClient.
+
+    Covers the queries the API's request paths issue (equality, dotted and
+    array paths, $in/$gt-style operators, $set/$setOnInsert/$inc/$unset
+    with the positional operator, and $vectorSearch by brute force).
+    `latency` seconds are awaited per operation to stand in for the round
+    trip to a real server.
+    """
+
+    def __init__(self, latency: float = 0.001):
+        self._databases: Dict[str, FakeDatabase] = {}
+        self.latency = latency
+
+    def get_database(self, name: str) -> FakeDatabase:
+        if name not in self._databases:
+            self._databases[name] = FakeDatabase(self.latency)
+        return self._databases[name]
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        return self.get_database(name)
+
+    def close(self):
+        pass
+
+
+# --- Gemini stand-in ----------------------------------------------------------
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGemini:
+    """Stand-in for the parts of google.generativeai the app calls.
+
+    install() replaces GenerativeModel and embed_content on the module.
+    Calls sleep for their latency *synchronously*, like the real SDK, so
+    they hold the event loop exactly as long as production calls do.
+    Plans name `places` (e.g. gazetteer entries) first, then made-up ones
+    that fall through to the geocoder.
+    """
+
+    def __init__(self, latency: float = 0.8, embed_latency: float = 0.05, places: Iterable[str] = ()):
+        self.latency = latency
+        self.embed_latency = embed_latency
+        self.places = list(places)
+        self.calls = 0
+        self.embeds = 0
+
+    def install(self, module):
+        module.GenerativeModel = self._model
+        module.embed_content = self.embed_content
+
+    def embed_content(self, model=None, content="", task_type=None, title=None, **kwargs):
+        self.embeds += 1
+        time.sleep(self.embed_latency)
+        return {"embedding": fake_embedding(content, 768)}
+
+    def _model(self, model_name="gemini", **kwargs):
+        fake = self
+
+        class Chat:
+            def send_message(self, message):
+                return fake.generate(str(message))
+
+        class Model:
+            def generate_content(self, prompt):
+                return fake.generate(prompt)
+
+            def start_chat(self, history=None):
+                return Chat()
+
+        return Model()
+
+    def generate(self, prompt: str) -> _FakeResponse:
+        self.calls += 1
+        time.sleep(self.latency)
+        if '"is_planning"' in prompt:
+            latest = prompt.split("最新訊息：", 1)[-1].split("\n", 1)[0]
+            planning = "規劃" in latest or "行程" in latest
+            return _FakeResponse(json.dumps({
+                "is_planning": planning, "destination": "台北" if planning else "",
+                "days": 2, "preferences": "",
+            }, ensure_ascii=False))
+        if '"activities"' in prompt:
+            match = re.search(r"前往 (.+?) 的 (\d+) 天行程", prompt)
+            destination, days = (match.group(1), int(match.group(2))) if match else ("台北", 2)
+            return _FakeResponse("```json\n" + json.dumps(self.plan(destination, days), ensure_ascii=False) + "\n```")
+        return _FakeResponse("這是模擬的回覆，推薦你去逛逛夜市、走走老街。")
+
+    def plan(self, destination: str, days: int) -> Dict:
+        per_day = 4
+        names = self.places + [f"{destination}秘境景點{i}" for i in range(days * per_day)]
+        return {
+            "title": f"{destination} {days} 日遊",
+            "days": [
+                {
+                    "id": f"day-{d + 1}",
+                    "date": f"Day {d + 1}",
+                    "activities": [
+                        {
+                            "id": f"act-{d}-{i}", "title": names[(d * per_day + i) % len(names)],
+                            "category": "scenic", "description": "", "stayDuration": 60,
+                            "transportMode": "DRIVING", "lat": 25.03 + i * 0.01, "lng": 121.56 + d * 0.01,
+                        }
+                        for i in range(per_day)
+                    ],
+                }
+                for d in range(days)
+            ],
+        }
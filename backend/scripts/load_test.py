@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import socket
+import sys
+import time
+import google.generativeai as genai
+import httpx
+import uvicorn
+from app import database
+from app.auth import create_access_token
+from app.core.config import settings
+from app.services import ai_service, geocoding_service, rag_service
+from scripts.build_gazetteer import DEFAULT_SEED, read_csv
+from scripts.fakes import FakeGemini, FakeGeocodeServer, FakeMotorClient, fake_embedding
+
+# End-to-end load test of app.main:app, served by uvicorn on a local port with
+# every external service replaced by a local stand-in:
+#   Mongo     a local mongod (--mongo-uri, uses a throwaway database) or the
+#             in-memory FakeMotorClient
+#   Gemini    FakeGemini, for chat, plan generation and embeddings
+#   Maps      FakeGeocodeServer for places the gazetteer does not know
+#
+# Virtual users run a weighted mix of itinerary CRUD, shared-link views and
+# assistant calls; the report gives throughput and latency percentiles per
+# operation. Save a run with --json and pass it as --baseline to a later run
+# to fail (exit 1) when an operation's p95 regressed.
+#
+#   python scripts/load_test.py --concurrency 20 --duration 30
+#   python scripts/load_test.py --mix list=50,shared_view=50 --json before.json
+#   python scripts/load_test.py --baseline before.json --tolerance 0.2
+
+DEFAULT_MIX = {
+    "list": 25,
+    "create": 8,
+    "edit": 20,
+    "delete": 2,
+    "shared_view": 30,
+    "chat": 10,
+    "plan": 5,
+}
+CHAT_MESSAGES = ["台北有什麼必吃美食？", "九份怎麼去比較方便？", "推薦台南的老街", "幫我規劃台北兩天行程"]
+DESTINATIONS = ["台北", "台南", "花蓮", "高雄"]
+KNOWLEDGE_CHUNKS = [
+    "士林夜市的豪大大雞排和大餅包小餅是必吃小吃。",
+    "九份老街可以從瑞芳火車站搭公車上山，假日人潮多。",
+    "台南神農街保留老屋，晚上點燈後很適合散步拍照。",
+    "花蓮七星潭的礫石海灘適合看日出，記得早點出發。",
+    "高雄駁二藝術特區有許多展覽與文創小店。",
+]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}' (known: {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def sample_days(rng, count=2):
+    return [
+        {
+            "id": f"day-{d + 1}",
+            "date": f"Day {d + 1}",
+            "activities": [
+                {
+                    "id": f"a-{d}-{i}", "title": f"景點 {rng.randint(1, 500)}", "category": "scenic",
+                    "lat": 25.0 + rng.random() * 0.1, "lng": 121.5 + rng.random() * 0.1,
+                    "stayDuration": rng.choice([30, 60, 90]),
+                }
+                for i in range(rng.randint(2, 5))
+            ],
+        }
+        for d in range(count)
+    ]
+
+
+class VirtualUser:
+    def __init__(self, index, client, shared_tokens, rng):
+        self.client = client
+        self.shared_tokens = shared_tokens
+        self.rng = rng
+        self.itineraries = []
+        token = create_access_token({"sub": f"loadtest-{index}", "email": f"loadtest-{index}@example.com"})
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def create(self):
+        response = await self.client.post(
+            "/api/itineraries", headers=self.headers,
+            json={"title": "Load test trip", "days": sample_days(self.rng)},
+        )
+        if response.status_code == 200:
+            self.itineraries.append(response.json()["_id"])
+        return response
+
+    async def seed(self):
+        for _ in range(2):
+            await self.create()
+        response = await self.client.put(
+            f"/api/itineraries/{self.itineraries[0]}/share", headers=self.headers, json={"is_public": True},
+        )
+        self.shared_tokens.append(response.json()["share_token"])
+
+    async def run(self, operation):
+        if operation == "list":
+            return await self.client.get("/api/itineraries", headers=self.headers)
+        if operation == "create" or (operation in ("edit", "delete") and not self.itineraries):
+            return await self.create()
+        if operation == "edit":
+            return await self.client.patch(
+                f"/api/itineraries/{self.rng.choice(self.itineraries)}", headers=self.headers,
+                json={"days": sample_days(self.rng)},
+            )
+        if operation == "delete":
+            if len(self.itineraries) < 2:
+                return await self.create()
+            return await self.client.delete(f"/api/itineraries/{self.itineraries.pop()}", headers=self.headers)
+        if operation == "shared_view":
+            return await self.client.get(f"/api/public/itineraries/{self.rng.choice(self.shared_tokens)}")
+        if operation == "chat":
+            return await self.client.post(
+                "/api/assistant", headers=self.headers,
+                json={"message": self.rng.choice(CHAT_MESSAGES), "history": []},
+            )
+        if operation == "plan":
+            return await self.client.post(
+                "/api/assistant/generate-plan", headers=self.headers,
+                json={"destination": self.rng.choice(DESTINATIONS), "days": 2},
+            )
+        raise ValueError(operation)
+
+
+async def seed_knowledge_base():
+    collection = database.get_database().knowledge_articles
+    await collection.delete_many({})
+    await collection.insert_many([
+        {
+            "url": f"https://example.com/guide-{i}", "title": f"Guide {i}", "content_chunk": chunk,
+            "embedding": fake_embedding(chunk, 768),
+        }
+        for i, chunk in enumerate(KNOWLEDGE_CHUNKS)
+    ])
+
+
+def install_fakes(args):
+    """Point every external dependency at a local stand-in; returns the geocode server."""
+    if args.mongo_uri:
+        settings.MONGODB_URI = args.mongo_uri
+        settings.DATABASE_NAME = args.database
+    else:
+        # connect_to_mongo() skips connecting without a URI, leaving the fake in place
+        settings.MONGODB_URI = ""
+        database.db.client = FakeMotorClient(latency=args.mongo_latency)
+
+    places = [record["name"] for record in read_csv(DEFAULT_SEED)][:20]
+    FakeGemini(latency=args.llm_latency, embed_latency=args.embed_latency, places=places).install(genai)
+    ai_service.AIService._llm_api_key = "fake-key"
+    rag_service.GOOGLE_API_KEY = "fake-key"
+
+    server = FakeGeocodeServer(latency=args.geocode_latency).start()
+    geocoding_service.GEOCODE_URL = server.url
+    settings.GOOGLE_MAPS_API_KEY = "fake-key"
+    return server
+
+
+async def drive(args, base_url):
+    mix = args.mix or DEFAULT_MIX
+    operations, weights = list(mix), list(mix.values())
+    results = {name: [] for name in operations}
+    errors = {name: 0 for name in operations}
+    limited = {name: 0 for name in operations}
+    shared_tokens = []
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        users = [VirtualUser(i, client, shared_tokens, random.Random(args.seed + i)) for i in range(args.concurrency)]
+        await asyncio.gather(*(user.seed() for user in users))
+
+        deadline = time.perf_counter() + args.duration
+
+        async def loop(user):
+            while time.perf_counter() < deadline:
+                operation = user.rng.choices(operations, weights)[0]
+                started = time.perf_counter()
+                try:
+                    response = await user.run(operation)
+                    # 429s are admission control working, not failures
+                    limited[operation] += response.status_code == 429
+                    failed = response.status_code >= 400 and response.status_code != 429
+                except httpx.HTTPError:
+                    failed = True
+                results[operation].append(time.perf_counter() - started)
+                errors[operation] += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(loop(user) for user in users))
+        elapsed = time.perf_counter() - started
+    return results, errors, limited, elapsed
+
+
+def summarize(results, errors, limited, elapsed):
+    summary = {}
+    for operation, latencies in results.items():
+        latencies = sorted(latencies)
+        summary[operation] = {
+            "requests": len(latencies),
+            "errors": errors[operation],
+            "limited": limited[operation],
+            "rps": round(len(latencies) / elapsed, 2),
+            **{f"p{q}_ms": round(percentile(latencies, q) * 1000, 1) for q in (50, 95, 99)},
+            "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 1),
+        }
+    return summary
+
+
+def print_report(summary, elapsed, args):
+    total = sum(s["requests"] for s in summary.values())
+    print(f"\n{args.concurrency} users for {elapsed:.1f}s, {total} requests ({total / elapsed:.1f}/s), "
+          f"mongo={'mongod' if args.mongo_uri else 'fake'}, llm latency {args.llm_latency * 1000:.0f} ms")
+    print(f"{'operation':<13}{'requests':>9}{'errors':>8}{'429s':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for operation, s in summary.items():
+        print(f"{operation:<13}{s['requests']:>9}{s['errors']:>8}{s['limited']:>7}{s['rps']:>8.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+
+
+def regressions(summary, baseline, tolerance):
+    found = []
+    for operation, s in summary.items():
+        before = baseline.get("operations", {}).get(operation)
+        if not before or not s["requests"]:
+            continue
+        # Ignore a few milliseconds of jitter on fast operations
+        limit = max(before["p95_ms"] * (1 + tolerance), before["p95_ms"] + 5)
+        if s["p95_ms"] > limit:
+            found.append(f"{operation}: p95 {s['p95_ms']} ms > {limit:.1f} ms (baseline {before['p95_ms']} ms)")
+    return found
+
+
+async def main(args):
+    if not args.verbose:
+        for name in ("app", "httpx", "uvicorn.access", "apscheduler"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    geocoder = install_fakes(args)
+    # Imported after the fakes are in place
+    from app.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    serving = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            await asyncio.sleep(0.05)
+        await seed_knowledge_base()
+        results, errors, limited, elapsed = await drive(args, f"http://127.0.0.1:{port}")
+    finally:
+        server.should_exit = True
+        await serving
+        geocoder.stop()
+
+    summary = summarize(results, errors, limited, elapsed)
+    print_report(summary, elapsed, args)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"concurrency": args.concurrency, "duration": elapsed, "operations": summary}, f, indent=2)
+        print(f"Saved results to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(summary, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+        print(f"No p95 regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API against local stand-ins")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load after seeding")
+    parser.add_argument("--mix", type=parse_mix, default=None, help="Operation weights, e.g. list=50,chat=5")
+    parser.add_argument("--mongo-uri", type=str, default="", help="Local mongod to use instead of the in-memory fake")
+    parser.add_argument("--database", type=str, default="lazytravelogue_loadtest", help="Database used with --mongo-uri")
+    parser.add_argument("--mongo-latency", type=float, default=0.001, help="Fake Mongo round trip in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Fake Gemini latency per call in seconds")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Fake embedding latency in seconds")
+    parser.add_argument("--geocode-latency", type=float, default=0.1, help="Fake Geocoding API latency in seconds")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument("--json", type=str, default="", help="Write the results to this file")
+    parser.add_argument("--baseline", type=str, default="", help="Results file to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 increase over the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logs")
+
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,131 @@
+import asyncio
+import argparse
+import random
+import bson
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.embedding_codec import (
+    STORAGE_FORMATS,
+    cosine_similarity,
+    decode_embedding,
+    encode_embedding,
+    storage_format,
+)
+
+load_dotenv()
+
+
+def field_size(fields: dict) -> int:
+    return len(bson.encode(fields))
+
+
+def top_k(query, vectors, k):
+    scored = sorted(
+        range(len(vectors)), key=lambda i: cosine_similarity(query, vectors[i]), reverse=True
+    )
+    return scored[:k]
+
+
+def evaluate_recall(originals, target: str, k: int) -> float:
+    """Recall@k of exact search on re-encoded vectors vs the original vectors."""
+    decoded = []
+    for vector in originals:
+        fields = encode_embedding(vector, target)
+        decoded.append(decode_embedding(fields["embedding"], fields.get("embedding_scale")))
+
+    total = 0.0
+    for query in originals:
+        expected = set(top_k(query, originals, k))
+        got = set(top_k(query, decoded, k))
+        total += len(expected & got) / len(expected)
+    return total / len(originals)
+
+
+async def migrate(target: str, batch_size: int, sample: int, k: int, dry_run: bool):
+    print("Connecting to MongoDB...")
+    await connect_to_mongo()
+    collection = get_database()["knowledge_articles"]
+
+    bytes_before = 0
+    bytes_after = 0
+    converted = 0
+    skipped = 0
+    sample_vectors = []
+    seen = 0
+    ops = []
+
+    cursor = collection.find(
+        {"embedding": {"$exists": True}}, {"embedding": 1, "embedding_scale": 1}
+    )
+    async for doc in cursor:
+        current = {"embedding": doc["embedding"]}
+        if "embedding_scale" in doc:
+            current["embedding_scale"] = doc["embedding_scale"]
+
+        vector = decode_embedding(doc["embedding"], doc.get("embedding_scale"))
+
+        # Reservoir sample of vectors for the recall check
+        seen += 1
+        if len(sample_vectors) < sample:
+            sample_vectors.append(vector)
+        else:
+            j = random.randrange(seen)
+            if j < sample:
+                sample_vectors[j] = vector
+
+        if storage_format(doc["embedding"]) == target:
+            skipped += 1
+            size = field_size(current)
+            bytes_before += size
+            bytes_after += size
+            continue
+
+        new_fields = encode_embedding(vector, target)
+        bytes_before += field_size(current)
+        bytes_after += field_size(new_fields)
+
+        update = {"$set": new_fields}
+        if "embedding_scale" not in new_fields and "embedding_scale" in doc:
+            update["$unset"] = {"embedding_scale": ""}
+        ops.append(UpdateOne({"_id": doc["_id"]}, update))
+        converted += 1
+
+        if len(ops) >= batch_size:
+            if not dry_run:
+                await collection.bulk_write(ops, ordered=False)
+            ops = []
+            print(f"  converted {converted} documents...")
+
+    if ops and not dry_run:
+        await collection.bulk_write(ops, ordered=False)
+
+    print(f"Converted {converted}, already {target}: {skipped}{' (dry run)' if dry_run else ''}")
+    if bytes_before:
+        saved = bytes_before - bytes_after
+        print(
+            f"Embedding storage: {bytes_before / 1024:.1f} KB -> {bytes_after / 1024:.1f} KB "
+            f"({saved / bytes_before:.1%} saved)"
+        )
+
+    if len(sample_vectors) > k:
+        recall = evaluate_recall(sample_vectors, target, k)
+        print(f"Recall@{k} vs original vectors on {len(sample_vectors)} samples: {recall:.4f}")
+
+    if not dry_run:
+        print(f"Remember to set EMBEDDING_STORAGE={target} for new documents and queries.")
+
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-encode stored knowledge base embeddings")
+    parser.add_argument("--to", type=str, choices=STORAGE_FORMATS, required=True, help="Target storage format")
+    parser.add_argument("--batch", type=int, default=500, help="Documents per bulk write")
+    parser.add_argument("--sample", type=int, default=200, help="Vectors sampled for the recall check")
+    parser.add_argument("--k", type=int, default=10, help="k for the recall check")
+    parser.add_argument("--dry-run", action="store_true", help="Report savings without writing")
+
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.to, args.batch, args.sample, args.k, args.dry_run))
@@ -1,30 +1,56 @@
 import asyncio
 import argparse
 from dotenv import load_dotenv
-from app.database import connect_to_mongo, close_mongo_connection, get_database
-from app.services.crawler import crawl_and_index
+from app.database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_database
+from app.services.crawler import crawl_and_index, resume_sitemap_crawl
+from app.services.crawl_jobs import run_scheduled_crawl
+from app.services.crawl_client import close_crawl_client
+from app.services.extractor import shutdown_extractor_pool
 
 load_dotenv()
 
-async def run_crawler(url: str, clean: bool, max_pages: int):
+async def run_crawler(url: str, clean: bool, max_pages: int, resume: str = None, scheduled: bool = False):
     print("Connecting to MongoDB...")
     await connect_to_mongo()
+    await ensure_indexes()
     
     if clean:
         print("Cleaning knowledge base...")
         db = get_database()
         result = await db["knowledge_articles"].delete_many({})
+        await db["crawl_state"].delete_many({})
+        await db["ingest_runs"].delete_many({})
+        await db["ingest_items"].delete_many({})
         print(f"Deleted {result.deleted_count} documents.")
     
-    print(f"Starting crawl for: {url}")
-    print(f"Max pages per sitemap: {max_pages if max_pages > 0 else 'Unlimited'}")
-    
-    success, message = await crawl_and_index(url, max_pages=max_pages)
+    if scheduled:
+        # Same lease as the API scheduler, so only one of them crawls
+        print("Running the scheduled crawl...")
+        results = await run_scheduled_crawl(max_pages=max_pages)
+        if results is None:
+            print("Another node holds the crawl lease, nothing to do.")
+        for success, message in results or []:
+            print(f"Success: {success}")
+            print(f"Message: {message}")
+        await close_crawl_client()
+        shutdown_extractor_pool()
+        await close_mongo_connection()
+        return
+
+    if resume:
+        print(f"Resuming ingest run: {resume}")
+        success, message = await resume_sitemap_crawl(resume)
+    else:
+        print(f"Starting crawl for: {url}")
+        print(f"Max pages per sitemap: {max_pages if max_pages > 0 else 'Unlimited'}")
+        success, message = await crawl_and_index(url, max_pages=max_pages)
     
     print(f"Crawl finished.")
     print(f"Success: {success}")
     print(f"Message: {message}")
     
+    await close_crawl_client()
+    shutdown_extractor_pool()
     await close_mongo_connection()
 
 if __name__ == "__main__":
@@ -32,7 +58,9 @@ if __name__ == "__main__":
     parser.add_argument("--url", type=str, default="https://bunnyann.tw/sitemap.xml", help="The URL or Sitemap to crawl")
     parser.add_argument("--max", type=int, default=10, help="Max pages to crawl per sitemap. Set to 0 for unlimited.")
     parser.add_argument("--clean", action="store_true", help="Clean the knowledge base before crawling")
+    parser.add_argument("--resume", type=str, default=None, help="Resume an interrupted ingest run by its run id")
+    parser.add_argument("--scheduled", action="store_true", help="Run the scheduled crawl under the shared lease (resumes failed runs first)")
     
     args = parser.parse_args()
     
-    asyncio.run(run_crawler(args.url, args.clean, args.max))
+    asyncio.run(run_crawler(args.url, args.clean, args.max, args.resume, args.scheduled))
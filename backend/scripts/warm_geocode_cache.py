@@ -0,0 +1,68 @@
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from app.database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_database
+from app.services.geocode_cache import geocode_cache
+from app.services.geocoding_service import DEFAULT_COORDINATES
+
+load_dotenv()
+
+# Seeds the geocode cache with coordinates already stored in itineraries
+# (plan activities and pocket lists), so popular places never hit the
+# Geocoding API again. Only confirmed coordinates are used: places picked
+# from Google Places (placeId) and plan stops our geocoder resolved
+# (coordsSource "geocoder"); AI guesses would otherwise be served as fact
+# for GEOCODE_CACHE_TTL_DAYS. Existing cache entries are left untouched.
+
+
+def iter_places(itinerary):
+    locations = list(itinerary.get("pocket_list", []))
+    for day in itinerary.get("days", []):
+        locations.extend(day.get("activities", []))
+    for location in locations:
+        title = (location.get("title") or "").strip()
+        lat, lng = location.get("lat"), location.get("lng")
+        if not title or lat is None or lng is None:
+            continue
+        if not location.get("placeId") and location.get("coordsSource") != "geocoder":
+            continue
+        # Skip placeholders: unset coordinates and the Taipei default
+        if (lat, lng) == (0, 0) or (lat, lng) == DEFAULT_COORDINATES:
+            continue
+        yield title, lat, lng
+
+
+async def warm(batch_size: int):
+    await connect_to_mongo()
+    await ensure_indexes()
+    db = get_database()
+
+    itineraries = 0
+    seen = 0
+    inserted = 0
+    batch = []
+    fields = ("title", "lat", "lng", "placeId", "coordsSource")
+    projection = {f"{path}.{field}": 1 for path in ("days.activities", "pocket_list") for field in fields}
+    async for itinerary in db["itineraries"].find({}, projection):
+        itineraries += 1
+        for place in iter_places(itinerary):
+            batch.append(place)
+            seen += 1
+        if len(batch) >= batch_size:
+            inserted += await geocode_cache.warm(batch)
+            batch = []
+    if batch:
+        inserted += await geocode_cache.warm(batch)
+
+    print(f"Scanned {itineraries} itineraries, {seen} places with confirmed coordinates")
+    print(f"Added {inserted} new geocode cache entries")
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm the geocode cache from existing itineraries")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Places per bulk write")
+
+    args = parser.parse_args()
+
+    asyncio.run(warm(args.batch_size))